@@ -1,7 +1,12 @@
 from typing import Dict
 
 import prisma
+import prisma.enums
 import prisma.models
+import project.dimensions
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -22,7 +27,7 @@ async def addInventoryItem(
     Args:
         type (str): The type of item being added to the inventory, e.g., 'prisma.models.RawMaterial' or 'prisma.models.FinishedProduct'.
         quantity (int): The quantity of the item being added to the stock.
-        dimensions (Dict[str, float]): Dimensions of the item if applicable. Should be in dictionary format including height, width, and depth where applicable.
+        dimensions (Dict[str, float]): Dimensions of the item if applicable. For finished products these are height (or thickness) and width in inches and length in feet, and are stored for dimension search.
         unit (str): Unit of measure for the quantity, e.g., 'cubic meters', 'kilograms', etc.
 
     Returns:
@@ -34,11 +39,32 @@ async def addInventoryItem(
     """
     if type.lower() == "rawmaterial":
         model = prisma.models.RawMaterial
+        kind = project.stock_levels.RAW_MATERIAL
     elif type.lower() == "finishedproduct":
         model = prisma.models.FinishedProduct
+        kind = project.stock_levels.FINISHED_PRODUCT
     else:
         raise ValueError(
             "Unsupported inventory type. Valid types are 'prisma.models.RawMaterial' and 'prisma.models.FinishedProduct'."
         )
-    await model.prisma().create({"type": type, "quantity": quantity, "unit": unit})
+    data = {"type": type, "quantity": quantity, "unit": unit}
+    if model is prisma.models.FinishedProduct and dimensions:
+        size = project.dimensions.from_mapping(dimensions)
+        data.update(
+            thicknessIn=size.thickness_in,
+            widthIn=size.width_in,
+            lengthFt=size.length_ft,
+        )
+    async with prisma.get_client().tx() as transaction:
+        item = await model.prisma(transaction).create(data)
+        await project.stock_levels.record_item_change(transaction, kind, None, item)
+        await project.inventory_ledger.record_movements(
+            transaction,
+            [
+                project.inventory_ledger.Movement(
+                    kind, item.id, prisma.enums.MovementType.RECEIPT, quantity
+                )
+            ],
+        )
+    project.inventory_events.inventory_changed([(kind, item.id)])
     return AddInventoryResponse(message=f"{type} successfully added to inventory.")
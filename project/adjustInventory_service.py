@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Tuple
+
+import prisma
+import prisma.enums
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
+from pydantic import BaseModel
+
+MAX_ADJUSTMENTS = 5000
+
+ITEM_TABLES = {
+    project.stock_levels.RAW_MATERIAL: ('"RawMaterial"', "''", "0"),
+    project.stock_levels.FINISHED_PRODUCT: (
+        '"FinishedProduct"',
+        't."grade"',
+        't."reservedQuantity"',
+    ),
+}
+
+
+class InventoryAdjustment(BaseModel):
+    """
+    A change of the quantity of one inventory item; negative for stock leaving.
+    """
+
+    itemId: str
+    kind: str
+    quantityDelta: int
+    reason: Optional[str] = None
+
+
+class BulkAdjustmentRequest(BaseModel):
+    """
+    Quantity changes to apply together, e.g. the counts of a stock take.
+    """
+
+    adjustments: List[InventoryAdjustment]
+    movementType: prisma.enums.MovementType = prisma.enums.MovementType.ADJUSTMENT
+
+
+class AdjustedItem(BaseModel):
+    """
+    The stock of one item after the adjustments.
+    """
+
+    itemId: str
+    kind: str
+    quantity: int
+    version: int
+
+
+class BulkAdjustmentResponse(BaseModel):
+    """
+    The adjusted items with their new quantities and versions.
+    """
+
+    adjusted: List[AdjustedItem]
+
+
+async def adjustInventory(request: BulkAdjustmentRequest) -> BulkAdjustmentResponse:
+    """
+    Applies many quantity deltas in one transaction: one set-based UPDATE per item table, one counter upsert and one ledger insert, instead of a read-modify-write round trip per item. Quantities are changed in place by the database, so concurrent adjustments add up instead of overwriting each other. Either all adjustments apply or none does.
+
+    Args:
+        request (BulkAdjustmentRequest): The adjustments and the movement type to record them as.
+
+    Returns:
+        BulkAdjustmentResponse: The adjusted items with their new quantities and versions.
+
+    Raises:
+        ValueError: If a kind is unknown, there are too many adjustments, or an item does not exist or would go below zero (or below its reserved quantity).
+
+    Example:
+        await adjustInventory(BulkAdjustmentRequest(adjustments=[InventoryAdjustment(itemId="rm-1", kind="RawMaterial", quantityDelta=-3)]))
+        > BulkAdjustmentResponse(adjusted=[AdjustedItem(itemId="rm-1", kind="RawMaterial", quantity=47, version=8)])
+    """
+    if len(request.adjustments) > MAX_ADJUSTMENTS:
+        raise ValueError(f"At most {MAX_ADJUSTMENTS} adjustments are allowed.")
+    deltas: Dict[Tuple[str, str], int] = {}
+    for adjustment in request.adjustments:
+        if adjustment.kind not in ITEM_TABLES:
+            raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+        key = (adjustment.kind, adjustment.itemId)
+        deltas[key] = deltas.get(key, 0) + adjustment.quantityDelta
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    adjusted: List[AdjustedItem] = []
+    async with prisma.get_client().tx() as transaction:
+        stock_deltas: project.stock_levels.StockDeltas = {}
+        for kind, (table, grade, floor) in ITEM_TABLES.items():
+            item_ids = sorted(item_id for k, item_id in deltas if k == kind)
+            if not item_ids:
+                continue
+            rows = await transaction.query_raw(
+                f"""
+                WITH d AS (
+                    SELECT * FROM unnest($1::text[], $2::int[]) AS d("id", "delta")
+                ),
+                locked AS (
+                    SELECT t."id" FROM {table} t JOIN d ON d."id" = t."id"
+                    ORDER BY t."id" FOR UPDATE OF t
+                )
+                UPDATE {table} t
+                SET "quantity" = t."quantity" + d."delta",
+                    "version" = t."version" + 1,
+                    "updatedAt" = now()
+                FROM d
+                WHERE t."id" = d."id"
+                  AND t."id" IN (SELECT "id" FROM locked)
+                  AND t."quantity" + d."delta" >= {floor}
+                RETURNING t."id", t."type", {grade} AS "grade", t."unit",
+                          t."quantity", t."version", d."delta"
+                """,
+                item_ids,
+                [deltas[(kind, item_id)] for item_id in item_ids],
+            )
+            failed = set(item_ids) - {row["id"] for row in rows}
+            if failed:
+                raise ValueError(
+                    "Inventory items do not exist or do not have enough unreserved stock: "
+                    + ", ".join(sorted(failed))
+                )
+            for row in rows:
+                project.stock_levels.add_delta(
+                    stock_deltas,
+                    project.stock_levels.StockKey(
+                        kind, row["type"], row["grade"], row["unit"]
+                    ),
+                    project.stock_levels.StockDelta(quantity=row["delta"]),
+                )
+                adjusted.append(
+                    AdjustedItem(
+                        itemId=row["id"],
+                        kind=kind,
+                        quantity=row["quantity"],
+                        version=row["version"],
+                    )
+                )
+        await project.stock_levels.apply_stock_deltas(transaction, stock_deltas)
+        await project.inventory_ledger.record_movements(
+            transaction,
+            [
+                project.inventory_ledger.Movement(
+                    adjustment.kind,
+                    adjustment.itemId,
+                    request.movementType,
+                    adjustment.quantityDelta,
+                    adjustment.reason,
+                )
+                for adjustment in request.adjustments
+                if (adjustment.kind, adjustment.itemId) in deltas
+            ],
+        )
+    project.inventory_events.inventory_changed(deltas.keys())
+    return BulkAdjustmentResponse(adjusted=adjusted)
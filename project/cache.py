@@ -0,0 +1,149 @@
+import hashlib
+from datetime import date
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class CachedResponse(NamedTuple):
+    """
+    A serialized JSON response body together with its entity tag.
+    """
+
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """
+    Least-recently-used cache of serialized responses.
+
+    Every entry is registered under a set of tags (e.g. the quote and price estimates it
+    contains) so writers can drop exactly the entries that show the data they changed.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._entry_tags: Dict[str, Set[str]] = {}
+        self._tag_entries: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(
+        self, key: str, body: bytes, tags: Iterable[str], generation: int
+    ) -> CachedResponse:
+        """
+        Stores a serialized response unless an invalidation happened after `generation` was read, in which case the body may already be stale and is only returned.
+
+        Args:
+            key (str): Cache key of the response.
+            body (bytes): The serialized JSON response.
+            tags (Iterable[str]): Tags of the data shown in the response.
+            generation (int): Value of `generation` read before the data was loaded.
+
+        Returns:
+            CachedResponse: The body with its entity tag.
+        """
+        entry = CachedResponse(
+            body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        )
+        if generation != self.generation:
+            return entry
+        self._remove(key)
+        self._entries[key] = entry
+        self._entry_tags[key] = set(tags)
+        for tag in self._entry_tags[key]:
+            self._tag_entries.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        return entry
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[BaseModel]],
+        tags: Callable[[BaseModel], Iterable[str]],
+    ) -> CachedResponse:
+        """
+        Returns the cached response for `key`, loading and serializing it on a miss.
+
+        Args:
+            key (str): Cache key of the response.
+            loader (Callable[[], Awaitable[BaseModel]]): Loads the response model on a miss.
+            tags (Callable[[BaseModel], Iterable[str]]): Returns the tags of a loaded response.
+
+        Returns:
+            CachedResponse: The serialized response with its entity tag.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        generation = self.generation
+        res = await loader()
+        return self.put(key, res.model_dump_json().encode(), tags(res), generation)
+
+    def invalidate(self, *tags: str) -> None:
+        """
+        Drops every entry registered under any of the given tags.
+        """
+        self.generation += 1
+        for tag in tags:
+            for key in list(self._tag_entries.get(tag, ())):
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        for tag in self._entry_tags.pop(key, ()):
+            keys = self._tag_entries.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_entries[tag]
+
+
+response_cache = ResponseCache()
+
+
+def quote_tag(quoteId: str) -> str:
+    return f"quote:{quoteId}"
+
+
+def price_estimate_tag(estimateId: str) -> str:
+    return f"price-estimate:{estimateId}"
+
+
+def margin_month_tag(day: date) -> str:
+    return f"margin:{day:%Y-%m}"
+
+
+# Tag of responses computed from the whole inventory; dropped by every inventory write.
+INVENTORY_TAG = "inventory"
+
+
+def cached_response(entry: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """
+    Builds the HTTP response for a cached entry, answering 304 Not Modified without a body when the client already holds the current version.
+
+    Args:
+        entry (CachedResponse): The cached response.
+        if_none_match (Optional[str]): The request's If-None-Match header.
+
+    Returns:
+        Response: A 304 response or the cached JSON body, both carrying the ETag header.
+    """
+    headers = {"ETag": entry.etag}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or entry.etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -3,6 +3,7 @@ from typing import List
 
 import prisma
 import prisma.models
+import project.money
 from pydantic import BaseModel
 
 
@@ -33,23 +34,47 @@ async def createInvoice(
     Returns:
         InvoiceResponse: This model defines the structure for the response after creating an invoice, containing detailed invoice data.
     """
-    total_amount = 0.0
-    for quote_id in quoteIds:
-        quote = await prisma.models.Quote.prisma().find_unique(where={"id": quote_id})
-        for price_estimate in quote.priceEstimate:
-            total_amount += price_estimate.priceRate * price_estimate.quantity
-    new_invoice = await prisma.models.Invoice.prisma().create(
-        data={
-            "customerContactId": customerContactId,
-            "issueDate": issueDate,
-            "dueDate": dueDate,
-            "totalAmount": total_amount,
-        }
-    )
+    async with prisma.get_client().tx() as transaction:
+        totals = await transaction.query_first(
+            """
+            WITH open_quotes AS (
+                SELECT "id" FROM "Quote"
+                WHERE "id" = ANY($1::text[])
+                  AND "customerContactId" = $2
+                  AND "invoiceId" IS NULL
+                  AND ("expiresAt" IS NULL OR "expiresAt" > now())
+                FOR UPDATE
+            )
+            SELECT COUNT(DISTINCT q."id") AS "quoteCount",
+                   COALESCE(SUM(pe."priceRateCents" * pe."quantity"), 0)::bigint AS "totalAmountCents"
+            FROM open_quotes q
+            LEFT JOIN "PriceEstimate" pe ON pe."quoteId" = q."id"
+            """,
+            quoteIds,
+            customerContactId,
+        )
+        if totals["quoteCount"] != len(set(quoteIds)):
+            raise ValueError(
+                "One or more quotes do not exist, belong to another customer, are already invoiced or have expired."
+            )
+        total_amount_cents = totals["totalAmountCents"]
+        new_invoice = await prisma.models.Invoice.prisma(transaction).create(
+            data={
+                "customerContactId": customerContactId,
+                "issueDate": issueDate,
+                "dueDate": dueDate,
+                "totalAmountCents": total_amount_cents,
+            }
+        )
+        await transaction.execute_raw(
+            'UPDATE "Quote" SET "invoiceId" = $1, "updatedAt" = now() WHERE "id" = ANY($2::text[])',
+            new_invoice.id,
+            quoteIds,
+        )
     return InvoiceResponse(
         invoiceId=new_invoice.id,
         customerContactId=customerContactId,
-        totalAmount=total_amount,
+        totalAmount=project.money.from_cents(total_amount_cents),
         issueDate=issueDate,
         dueDate=dueDate,
     )
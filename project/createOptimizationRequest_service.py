@@ -1,10 +1,19 @@
 import uuid
-from typing import List, Tuple
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 import prisma
+import prisma.enums
 import prisma.models
+import project.inventory_events
+import project.inventory_holds
+import project.inventory_ledger
+import project.production_rollups
+import project.stock_levels
 from pydantic import BaseModel
 
+PLAN_HOLD_TTL = timedelta(hours=8)
+
 
 class OptimizationResponse(BaseModel):
     """
@@ -13,6 +22,8 @@ class OptimizationResponse(BaseModel):
 
     requestId: str
     status: str
+    heldRawMaterialId: Optional[str] = None
+    holdExpiresAt: Optional[datetime] = None
 
 
 async def createOptimizationRequest(
@@ -25,8 +36,10 @@ async def createOptimizationRequest(
     """
     Receives customer requirements and initiates the process to optimize cutting patterns. It uses data from the Inventory Tracking Module to ensure material availability and communicates with the Production Recording Module to provide cutting instructions. Expected to return a unique request ID and status.
 
+    The raw material for the plan is claimed in the in-memory hold table, which only admits it if its on-hand quantity minus what other plans hold covers the plan, so concurrent planners cannot claim the same stock. The hold lasts PLAN_HOLD_TTL unless released earlier.
+
     Args:
-        dimensions (List[Tuple[float, float, float]]): List of dimensions specified by the customer for the cutting process.
+        dimensions (List[Tuple[float, float, float]]): List of (thickness in inches, width in inches, length in feet) sizes specified by the customer for the cutting process.
         quantities (List[int]): Corresponding quantities for each dimension set specified by the customer.
         materialType (str): Type of material required, as determined by the stock records.
         grade (str): Quality grade of the material required.
@@ -40,24 +53,94 @@ async def createOptimizationRequest(
     raw_materials = await prisma.models.RawMaterial.prisma().find_many(
         where={"type": materialType, "quantity": {"gte": sum(quantities)}}
     )
-    if not raw_materials:
+    hold = project.inventory_holds.holds.acquire_first(
+        project.stock_levels.RAW_MATERIAL,
+        [(raw_material.id, raw_material.quantity) for raw_material in raw_materials],
+        sum(quantities),
+        "optimization",
+        request_id,
+        PLAN_HOLD_TTL,
+    )
+    if hold is None:
         return OptimizationResponse(
             requestId=request_id, status="Failed: Insufficient Material"
         )
-    for dimension, quantity in zip(dimensions, quantities):
-        await prisma.models.ProductionRecord.prisma().create(
-            data={
-                "userId": operatorId,
-                "quantityProduced": quantity,
-                "RawMaterial": {"connect": {"id": raw_materials[0].id}},
-                "FinishedProduct": {
-                    "create": {
-                        "type": materialType,
-                        "quantity": quantity,
-                        "unit": "unit",
-                        "grade": grade,
-                    }
-                },
-            }
+    try:
+        movements = await create_plan_products(
+            request_id,
+            hold.itemId,
+            dimensions,
+            quantities,
+            materialType,
+            grade,
+            operatorId,
         )
-    return OptimizationResponse(requestId=request_id, status="Optimization Successful")
+    except BaseException:
+        project.inventory_holds.holds.release("optimization", request_id)
+        raise
+    project.inventory_events.inventory_changed(
+        (movement.kind, movement.itemId) for movement in movements
+    )
+    return OptimizationResponse(
+        requestId=request_id,
+        status="Optimization Successful",
+        heldRawMaterialId=hold.itemId,
+        holdExpiresAt=hold.expiresAt,
+    )
+
+
+async def create_plan_products(
+    request_id: str,
+    rawMaterialId: str,
+    dimensions: List[Tuple[float, float, float]],
+    quantities: List[int],
+    materialType: str,
+    grade: str,
+    operatorId: str,
+) -> List[project.inventory_ledger.Movement]:
+    async with prisma.get_client().tx() as transaction:
+        deltas: project.stock_levels.StockDeltas = {}
+        rollup_deltas: project.production_rollups.RollupDeltas = {}
+        movements: List[project.inventory_ledger.Movement] = []
+        for dimension, quantity in zip(dimensions, quantities):
+            record = await prisma.models.ProductionRecord.prisma(transaction).create(
+                data={
+                    "userId": operatorId,
+                    "quantityProduced": quantity,
+                    "lumberGrade": grade,
+                    "materialType": materialType,
+                    "RawMaterial": {"connect": {"id": rawMaterialId}},
+                    "FinishedProduct": {
+                        "create": {
+                            "type": materialType,
+                            "quantity": quantity,
+                            "unit": "unit",
+                            "grade": grade,
+                            "thicknessIn": dimension[0],
+                            "widthIn": dimension[1],
+                            "lengthFt": dimension[2],
+                        }
+                    },
+                },
+                include={"FinishedProduct": True},
+            )
+            project.stock_levels.item_deltas(
+                project.stock_levels.FINISHED_PRODUCT,
+                None,
+                record.FinishedProduct,
+                deltas,
+            )
+            project.production_rollups.record_deltas(None, record, rollup_deltas)
+            movements.append(
+                project.inventory_ledger.Movement(
+                    project.stock_levels.FINISHED_PRODUCT,
+                    record.finishedProductId,
+                    prisma.enums.MovementType.PRODUCTION,
+                    quantity,
+                    f"Optimization request {request_id}",
+                )
+            )
+        await project.stock_levels.apply_stock_deltas(transaction, deltas)
+        await project.production_rollups.apply_rollup_deltas(transaction, rollup_deltas)
+        await project.inventory_ledger.record_movements(transaction, movements)
+    return movements
@@ -1,5 +1,10 @@
 import prisma
+import prisma.fields
 import prisma.models
+import project.cache
+import project.dimensions
+import project.money
+import project.pricing
 from pydantic import BaseModel
 
 
@@ -13,12 +18,13 @@ class PriceEstimateResponse(BaseModel):
 
 
 async def createPriceEstimate(
-    dimensions: str, grade: str, quantity: int
+    customerContactId: str, dimensions: str, grade: str, quantity: int
 ) -> PriceEstimateResponse:
     """
     This endpoint accepts dimensions, grade, and quantity of lumber from the user, calculates the price using predefined rates fetched from the Inventory Tracking Module, and generates a quote. The quote is then stored and can be used by the Sales and Invoicing Module.
 
     Args:
+        customerContactId (str): The unique identifier for the customer to whom the quote is being issued.
         dimensions (str): Lumber dimensions in the form of width x height x length (e.g., 2x4x8).
         grade (str): The grade of the lumber, determining quality and price scaling.
         quantity (int): The number of specified lumber items the customer wants to price.
@@ -26,25 +32,38 @@ async def createPriceEstimate(
     Returns:
         PriceEstimateResponse: Provides the calculated price and generated quote id for the requested lumber items.
     """
+    dimension_key = project.dimensions.dimension_key(
+        project.dimensions.parse_dimension_key(dimensions)
+    )
     predefined_rate = await prisma.models.PriceEstimate.prisma().find_many(
-        where={"lumberDimensions": dimensions, "lumberGrade": grade}, take=1
+        where={"dimensionKey": dimension_key, "lumberGrade": grade}, take=1
     )
     if not predefined_rate:
         raise ValueError("No predefined rate available for these specifications.")
-    price_rate = predefined_rate[0].priceRate
-    total_price = price_rate * quantity
+    price_rate_cents = predefined_rate[0].priceRateCents
+    total_price_cents = price_rate_cents * quantity
     created_quote = await prisma.models.Quote.prisma().create(
         data={
+            "customerContactId": customerContactId,
             "priceEstimate": {
                 "create": {
-                    "lumberDimensions": dimensions,
+                    "lumberDimensions": prisma.fields.Json(dimensions),
+                    "dimensionKey": dimension_key,
                     "lumberGrade": grade,
                     "quantity": quantity,
-                    "priceRate": price_rate,
+                    "priceRateCents": price_rate_cents,
+                    "expectedProfitCents": project.pricing.expected_profit_cents(
+                        price_rate_cents, quantity
+                    ),
                 }
-            }
+            },
         },
         include={"priceEstimate": True},
     )
     quote_id = created_quote.id
-    return PriceEstimateResponse(estimatedPrice=total_price, quoteId=quote_id)
+    project.cache.response_cache.invalidate(
+        project.cache.margin_month_tag(created_quote.createdAt)
+    )
+    return PriceEstimateResponse(
+        estimatedPrice=project.money.from_cents(total_price_cents), quoteId=quote_id
+    )
@@ -1,8 +1,16 @@
-from datetime import datetime
-from typing import Dict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
 import prisma
+import prisma.fields
 import prisma.models
+import project.cache
+import project.dimensions
+import project.inventory_events
+import project.money
+import project.pricing
+import project.quote_expiry
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -28,6 +36,7 @@ class QuoteResponse(BaseModel):
 
     quoteId: str
     createdAt: datetime
+    expiresAt: datetime
     priceEstimateDetails: PriceEstimate
 
 
@@ -36,60 +45,124 @@ async def createQuote(
     lumberDimensions: Dict[str, float],
     lumberGrade: str,
     quantity: int,
+    finishedProductId: Optional[str] = None,
+    validForDays: int = 14,
 ) -> QuoteResponse:
     """
     Creates a new customer quote based on lumber dimensions, grade, and quantity.
-    This endpoint uses predefined rates to calculate prices and returns a generated quote.
+    The price per board is calculated from its board feet and grade by project.pricing.
+
+    The quote expires after `validForDays`. When a finished product is given, the quoted
+    quantity is reserved from its stock in the same transaction and released again by the
+    expiry sweeper once the quote expires.
 
     Args:
         customerContactId (str): The unique identifier for the customer to whom the quote is being issued.
-        lumberDimensions (Dict[str, float]): The dimensions of the lumber for which the price is being estimated, expressed in JSON format.
+        lumberDimensions (Dict[str, float]): The dimensions of the lumber for which the price is being estimated, expressed in JSON format: height and width in inches, length in feet.
         lumberGrade (str): The grade of the lumber for the quotation.
         quantity (int): The quantity of lumber required for the quote.
+        finishedProductId (Optional[str]): The finished product to reserve stock from, if any.
+        validForDays (int): Number of days the quote (and its reservation) stays valid.
 
     Returns:
         QuoteResponse: Response model representing the generated customer quote.
 
+    Raises:
+        ValueError: If the dimensions are incomplete, validForDays is not positive or the product does not have enough unreserved stock.
+
     Example:
         await createQuote(
             "e1c1c92a-9da3-467d-ae0f-52ac1c442b57",
-            {"length": 2.0, "width": 4.0, "height": 8.0},
+            {"length": 8.0, "width": 4.0, "height": 2.0},
             "High",
             100
         )
     """
-    price_rate_per_unit = 2.5
-    expected_profit = quantity * price_rate_per_unit * 0.2
-    price_estimate = await prisma.models.PriceEstimate.prisma().create(
-        {
-            "lumberDimensions": lumberDimensions,
-            "lumberGrade": lumberGrade,
-            "quantity": quantity,
-            "priceRate": price_rate_per_unit,
-            "expectedProfit": expected_profit,
-            "createdAt": datetime.now(),
-            "updatedAt": datetime.now(),
-        }
+    dimensions = project.dimensions.from_mapping(lumberDimensions)
+    dimension_key = project.dimensions.dimension_key(dimensions)
+    if validForDays <= 0:
+        raise ValueError("validForDays must be a positive number.")
+    expires_at = datetime.now(timezone.utc) + timedelta(days=validForDays)
+    price_rate_cents = project.pricing.unit_price_cents(dimensions, lumberGrade)
+    expected_profit_cents = project.pricing.expected_profit_cents(
+        price_rate_cents, quantity
     )
-    quote = await prisma.models.Quote.prisma().create(
-        {
-            "customerContactId": customerContactId,
-            "createdAt": datetime.now(),
-            "updatedAt": datetime.now(),
-            "priceEstimate": {"connect": {"id": price_estimate.id}},
-        }
+    async with prisma.get_client().tx() as transaction:
+        quote = await prisma.models.Quote.prisma(transaction).create(
+            data={
+                "customerContactId": customerContactId,
+                "expiresAt": expires_at,
+                "priceEstimate": {
+                    "create": [
+                        {
+                            "lumberDimensions": prisma.fields.Json(lumberDimensions),
+                            "dimensionKey": dimension_key,
+                            "lumberGrade": lumberGrade,
+                            "quantity": quantity,
+                            "priceRateCents": price_rate_cents,
+                            "expectedProfitCents": expected_profit_cents,
+                        }
+                    ]
+                },
+            },
+            include={"priceEstimate": True},
+        )
+        if finishedProductId:
+            reserved = await transaction.query_first(
+                """
+                UPDATE "FinishedProduct"
+                SET "reservedQuantity" = "reservedQuantity" + $1, "version" = "version" + 1,
+                    "updatedAt" = now()
+                WHERE "id" = $2 AND "quantity" - "reservedQuantity" >= $1
+                RETURNING "type", "grade", "unit"
+                """,
+                quantity,
+                finishedProductId,
+            )
+            if not reserved:
+                raise ValueError(
+                    "Finished product does not exist or does not have enough unreserved stock."
+                )
+            await project.stock_levels.apply_stock_deltas(
+                transaction,
+                {
+                    project.stock_levels.StockKey(
+                        project.stock_levels.FINISHED_PRODUCT,
+                        reserved["type"],
+                        reserved["grade"],
+                        reserved["unit"],
+                    ): project.stock_levels.StockDelta(reservedQuantity=quantity)
+                },
+            )
+            await prisma.models.InventoryReservation.prisma(transaction).create(
+                data={
+                    "quoteId": quote.id,
+                    "finishedProductId": finishedProductId,
+                    "quantity": quantity,
+                    "expiresAt": expires_at,
+                }
+            )
+    project.cache.response_cache.invalidate(
+        project.cache.margin_month_tag(quote.createdAt)
     )
+    if finishedProductId:
+        project.quote_expiry.reservation_expiry.schedule(quote.id, expires_at)
+        project.inventory_events.inventory_changed(
+            [(project.stock_levels.FINISHED_PRODUCT, finishedProductId)]
+        )
+    price_estimate = quote.priceEstimate[0]
     return QuoteResponse(
         quoteId=quote.id,
         createdAt=quote.createdAt,
+        expiresAt=expires_at,
         priceEstimateDetails=PriceEstimate(
             id=price_estimate.id,
             lumber_dimensions=lumberDimensions,
             lumber_grade=lumberGrade,
             quantity=quantity,
-            price_rate=price_rate_per_unit,
+            price_rate=project.money.from_cents(price_rate_cents),
             createdAt=price_estimate.createdAt,
             updatedAt=price_estimate.updatedAt,
-            expected_profit=expected_profit,
+            expected_profit=project.money.from_cents(expected_profit_cents),
         ),
     )
@@ -0,0 +1,23 @@
+import prisma.errors
+
+# SQLSTATE classes of errors caused by the values a statement writes: 22 (data
+# exception, e.g. integer out of range) and 23 (integrity constraint violation).
+DATA_ERROR_CLASSES = ("22", "23")
+
+
+def is_data_error(error: BaseException) -> bool:
+    """
+    Tells whether a write was rejected because of the rows it wrote, so retrying the same rows can never succeed. Connection, timeout, lock and transaction errors are not data errors: the same write may succeed once the database is back.
+    """
+    if isinstance(
+        error,
+        (
+            prisma.errors.UniqueViolationError,
+            prisma.errors.ForeignKeyViolationError,
+            prisma.errors.MissingRequiredValueError,
+        ),
+    ):
+        return True
+    if isinstance(error, prisma.errors.RawQueryError):
+        return str((error.meta or {}).get("code", "")).startswith(DATA_ERROR_CLASSES)
+    return False
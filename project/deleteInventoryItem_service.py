@@ -1,7 +1,12 @@
 from typing import Type
 
 import prisma
+import prisma.enums
+import prisma.errors
 import prisma.models
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -44,19 +49,37 @@ async def deleteInventoryItem(
         else prisma.models.FinishedProduct
     )
     try:
-        item = await model.prisma().delete(where={"id": itemId})
+        async with prisma.get_client().tx() as transaction:
+            item = await model.prisma(transaction).delete(where={"id": itemId})
+            if item is not None:
+                await project.stock_levels.record_item_change(
+                    transaction, itemType, item, None
+                )
+                await project.inventory_ledger.record_movements(
+                    transaction,
+                    [
+                        project.inventory_ledger.Movement(
+                            itemType,
+                            itemId,
+                            prisma.enums.MovementType.ADJUSTMENT,
+                            -item.quantity,
+                            "Item deleted",
+                        )
+                    ],
+                )
+    except prisma.errors.PrismaError:
         return DeleteInventoryItemResponse(
-            message="Item deleted successfully", deletedItemId=itemId, status="200 OK"
+            message="Error during deletion process.",
+            deletedItemId="",
+            status="500 Internal Server Error",
         )
-    except prisma.exceptions.NotFoundError:
+    if item is None:
         return DeleteInventoryItemResponse(
             message="No item found with provided ID, or deletion not allowed.",
             deletedItemId="",
             status="404 Not Found",
         )
-    except prisma.exceptions.PrismaError:
-        return DeleteInventoryItemResponse(
-            message="Error during deletion process.",
-            deletedItemId="",
-            status="500 Internal Server Error",
-        )
+    project.inventory_events.inventory_changed([(itemType, itemId)])
+    return DeleteInventoryItemResponse(
+        message="Item deleted successfully", deletedItemId=itemId, status="200 OK"
+    )
@@ -1,5 +1,6 @@
 import prisma
 import prisma.models
+import project.cache
 from pydantic import BaseModel
 
 
@@ -26,7 +27,13 @@ async def deletePriceEstimate(estimateId: str) -> DeletePriceEstimateResponse:
         response = deletePriceEstimate(estimateId)
         > DeletePriceEstimateResponse(success=True)
     """
-    delete_count = await prisma.models.PriceEstimate.prisma().delete_many(
+    deleted = await prisma.models.PriceEstimate.prisma().delete(
         where={"id": estimateId}
     )
-    return DeletePriceEstimateResponse(success=delete_count > 0)
+    if deleted is None:
+        return DeletePriceEstimateResponse(success=False)
+    project.cache.response_cache.invalidate(
+        project.cache.price_estimate_tag(estimateId),
+        project.cache.margin_month_tag(deleted.createdAt),
+    )
+    return DeletePriceEstimateResponse(success=True)
@@ -2,6 +2,10 @@ from typing import Optional
 
 import prisma
 import prisma.models
+import project.inventory_events
+import project.production_rollups
+import project.production_stock
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -16,7 +20,7 @@ class DeleteProductionRecordResponse(BaseModel):
 
 async def deleteProductionRecord(recordId: str) -> DeleteProductionRecordResponse:
     """
-    Removes a specific production record from the database. This might be necessary in cases of errors or duplication.
+    Removes a specific production record from the database. This might be necessary in cases of errors or duplication. The stock the record moved is put back in the same transaction, with ADJUSTMENT movements in the ledger and matching stock counter deltas.
 
     Args:
     recordId (str): The unique identifier of the production record intended for deletion.
@@ -25,9 +29,31 @@ async def deleteProductionRecord(recordId: str) -> DeleteProductionRecordRespons
     DeleteProductionRecordResponse: This model will confirm the deletion of the production record or relay error information.
     """
     try:
-        record = await prisma.models.ProductionRecord.prisma().delete(
-            where={"id": recordId}
-        )
+        async with prisma.get_client().tx() as transaction:
+            record = await prisma.models.ProductionRecord.prisma(
+                transaction
+            ).find_first(where={"id": recordId})
+            if record is None:
+                raise ValueError(f"No production record found with ID {recordId}.")
+            items = [
+                (project.stock_levels.RAW_MATERIAL, record.rawMaterialId),
+                (project.stock_levels.FINISHED_PRODUCT, record.finishedProductId),
+            ]
+            moved = await project.production_stock.recorded_moves(
+                transaction, recordId, items
+            )
+            await project.production_stock.apply_moves(
+                transaction,
+                recordId,
+                project.production_stock.subtract_moves({}, moved),
+            )
+            await prisma.models.ProductionRecord.prisma(transaction).delete(
+                where={"id_createdAt": {"id": recordId, "createdAt": record.createdAt}}
+            )
+            await project.production_rollups.apply_rollup_deltas(
+                transaction, project.production_rollups.record_deltas(record, None)
+            )
+        project.inventory_events.inventory_changed(items)
         return DeleteProductionRecordResponse(
             success=True,
             message=f"Production record with ID {recordId} was successfully deleted.",
@@ -0,0 +1,217 @@
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+MM_PER_INCH = 25.4
+
+INCHES_PER_FOOT = 12
+
+METERS_PER_FOOT = 0.3048
+
+CUBIC_INCHES_PER_BOARD_FOOT = 144
+
+CUBIC_METERS_PER_BOARD_FOOT = CUBIC_INCHES_PER_BOARD_FOOT * (MM_PER_INCH / 1000) ** 3
+
+NOMINAL_TO_ACTUAL_INCHES = {
+    1: 0.75,
+    2: 1.5,
+    3: 2.5,
+    4: 3.5,
+    5: 4.5,
+    6: 5.5,
+    8: 7.25,
+    10: 9.25,
+    12: 11.25,
+}
+
+Numbers = Union[Sequence[float], np.ndarray]
+
+
+class Dimensions(NamedTuple):
+    """
+    Size of a board: thickness and width in inches, length in feet, as lumber is sold.
+    """
+
+    thickness_in: float
+    width_in: float
+    length_ft: float
+
+
+def inches_to_mm(inches: float) -> float:
+    return inches * MM_PER_INCH
+
+
+def mm_to_inches(mm: float) -> float:
+    return mm / MM_PER_INCH
+
+
+def feet_to_meters(feet: float) -> float:
+    return feet * METERS_PER_FOOT
+
+
+def meters_to_feet(meters: float) -> float:
+    return meters / METERS_PER_FOOT
+
+
+def actual_inches(nominal: float) -> float:
+    """
+    Converts a nominal cross-section size (e.g. the 2 of a 2x4) to the dressed size in inches. Sizes without a standard dressed size are returned unchanged.
+
+    Args:
+        nominal (float): Nominal size in inches.
+
+    Returns:
+        float: Actual (dressed) size in inches.
+    """
+    if float(nominal).is_integer():
+        return NOMINAL_TO_ACTUAL_INCHES.get(int(nominal), nominal)
+    return nominal
+
+
+def actual_size(dimensions: Dimensions) -> Dimensions:
+    """
+    Converts the nominal thickness and width of a board to their dressed sizes. Length is sold at its actual size and is kept.
+    """
+    return Dimensions(
+        actual_inches(dimensions.thickness_in),
+        actual_inches(dimensions.width_in),
+        dimensions.length_ft,
+    )
+
+
+def from_mapping(lumberDimensions: Dict[str, float]) -> Dimensions:
+    """
+    Reads the dimensions stored with quotes and price estimates, where `height` (or `thickness`) and `width` are in inches and `length` is in feet.
+
+    Args:
+        lumberDimensions (Dict[str, float]): e.g. {"length": 8.0, "width": 4.0, "height": 2.0}.
+
+    Returns:
+        Dimensions: The board size.
+
+    Raises:
+        ValueError: If a dimension is missing or not positive.
+    """
+    thickness = lumberDimensions.get("thickness", lumberDimensions.get("height"))
+    width = lumberDimensions.get("width")
+    length = lumberDimensions.get("length")
+    if thickness is None or width is None or length is None:
+        raise ValueError(
+            "lumberDimensions needs height (or thickness), width and length."
+        )
+    dimensions = Dimensions(float(thickness), float(width), float(length))
+    if min(dimensions) <= 0:
+        raise ValueError("Lumber dimensions must be positive.")
+    return dimensions
+
+
+def dimension_key(dimensions: Dimensions) -> str:
+    """
+    Formats a board size as the "thicknessxwidthxlength" key used to group estimates, e.g. "2x6x12".
+    """
+    return "x".join(f"{value:g}" for value in dimensions)
+
+
+def parse_dimension_key(key: str) -> Dimensions:
+    """
+    Parses a "thicknessxwidthxlength" key such as "2x6x12" (inches, inches, feet).
+
+    Raises:
+        ValueError: If the key does not have three positive numbers.
+    """
+    try:
+        dimensions = Dimensions(*(float(part) for part in key.lower().split("x")))
+    except (TypeError, ValueError) as e:
+        raise ValueError(
+            f"Invalid dimensions {key!r}, expected thickness x width x length, e.g. 2x6x12."
+        ) from e
+    if min(dimensions) <= 0:
+        raise ValueError("Lumber dimensions must be positive.")
+    return dimensions
+
+
+def board_feet(dimensions: Dimensions, pieces: float = 1) -> float:
+    """
+    Volume in board feet (144 cubic inches). By trade convention this is computed from nominal sizes.
+
+    Args:
+        dimensions (Dimensions): The board size.
+        pieces (float): Number of boards.
+
+    Returns:
+        float: The total volume in board feet.
+    """
+    return (
+        dimensions.thickness_in
+        * dimensions.width_in
+        * dimensions.length_ft
+        * INCHES_PER_FOOT
+        / CUBIC_INCHES_PER_BOARD_FOOT
+        * pieces
+    )
+
+
+def cubic_meters(dimensions: Dimensions, pieces: float = 1) -> float:
+    """
+    Volume in cubic meters of the given boards, using the sizes as given (pass `actual_size(...)` for the dressed volume).
+    """
+    return board_feet(dimensions, pieces) * CUBIC_METERS_PER_BOARD_FOOT
+
+
+def board_feet_to_cubic_meters(boardFeet: Union[float, np.ndarray]):
+    return boardFeet * CUBIC_METERS_PER_BOARD_FOOT
+
+
+def cubic_meters_to_board_feet(cubicMeters: Union[float, np.ndarray]):
+    return cubicMeters / CUBIC_METERS_PER_BOARD_FOOT
+
+
+def as_array(dimensions: Iterable[Sequence[float]]) -> np.ndarray:
+    """
+    Packs a batch of (thickness_in, width_in, length_ft) sizes into an (n, 3) float64 array.
+    """
+    array = np.asarray(list(dimensions), dtype=np.float64)
+    if array.size == 0:
+        return np.empty((0, 3), dtype=np.float64)
+    if array.ndim != 2 or array.shape[1] != 3:
+        raise ValueError("Dimensions must be (thickness, width, length) triples.")
+    return array
+
+
+def actual_inches_batch(nominal: Numbers) -> np.ndarray:
+    """
+    Vectorized `actual_inches` for an array of nominal sizes.
+    """
+    sizes = np.asarray(nominal, dtype=np.float64)
+    result = sizes.copy()
+    for nominal_size, actual in NOMINAL_TO_ACTUAL_INCHES.items():
+        result[sizes == nominal_size] = actual
+    return result
+
+
+def board_feet_batch(
+    dimensions: np.ndarray, pieces: Optional[Numbers] = None
+) -> np.ndarray:
+    """
+    Board feet of every row of an (n, 3) array of (thickness_in, width_in, length_ft) sizes in one vectorized pass.
+
+    Args:
+        dimensions (np.ndarray): Sizes, e.g. from `as_array`.
+        pieces (Optional[Numbers]): Number of boards of every row; one board per row when omitted.
+
+    Returns:
+        np.ndarray: The float64 board feet of every row.
+    """
+    volume = np.prod(dimensions, axis=1) * (
+        INCHES_PER_FOOT / CUBIC_INCHES_PER_BOARD_FOOT
+    )
+    if pieces is not None:
+        volume = volume * np.asarray(pieces, dtype=np.float64)
+    return volume
+
+
+def total_board_feet(dimensions: np.ndarray, pieces: Optional[Numbers] = None) -> float:
+    """
+    Sums the board feet of a batch of sizes with a single vector reduction.
+    """
+    return float(board_feet_batch(dimensions, pieces).sum())
@@ -0,0 +1,39 @@
+from typing import AsyncIterator
+
+import project.pg_copy
+import project.stock_levels
+
+EXPORT_QUERIES = {
+    project.stock_levels.RAW_MATERIAL: """
+        SELECT "id", "type", "quantity", "unit", "reorderThreshold", "version"
+        FROM "RawMaterial" ORDER BY "id"
+        """,
+    project.stock_levels.FINISHED_PRODUCT: """
+        SELECT "id", "type", "grade", "quantity", "reservedQuantity", "unit",
+               "thicknessIn", "widthIn", "lengthFt", "reorderThreshold", "version"
+        FROM "FinishedProduct" ORDER BY "id"
+        """,
+}
+
+
+def exportInventory(kind: str) -> AsyncIterator[bytes]:
+    """
+    Exports all raw materials or finished products as CSV with a header row, streamed from the database with COPY. The columns match the import, so an export can be edited and imported back as a stocktake.
+
+    Args:
+        kind (str): Either 'RawMaterial' or 'FinishedProduct'.
+
+    Returns:
+        AsyncIterator[bytes]: The CSV document in chunks.
+
+    Raises:
+        ValueError: If the kind is unknown.
+
+    Example:
+        async for chunk in exportInventory('RawMaterial'):
+            ...
+        > b'id,type,quantity,unit,reorderThreshold,version\\n3f2c...,Oak log,40,Pieces,,3\\n...'
+    """
+    if kind not in EXPORT_QUERIES:
+        raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+    return project.pg_copy.stream_copy_out(EXPORT_QUERIES[kind])
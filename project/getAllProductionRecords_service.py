@@ -1,17 +1,17 @@
 from datetime import datetime
-from typing import List
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
 import prisma
-import prisma.models
+import project.pagination
+import project.pg_copy
 from pydantic import BaseModel
 
+STREAM_PREFETCH = 1000
 
-class GetAllProductionRecordsRequest(BaseModel):
-    """
-    This model represents the request for fetching all production records. It could be augmented with query parameters for filtering and pagination.
-    """
-
-    pass
+RECORD_COLUMNS = (
+    '"id", "userId", "rawMaterialId", "finishedProductId", "quantityProduced",'
+    ' "createdAt", "updatedAt"'
+)
 
 
 class ProductionRecordDetails(BaseModel):
@@ -30,37 +30,95 @@ class ProductionRecordDetails(BaseModel):
 
 class GetAllProductionRecordsResponse(BaseModel):
     """
-    This model encapsulates the response data for all production records. Each record includes details of the production process such as the product type, quantity, and associated materials.
+    One page of production records, newest first, with the cursor of the next page.
     """
 
     records: List[ProductionRecordDetails]
+    next_cursor: Optional[str] = None
+
+
+def record_filters(
+    created_from: Optional[datetime], created_to: Optional[datetime]
+) -> Tuple[List[str], List[Any]]:
+    conditions: List[str] = []
+    parameters: List[Any] = []
+    if created_from:
+        parameters.append(created_from)
+        conditions.append(f'"createdAt" >= ${len(parameters)}::timestamp')
+    if created_to:
+        parameters.append(created_to)
+        conditions.append(f'"createdAt" < ${len(parameters)}::timestamp')
+    return conditions, parameters
 
 
 async def getAllProductionRecords(
-    request: GetAllProductionRecordsRequest,
+    cursor: Optional[str],
+    limit: int,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
 ) -> GetAllProductionRecordsResponse:
     """
-    Retrieves a list of all production records. This includes historical data which is necessary for analysis and reporting.
+    Retrieves production records, newest first, one page at a time. This includes historical data which is necessary for analysis and reporting.
+
+    Pages are read with keyset pagination on (createdAt, id), so every page costs one index range scan no matter how deep it is. Only the record's own columns are read; users, raw materials and finished products are not joined.
 
     Args:
-        request (GetAllProductionRecordsRequest): This model represents the request for fetching all production records. It could be augmented with query parameters for filtering and pagination.
+        cursor (Optional[str]): The next_cursor of the previous page; omit for the first page.
+        limit (int): Number of records per page, at most 1000.
+        created_from (Optional[datetime]): Only return records created at or after this time.
+        created_to (Optional[datetime]): Only return records created before this time.
 
     Returns:
-        GetAllProductionRecordsResponse: This model encapsulates the response data for all production records. Each record includes details of the production process such as the product type, quantity, and associated materials.
+        GetAllProductionRecordsResponse: One page of production records with the cursor of the next page.
     """
-    records = await prisma.models.ProductionRecord.prisma().find_many(
-        include={"User": True, "RawMaterial": True, "FinishedProduct": True}
+    project.pagination.check_limit(limit)
+    conditions, parameters = record_filters(created_from, created_to)
+    if cursor:
+        cursor_created_at, cursor_id = project.pagination.decodeCursor(cursor)
+        parameters.extend([cursor_created_at, cursor_id])
+        conditions.append(
+            f'("createdAt", "id") < (${len(parameters) - 1}::timestamp, ${len(parameters)})'
+        )
+    parameters.append(limit + 1)
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = await prisma.get_client().query_raw(
+        f'SELECT {RECORD_COLUMNS} FROM "ProductionRecord"{where_clause}'
+        f' ORDER BY "createdAt" DESC, "id" DESC LIMIT ${len(parameters)}',
+        *parameters,
     )
-    response_records = [
-        ProductionRecordDetails(
-            id=record.id,
-            userId=record.userId,
-            rawMaterialId=record.rawMaterialId,
-            finishedProductId=record.finishedProductId,
-            quantityProduced=record.quantityProduced,
-            createdAt=record.createdAt,
-            updatedAt=record.updatedAt,
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = project.pagination.encodeCursor(
+            rows[-1]["createdAt"], rows[-1]["id"]
         )
-        for record in records
-    ]
-    return GetAllProductionRecordsResponse(records=response_records)
+    return GetAllProductionRecordsResponse(
+        records=[ProductionRecordDetails(**row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+async def streamProductionRecords(
+    created_from: Optional[datetime], created_to: Optional[datetime]
+) -> AsyncIterator[bytes]:
+    """
+    Streams all matching production records, newest first, as newline-delimited JSON. The rows are read through a server-side cursor STREAM_PREFETCH at a time, so memory use stays constant however much history is exported.
+
+    Args:
+        created_from (Optional[datetime]): Only return records created at or after this time.
+        created_to (Optional[datetime]): Only return records created before this time.
+
+    Returns:
+        AsyncIterator[bytes]: One JSON-encoded ProductionRecordDetails per line.
+    """
+    conditions, parameters = record_filters(created_from, created_to)
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    async with project.pg_copy.copy_connection() as connection:
+        async with connection.transaction():
+            async for row in connection.cursor(
+                f'SELECT {RECORD_COLUMNS} FROM "ProductionRecord"{where_clause}'
+                ' ORDER BY "createdAt" DESC, "id" DESC',
+                *parameters,
+                prefetch=STREAM_PREFETCH,
+            ):
+                yield ProductionRecordDetails(**row).model_dump_json().encode() + b"\n"
@@ -0,0 +1,19 @@
+import project.startBulkInvoicing_service
+
+
+async def getBulkInvoicingStatus(
+    jobId: str,
+) -> project.startBulkInvoicing_service.BulkInvoicingStatus:
+    """
+    Reports the progress of a bulk invoicing run: how many customers were processed, how many invoices and quotes were written and the amount invoiced so far.
+
+    Args:
+        jobId (str): The identifier returned when the run was started.
+
+    Returns:
+        project.startBulkInvoicing_service.BulkInvoicingStatus: Progress of the bulk invoicing run.
+    """
+    job = project.startBulkInvoicing_service.bulk_invoicing_jobs.get(jobId)
+    if job is None:
+        raise ValueError(f"No bulk invoicing run found with ID {jobId}")
+    return job
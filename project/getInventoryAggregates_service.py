@@ -0,0 +1,109 @@
+from typing import Any, List, Optional
+
+import prisma
+import project.cache
+from pydantic import BaseModel
+
+GROUP_COLUMNS = {
+    "kind": '"kind"',
+    "type": '"type"',
+    "grade": '"grade"',
+    "unit": '"unit"',
+    "cross_section": """("thicknessIn"::text || 'x' || "widthIn"::text)""",
+    "length": '"lengthFt"',
+}
+
+
+class InventoryAggregate(BaseModel):
+    """
+    Totals of one group of inventory items. Only the grouped-by keys are set.
+    """
+
+    kind: Optional[str] = None
+    type: Optional[str] = None
+    grade: Optional[str] = None
+    unit: Optional[str] = None
+    cross_section: Optional[str] = None
+    length_ft: Optional[float] = None
+    item_count: int
+    quantity: int
+    reserved_quantity: int
+    available_quantity: int
+    board_feet: float
+
+
+class InventoryAggregatesResponse(BaseModel):
+    """
+    Inventory totals grouped server-side, one row per group.
+    """
+
+    kind: Optional[str]
+    group_by: List[str]
+    groups: List[InventoryAggregate]
+
+
+async def getInventoryAggregates(
+    kind: Optional[str], group_by: str
+) -> InventoryAggregatesResponse:
+    """
+    Totals inventory by any combination of kind, type, grade, unit and dimension bucket (cross-section and/or length) with one GROUP BY on the inventory catalog, so valuation and stock-summary screens receive one row per group instead of every item.
+
+    Args:
+        kind (Optional[str]): Only include 'RawMaterial' or 'FinishedProduct' items.
+        group_by (str): Comma-separated grouping keys out of "kind", "type", "grade", "unit", "cross_section" and "length".
+
+    Returns:
+        InventoryAggregatesResponse: One row per group with item count, quantities and board feet.
+
+    Example:
+        await getInventoryAggregates('FinishedProduct', 'grade,cross_section')
+        > InventoryAggregatesResponse(groups=[InventoryAggregate(grade='#2', cross_section='2x6', quantity=840, board_feet=10080.0, ...), ...], ...)
+    """
+    if kind and kind not in ("RawMaterial", "FinishedProduct"):
+        raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    unknown = [key for key in keys if key not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown group_by keys: {', '.join(unknown)}")
+    select_list = [f'{GROUP_COLUMNS[key]} AS "{key}"' for key in keys]
+    parameters: List[Any] = []
+    condition = ""
+    if kind:
+        parameters.append(kind)
+        condition = ' WHERE "kind" = $1'
+    group_clause = (
+        f" GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+        f" ORDER BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+        if keys
+        else ""
+    )
+    query = (
+        f"SELECT {''.join(column + ', ' for column in select_list)}"
+        ' COUNT(*)::int AS "itemCount",'
+        ' COALESCE(SUM("quantity"), 0)::bigint AS "quantity",'
+        ' COALESCE(SUM("reservedQuantity"), 0)::bigint AS "reservedQuantity",'
+        ' COALESCE(SUM("thicknessIn" * "widthIn" * "lengthFt" / 12 * "quantity"), 0)::float8 AS "boardFeet"'
+        f' FROM "InventoryCatalog"{condition}{group_clause}'
+    )
+    rows = await prisma.get_client().query_raw(query, *parameters)
+    groups = [
+        InventoryAggregate(
+            kind=row.get("kind"),
+            type=row.get("type"),
+            grade=row.get("grade"),
+            unit=row.get("unit"),
+            cross_section=row.get("cross_section"),
+            length_ft=row.get("length"),
+            item_count=row["itemCount"],
+            quantity=row["quantity"],
+            reserved_quantity=row["reservedQuantity"],
+            available_quantity=row["quantity"] - row["reservedQuantity"],
+            board_feet=round(row["boardFeet"], 2),
+        )
+        for row in rows
+    ]
+    return InventoryAggregatesResponse(kind=kind, group_by=keys, groups=groups)
+
+
+def inventory_aggregates_tags(res: InventoryAggregatesResponse) -> List[str]:
+    return [project.cache.INVENTORY_TAG]
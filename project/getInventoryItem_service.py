@@ -1,7 +1,7 @@
 from typing import Optional
 
-import prisma
-import prisma.models
+import project.dimensions
+import project.inventory_catalog
 from pydantic import BaseModel
 
 
@@ -24,6 +24,7 @@ class InventoryItemResponse(BaseModel):
 
     itemType: str
     details: InventoryDetails
+    version: int
 
 
 async def getInventoryItem(itemId: str) -> InventoryItemResponse:
@@ -43,30 +44,27 @@ async def getInventoryItem(itemId: str) -> InventoryItemResponse:
         getInventoryItem('some-finished-product-id')
         > InventoryItemResponse(itemType='FinishedProduct', details=InventoryDetails(dimensions='150x250', materialType=None, quantity=20, unit='Pieces', grade='A+'))
 
-    Note: This function combines details from two models: RawMaterial and FinishedProduct. The specific model queried depends on the itemId prefix or any other distinguishing features used in your data model system.
+    Note: Both models are looked up with a single query on the "InventoryCatalog" view.
     """
-    raw_material = await prisma.models.RawMaterial.prisma().find_unique(
-        where={"id": itemId}
+    item = await project.inventory_catalog.find_item(itemId)
+    if item is None:
+        raise ValueError("No inventory item found with the provided ID")
+    finished = item["kind"] == "FinishedProduct"
+    details = InventoryDetails(
+        dimensions=(
+            project.dimensions.dimension_key(
+                project.dimensions.Dimensions(
+                    item["thicknessIn"], item["widthIn"], item["lengthFt"]
+                )
+            )
+            if item["thicknessIn"] is not None
+            else None
+        ),
+        materialType=None if finished else item["type"],
+        quantity=item["quantity"],
+        unit=item["unit"],
+        grade=item["grade"] if finished else None,
     )
-    finished_product = await prisma.models.FinishedProduct.prisma().find_unique(
-        where={"id": itemId}
+    return InventoryItemResponse(
+        itemType=item["kind"], details=details, version=item["version"]
     )
-    if raw_material:
-        details = InventoryDetails(
-            dimensions=None,
-            materialType=raw_material.type,
-            quantity=raw_material.quantity,
-            unit=raw_material.unit,
-            grade=None,
-        )
-        return InventoryItemResponse(itemType="RawMaterial", details=details)
-    elif finished_product:
-        details = InventoryDetails(
-            dimensions=None,
-            materialType=None,
-            quantity=finished_product.quantity,
-            unit=finished_product.unit,
-            grade=finished_product.grade,
-        )
-        return InventoryItemResponse(itemType="FinishedProduct", details=details)
-    raise ValueError("No inventory item found with the provided ID")
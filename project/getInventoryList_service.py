@@ -1,9 +1,16 @@
 from typing import List, Optional
 
-import prisma
-import prisma.models
+import project.inventory_catalog
+import project.stock_alerts
 from pydantic import BaseModel
 
+STATUS_FILTERS = {
+    None: lambda row: True,
+    "in-stock": lambda row: row["quantity"] > 0,
+    "low-stock": lambda row: row["quantity"] <= row["threshold"],
+    "out-of-stock": lambda row: row["quantity"] == 0,
+}
+
 
 class InventoryItem(BaseModel):
     """
@@ -15,6 +22,7 @@ class InventoryItem(BaseModel):
     quantity: int
     unit: str
     status: str
+    reorder_threshold: int
 
 
 class InventoryResponse(BaseModel):
@@ -31,54 +39,36 @@ async def getInventoryList(
     """
     Retrieves a list of all inventory items including both raw materials and finished products. The data provided will include item types, quantities, and status. This route is crucial for providing constant inventory updates to the Production Recording and Price Estimation Modules.
 
+    The items are filtered from the shared catalog snapshot, so list requests do not scan the inventory tables.
+
     Args:
         item_type (Optional[str]): Filter by type of item, either 'RawMaterial' or 'FinishedProduct'. This parameter is optional.
-        status (Optional[str]): Filter the inventory items based on their status. Possible status values might include 'in-stock', 'low-stock', 'out-of-stock'. This parameter is optional.
+        status (Optional[str]): Filter the inventory items based on their status. Possible status values might include 'in-stock', 'low-stock', 'out-of-stock'. Low stock means at or below the item's reorder threshold (or the default threshold of its kind). This parameter is optional.
 
     Returns:
         InventoryResponse: Response model for the inventory tracking endpoint. It provides a list of both raw materials and finished products, detailing their type, quantity, and status.
     """
-    query_criteria_raw = {}
-    query_criteria_finished = {}
-    if item_type:
-        if item_type == "RawMaterial":
-            query_criteria_raw["type"] = item_type
-        elif item_type == "FinishedProduct":
-            query_criteria_finished["type"] = item_type
-    if status and status == "in-stock":
-        query_criteria_raw["quantity"] = {"gt": 0}
-        query_criteria_finished["quantity"] = {"gt": 0}
-    elif status and status == "low-stock":
-        query_criteria_raw["quantity"] = {"lte": 10}
-        query_criteria_finished["quantity"] = {"lte": 5}
-    elif status and status == "out-of-stock":
-        query_criteria_raw["quantity"] = 0
-        query_criteria_finished["quantity"] = 0
-    raw_materials = await prisma.models.RawMaterial.prisma().find_many(
-        where=query_criteria_raw
-    )
-    finished_products = await prisma.models.FinishedProduct.prisma().find_many(
-        where=query_criteria_finished
-    )
-    inventory_items = []
-    for raw_material in raw_materials:
-        inventory_items.append(
-            InventoryItem(
-                id=raw_material.id,
-                type="RawMaterial",
-                quantity=raw_material.quantity,
-                unit=raw_material.unit,
-                status="in-stock" if raw_material.quantity > 0 else "out-of-stock",
-            )
+    if item_type and item_type not in ("RawMaterial", "FinishedProduct"):
+        raise ValueError("item_type must be either 'RawMaterial' or 'FinishedProduct'.")
+    if status not in STATUS_FILTERS:
+        raise ValueError(
+            "status must be one of 'in-stock', 'low-stock' or 'out-of-stock'."
         )
-    for finished_product in finished_products:
-        inventory_items.append(
-            InventoryItem(
-                id=finished_product.id,
-                type="FinishedProduct",
-                quantity=finished_product.quantity,
-                unit=finished_product.unit,
-                status="in-stock" if finished_product.quantity > 0 else "out-of-stock",
-            )
+    rows = await project.inventory_catalog.catalog_snapshot.rows()
+    rows = [
+        row
+        for row in rows
+        if (not item_type or row["kind"] == item_type) and STATUS_FILTERS[status](row)
+    ]
+    inventory_items = [
+        InventoryItem(
+            id=row["id"],
+            type=row["kind"],
+            quantity=row["quantity"],
+            unit=row["unit"],
+            status=project.stock_alerts.stock_status(row["quantity"], row["threshold"]),
+            reorder_threshold=row["threshold"],
         )
+        for row in rows
+    ]
     return InventoryResponse(inventory_items=inventory_items)
@@ -3,6 +3,7 @@ from typing import Optional
 
 import prisma
 import prisma.models
+import project.money
 from pydantic import BaseModel
 
 
@@ -59,7 +60,7 @@ async def getInvoice(invoiceId: str) -> GetInvoiceResponse:
         updatedAt=invoice.updatedAt,
         issueDate=invoice.issueDate,
         dueDate=invoice.dueDate,
-        totalAmount=invoice.totalAmount,
+        totalAmount=project.money.from_cents(invoice.totalAmountCents),
         customerContact=CustomerContact(
             id=invoice.CustomerContact.id,
             userId=invoice.CustomerContact.userId,
@@ -0,0 +1,160 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, List, Optional
+
+import prisma
+import project.cache
+import project.money
+from pydantic import BaseModel
+
+GROUP_COLUMNS = {
+    "grade": 'pe."lumberGrade"',
+    "dimension": 'pe."dimensionKey"',
+    "customer": 'q."customerContactId"',
+}
+
+PERIODS = {"day", "week", "month", "quarter", "year"}
+
+
+class MarginGroup(BaseModel):
+    """
+    Revenue, expected profit and margin of one group of price estimates. Only the grouped-by keys are set.
+    """
+
+    lumber_grade: Optional[str] = None
+    dimension: Optional[str] = None
+    customer_contact_id: Optional[str] = None
+    period_start: Optional[date] = None
+    estimate_count: int
+    quantity: int
+    revenue: float
+    expected_profit: float
+    margin_percentage: float
+
+
+class MarginAnalyticsResponse(BaseModel):
+    """
+    Margin analytics over the price estimates created in a date range.
+    """
+
+    start_date: date
+    end_date: date
+    group_by: List[str]
+    period: str
+    groups: List[MarginGroup]
+    revenue: float
+    expected_profit: float
+    margin_percentage: float
+
+
+def margin_percentage(profitCents: int, revenueCents: int) -> float:
+    return round(profitCents * 100 / revenueCents, 2) if revenueCents else 0.0
+
+
+def months_between(start_date: date, end_date: date) -> List[date]:
+    """
+    Returns the first day of every month overlapping the range, i.e. the cache periods the range depends on.
+    """
+    month = start_date.replace(day=1)
+    months = []
+    while month <= end_date:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+
+async def getMarginAnalytics(
+    start_date: date, end_date: date, group_by: str, period: str
+) -> MarginAnalyticsResponse:
+    """
+    Aggregates revenue, expected profit and margin percentage of price estimates by grade, dimension, customer and/or period. The grouping and sums run in the database, so only one row per group is transferred no matter how many estimates the range covers.
+
+    Args:
+        start_date (date): First day of the range (inclusive).
+        end_date (date): Last day of the range (inclusive).
+        group_by (str): Comma-separated grouping keys out of "grade", "dimension", "customer" and "period".
+        period (str): Length of a period when grouping by period: "day", "week", "month", "quarter" or "year".
+
+    Returns:
+        MarginAnalyticsResponse: One row per group plus the totals of the range.
+
+    Example:
+        await getMarginAnalytics(date(2024, 1, 1), date(2024, 12, 31), "grade,period", "quarter")
+        > MarginAnalyticsResponse(groups=[MarginGroup(lumber_grade='A', period_start=date(2024, 1, 1), revenue=12500.0, ...), ...], ...)
+    """
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date.")
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(sorted(PERIODS))}")
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    unknown = [key for key in keys if key not in GROUP_COLUMNS and key != "period"]
+    if unknown:
+        raise ValueError(f"Unknown group_by keys: {', '.join(unknown)}")
+    parameters: List[Any] = [
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    ]
+    select_list = []
+    for key in keys:
+        if key == "period":
+            parameters.append(period)
+            select_list.append(
+                f'date_trunc(${len(parameters)}, pe."createdAt")::date AS "period"'
+            )
+        else:
+            select_list.append(f'{GROUP_COLUMNS[key]} AS "{key}"')
+    join = ' JOIN "Quote" q ON q."id" = pe."quoteId"' if "customer" in keys else ""
+    group_clause = (
+        f" GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+        f" ORDER BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+        if keys
+        else ""
+    )
+    query = (
+        f"SELECT {''.join(column + ', ' for column in select_list)}"
+        ' COUNT(*) AS "estimateCount",'
+        ' COALESCE(SUM(pe."quantity"), 0)::bigint AS "quantity",'
+        ' COALESCE(SUM(pe."priceRateCents" * pe."quantity"), 0)::bigint AS "revenueCents",'
+        ' COALESCE(SUM(pe."expectedProfitCents"), 0)::bigint AS "profitCents"'
+        f' FROM "PriceEstimate" pe{join}'
+        ' WHERE pe."createdAt" >= $1::timestamp AND pe."createdAt" < $2::timestamp'
+        f"{group_clause}"
+    )
+    rows = await prisma.get_client().query_raw(query, *parameters)
+    groups = [
+        MarginGroup(
+            lumber_grade=row.get("grade"),
+            dimension=row.get("dimension"),
+            customer_contact_id=row.get("customer"),
+            period_start=row.get("period"),
+            estimate_count=row["estimateCount"],
+            quantity=row["quantity"],
+            revenue=project.money.from_cents(row["revenueCents"]),
+            expected_profit=project.money.from_cents(row["profitCents"]),
+            margin_percentage=margin_percentage(
+                row["profitCents"], row["revenueCents"]
+            ),
+        )
+        for row in rows
+    ]
+    revenue_cents = project.money.total(row["revenueCents"] for row in rows)
+    profit_cents = project.money.total(row["profitCents"] for row in rows)
+    return MarginAnalyticsResponse(
+        start_date=start_date,
+        end_date=end_date,
+        group_by=keys,
+        period=period,
+        groups=groups,
+        revenue=project.money.from_cents(revenue_cents),
+        expected_profit=project.money.from_cents(profit_cents),
+        margin_percentage=margin_percentage(profit_cents, revenue_cents),
+    )
+
+
+def margin_analytics_tags(res: MarginAnalyticsResponse) -> List[str]:
+    """
+    Cache tags of a margin analytics response: one per calendar month it covers, so a write only drops the cached ranges that include the month of the changed estimate.
+    """
+    return [
+        project.cache.margin_month_tag(month)
+        for month in months_between(res.start_date, res.end_date)
+    ]
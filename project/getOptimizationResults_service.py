@@ -38,5 +38,5 @@ async def getOptimizationResults(optimizationId: str) -> OptimizationDetailsResp
         optimizationId=optimizationId,
         cuttingInstructions=f"Optimize cuts for dimensions {record.lumberDimensions}, Grade: {record.lumberGrade}",
         materialUtilization="Estimated utilization 95%, based on optimization model calculations.",
-        expectedYield=record.expectedProfit / record.priceRate * 100,
+        expectedYield=record.expectedProfitCents / record.priceRateCents * 100,
     )
@@ -3,6 +3,7 @@ from typing import Any, Dict
 
 import prisma
 import prisma.models
+import project.money
 from pydantic import BaseModel
 
 
@@ -41,8 +42,8 @@ async def getPriceEstimate(estimateId: str) -> GetPriceEstimateResponse:
         lumberDimensions=estimate.lumberDimensions,
         lumberGrade=estimate.lumberGrade,
         quantity=estimate.quantity,
-        priceRate=estimate.priceRate,
+        priceRate=project.money.from_cents(estimate.priceRateCents),
         createdAt=estimate.createdAt,
         updatedAt=estimate.updatedAt,
-        expectedProfit=estimate.expectedProfit,
+        expectedProfit=project.money.from_cents(estimate.expectedProfitCents),
     )
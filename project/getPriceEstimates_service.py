@@ -1,58 +1,130 @@
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import prisma
-import prisma.models
+import project.money
+import project.pagination
 from pydantic import BaseModel
 
+MAX_PAGE_SIZE = 200
 
-class GetPriceEstimatesRequest(BaseModel):
-    """
-    Request parameters for fetching all price estimates. This model is straightforward since it does not require any input parameters.
-    """
+FIELD_COLUMNS = {
+    "id": '"id"',
+    "quote_id": '"quoteId"',
+    "lumber_dimensions": '"lumberDimensions"',
+    "lumber_grade": '"lumberGrade"',
+    "quantity": '"quantity"',
+    "price_rate": '"priceRateCents"',
+    "createdAt": '"createdAt"',
+    "updatedAt": '"updatedAt"',
+    "expected_profit": '"expectedProfitCents"',
+}
 
-    pass
+MONEY_FIELDS = {"price_rate", "expected_profit"}
 
 
 class PriceEstimate(BaseModel):
     """
-    Details of the price estimate per lumber requirements.
+    Details of the price estimate per lumber requirements. Only the requested fields are set.
     """
 
-    id: str
-    lumber_dimensions: object
-    lumber_grade: str
-    quantity: int
-    price_rate: float
-    createdAt: datetime
-    updatedAt: datetime
-    expected_profit: float
+    id: Optional[str] = None
+    quote_id: Optional[str] = None
+    lumber_dimensions: Optional[object] = None
+    lumber_grade: Optional[str] = None
+    quantity: Optional[int] = None
+    price_rate: Optional[float] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+    expected_profit: Optional[float] = None
 
 
 class GetPriceEstimatesResponse(BaseModel):
     """
-    Provides a comprehensive list of all price estimates stored in the database, each containing details necessary for review.
+    One page of price estimates, newest first, with the cursor of the next page.
     """
 
     price_estimates: List[PriceEstimate]
+    next_cursor: Optional[str] = None
 
 
 async def getPriceEstimates(
-    request: GetPriceEstimatesRequest,
+    cursor: Optional[str],
+    limit: int,
+    grade: Optional[str],
+    quote_id: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    fields: Optional[str],
 ) -> GetPriceEstimatesResponse:
     """
-    Retrieves a list of all price estimates previously calculated and stored. Useful for reviewing past quotes and prices.
+    Retrieves price estimates previously calculated and stored, newest first. Useful for reviewing past quotes and prices.
+
+    Pages are read with keyset pagination on (createdAt, id), so every page costs one index range scan no matter how deep it is, and only the requested columns are read from the table.
 
     Args:
-        request (GetPriceEstimatesRequest): Request parameters for fetching all price estimates. This model is straightforward since it does not require any input parameters.
+        cursor (Optional[str]): The next_cursor of the previous page; omit for the first page.
+        limit (int): Number of estimates per page, at most 200.
+        grade (Optional[str]): Only return estimates of this lumber grade.
+        quote_id (Optional[str]): Only return estimates belonging to this quote.
+        created_from (Optional[datetime]): Only return estimates created at or after this time.
+        created_to (Optional[datetime]): Only return estimates created before this time.
+        fields (Optional[str]): Comma-separated list of fields to return, e.g. "id,lumber_grade,price_rate". All fields are returned when omitted.
 
     Returns:
-        GetPriceEstimatesResponse: Provides a comprehensive list of all price estimates stored in the database, each containing details necessary for review.
+        GetPriceEstimatesResponse: One page of price estimates with the cursor of the next page.
 
     Example:
-        request = GetPriceEstimatesRequest()
-        response = await getPriceEstimates(request)
-        > GetPriceEstimatesResponse(price_estimates=[prisma.models.PriceEstimate(id='1', ...)])
+        response = await getPriceEstimates(None, 50, "A", None, None, None, "id,price_rate")
+        > GetPriceEstimatesResponse(price_estimates=[PriceEstimate(id='1', price_rate=2.5), ...], next_cursor='WyIyMDI0...')
     """
-    price_estimates = await prisma.models.PriceEstimate.prisma().find_many()
-    return GetPriceEstimatesResponse(price_estimates=price_estimates)
+    project.pagination.check_limit(limit, MAX_PAGE_SIZE)
+    selected = list(FIELD_COLUMNS) if not fields else fields.split(",")
+    selected = [field.strip() for field in selected if field.strip()]
+    unknown = [field for field in selected if field not in FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns = {"id", "createdAt", *selected}
+    conditions: List[str] = []
+    parameters: List[Any] = []
+    if cursor:
+        cursor_created_at, cursor_id = project.pagination.decodeCursor(cursor)
+        parameters.extend([cursor_created_at, cursor_id])
+        conditions.append(
+            f'("createdAt", "id") < (${len(parameters) - 1}::timestamp, ${len(parameters)})'
+        )
+    if grade:
+        parameters.append(grade)
+        conditions.append(f'"lumberGrade" = ${len(parameters)}')
+    if quote_id:
+        parameters.append(quote_id)
+        conditions.append(f'"quoteId" = ${len(parameters)}')
+    if created_from:
+        parameters.append(created_from)
+        conditions.append(f'"createdAt" >= ${len(parameters)}::timestamp')
+    if created_to:
+        parameters.append(created_to)
+        conditions.append(f'"createdAt" < ${len(parameters)}::timestamp')
+    parameters.append(limit + 1)
+    select_list = ", ".join(f'{FIELD_COLUMNS[field]} AS "{field}"' for field in columns)
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f'SELECT {select_list} FROM "PriceEstimate"{where_clause}'
+        f' ORDER BY "createdAt" DESC, "id" DESC LIMIT ${len(parameters)}'
+    )
+    rows = await prisma.get_client().query_raw(query, *parameters)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = project.pagination.encodeCursor(
+            rows[-1]["createdAt"], rows[-1]["id"]
+        )
+    price_estimates = []
+    for row in rows:
+        values: Dict[str, Any] = {field: row[field] for field in selected}
+        for field in MONEY_FIELDS.intersection(values):
+            values[field] = project.money.from_cents(values[field])
+        price_estimates.append(PriceEstimate(**values))
+    return GetPriceEstimatesResponse(
+        price_estimates=price_estimates, next_cursor=next_cursor
+    )
@@ -40,7 +40,7 @@ async def getProductionRecord(recordId: str) -> ProductionRecordResponse:
                                    createdAt=datetime(2023, 1, 20, 14, 50),
                                    updatedAt=datetime(2023, 2, 20, 12, 30))
     """
-    record = await prisma.models.ProductionRecord.prisma().find_unique(
+    record = await prisma.models.ProductionRecord.prisma().find_first(
         where={"id": recordId},
         include={"User": True, "RawMaterial": True, "FinishedProduct": True},
     )
@@ -1,8 +1,8 @@
 from datetime import date
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import prisma
-import prisma.models
+import project.dimensions
 from pydantic import BaseModel
 
 
@@ -18,11 +18,11 @@ class ProductionReportResponse(BaseModel):
     additional_details: Optional[Dict[str, Any]] = None
 
 
-async def filter_records(
+async def read_rollups(
     start_date: date, end_date: date, shift: Optional[str], product_type: Optional[str]
-):
+) -> List[Dict[str, Any]]:
     """
-    Filter production records within the given time range, shift, and product type.
+    Totals the daily production rollups within the given date range, shift, and product type per material type and grade, next to the current finished stock of that type and grade.
 
     Args:
         start_date (date): The starting date for the report range.
@@ -31,15 +31,38 @@ async def filter_records(
         product_type (Optional[str]): Optional product type.
 
     Returns:
-        List of records that match the criteria.
+        One row per material type and grade produced in the range.
     """
-    query_parameters = {
-        "createdAt": {"gte": start_date, "lte": end_date},
-        **({"shift": shift} if shift else {}),
-        **({"type": product_type} if product_type else {}),
-    }
-    return await prisma.models.ProductionRecord.prisma().find_many(
-        where=query_parameters
+    parameters: List[Any] = [start_date.isoformat(), end_date.isoformat()]
+    conditions = ['"day" BETWEEN $1::date AND $2::date', '"recordCount" > 0']
+    if shift:
+        parameters.append(shift)
+        conditions.append(f'"shift" = ${len(parameters)}')
+    if product_type:
+        parameters.append(product_type)
+        conditions.append(f'"materialType" = ${len(parameters)}')
+    return await prisma.get_client().query_raw(
+        f"""
+        WITH produced AS (
+            SELECT "materialType", "grade", SUM("recordCount")::int AS "recordCount",
+                   SUM("quantityProduced")::bigint AS "quantityProduced",
+                   SUM("boardFeet")::float8 AS "boardFeet"
+            FROM "ProductionDailyRollup"
+            WHERE {' AND '.join(conditions)}
+            GROUP BY "materialType", "grade"
+        ),
+        stock AS (
+            SELECT "type", "grade", SUM("quantity")::bigint AS "quantity"
+            FROM "StockLevel"
+            WHERE "kind" = 'FinishedProduct'
+            GROUP BY "type", "grade"
+        )
+        SELECT p.*, COALESCE(s."quantity", 0)::bigint AS "stock"
+        FROM produced p
+        LEFT JOIN stock s ON s."type" = p."materialType" AND s."grade" = p."grade"
+        ORDER BY p."materialType", p."grade"
+        """,
+        *parameters,
     )
 
 
@@ -47,7 +70,9 @@ async def getProductionReport(
     start_date: date, end_date: date, shift: Optional[str], product_type: Optional[str]
 ) -> ProductionReportResponse:
     """
-    Retrieves production reports showing daily volumes and yields. This route gathers data from the Production Recording Module, processes it, and presents a structured report. Expected responses include data groupings by date and shift, possibly in JSON format containing fields like date, total volume, and yield percentage.
+    Retrieves production reports showing daily volumes and yields. This route gathers data from the Production Recording Module, processes it, and presents a structured report. Expected responses include data groupings by date and shift, possibly in JSON format containing fields like date, total volume (in board feet), and yield percentage.
+
+    Reads the per day, shift, material type and grade rollups instead of the production records, so the cost depends on the number of days in the range, not on how much was produced. The yield is the quantity produced as a percentage of the current finished stock of the same types and grades.
 
     Args:
         start_date (date): The starting date for the report range.
@@ -58,14 +83,16 @@ async def getProductionReport(
     Returns:
         ProductionReportResponse: Structured response containing production data grouped by date and shift.
     """
-    records = await filter_records(start_date, end_date, shift, product_type)
-    total_volume = sum((record.quantityProduced for record in records))
-    average_yield = sum(
-        (
-            record.quantityProduced / record.FinishedProduct.quantity * 100
-            for record in records
-        )
-    ) / len(records)
+    groups = await read_rollups(start_date, end_date, shift, product_type)
+    total_volume = sum(group["boardFeet"] for group in groups)
+    pieces_produced = sum(group["quantityProduced"] for group in groups)
+    stocked = [group for group in groups if group["stock"] > 0]
+    stock = sum(group["stock"] for group in stocked)
+    average_yield = (
+        sum(group["quantityProduced"] for group in stocked) / stock * 100
+        if stock
+        else 0.0
+    )
     return ProductionReportResponse(
         date=start_date,
         shift=shift if shift else "All Shifts",
@@ -74,5 +101,11 @@ async def getProductionReport(
         additional_details={
             "product_type": product_type if product_type else "All Types",
             "number_of_days": (end_date - start_date).days + 1,
+            "volume_unit": "board_feet",
+            "total_volume_m3": project.dimensions.board_feet_to_cubic_meters(
+                total_volume
+            ),
+            "pieces_produced": pieces_produced,
+            "records": sum(group["recordCount"] for group in groups),
         },
     )
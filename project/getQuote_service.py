@@ -3,6 +3,7 @@ from typing import List
 
 import prisma
 import prisma.models
+import project.money
 from pydantic import BaseModel
 
 
@@ -68,6 +69,23 @@ async def getQuote(quoteId: str) -> GetQuoteDetailsResponse:
     if quote_record is None:
         raise ValueError(f"No quote found with ID {quoteId}")
     response = GetQuoteDetailsResponse(
-        quote=QuoteDetails(id=quote_record.id, priceEstimate=quote_record.priceEstimate)
+        quote=QuoteDetails(
+            id=quote_record.id,
+            priceEstimate=[
+                PriceEstimate(
+                    id=estimate.id,
+                    lumber_dimensions=estimate.lumberDimensions,
+                    lumber_grade=estimate.lumberGrade,
+                    quantity=estimate.quantity,
+                    price_rate=project.money.from_cents(estimate.priceRateCents),
+                    createdAt=estimate.createdAt,
+                    updatedAt=estimate.updatedAt,
+                    expected_profit=project.money.from_cents(
+                        estimate.expectedProfitCents
+                    ),
+                )
+                for estimate in quote_record.priceEstimate
+            ],
+        )
     )
     return response
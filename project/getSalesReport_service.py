@@ -3,6 +3,7 @@ from typing import List, Optional
 
 import prisma
 import prisma.models
+import project.money
 from pydantic import BaseModel
 
 
@@ -42,28 +43,26 @@ async def getSalesReport(
         where={"issueDate": {"gte": start_date, "lte": end_date}},
         include={"CustomerContact": True},
     )
-    sales_data = {}
+    invoices = [
+        invoice
+        for invoice in invoices
+        if not product_id or product_id == invoice.CustomerContact.id
+    ]
+    revenue_cents = project.money.group_totals(
+        [invoice.CustomerContact.id for invoice in invoices],
+        [invoice.totalAmountCents for invoice in invoices],
+    )
+    sales_dates = {}
     for invoice in invoices:
-        if not product_id or product_id == invoice.CustomerContact.id:
-            if invoice.CustomerContact.id not in sales_data:
-                sales_data[invoice.CustomerContact.id] = {
-                    "total_revenue": 0,
-                    "sales_dates": [],
-                }
-            sales_data[invoice.CustomerContact.id][
-                "total_revenue"
-            ] += invoice.totalAmount
-            sales_data[invoice.CustomerContact.id]["sales_dates"].append(
-                invoice.issueDate
-            )
+        sales_dates.setdefault(invoice.CustomerContact.id, []).append(invoice.issueDate)
     report_response = SalesReportResponse(
         reports=[
             ProductSalesData(
-                product_id=product_id,
-                total_revenue=data["total_revenue"],
-                sales_dates=data["sales_dates"],
+                product_id=customer_id,
+                total_revenue=project.money.from_cents(cents),
+                sales_dates=sales_dates[customer_id],
             )
-            for product_id, data in sales_data.items()
+            for customer_id, cents in revenue_cents.items()
         ]
     )
     return report_response
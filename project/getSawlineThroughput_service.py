@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import List, Optional
+
+import prisma
+from pydantic import BaseModel
+
+
+class ThroughputMinute(BaseModel):
+    """
+    Pieces counted by one machine in one minute.
+    """
+
+    machine_id: str
+    minute: datetime
+    pieces: int
+    samples: int
+
+
+class ThroughputResponse(BaseModel):
+    """
+    Per-minute piece counts of the sawline machines in a time range.
+    """
+
+    minutes: List[ThroughputMinute]
+    total_pieces: int
+
+
+async def getSawlineThroughput(
+    start: datetime, end: datetime, machine_id: Optional[str]
+) -> ThroughputResponse:
+    """
+    Reads the per-minute piece counts folded from machine telemetry.
+
+    Args:
+        start (datetime): Start of the range (inclusive).
+        end (datetime): End of the range (exclusive).
+        machine_id (Optional[str]): Only return this machine.
+
+    Returns:
+        ThroughputResponse: Per-minute piece counts ordered by machine and minute, and their total.
+    """
+    rows = await prisma.get_client().query_raw(
+        """
+        SELECT "machineId", "minute", "pieces", "samples" FROM "TelemetryMinute"
+        WHERE "minute" >= $1::timestamp AND "minute" < $2::timestamp
+          AND ($3::text IS NULL OR "machineId" = $3)
+        ORDER BY "machineId", "minute"
+        """,
+        start,
+        end,
+        machine_id,
+    )
+    minutes = [
+        ThroughputMinute(
+            machine_id=row["machineId"],
+            minute=row["minute"],
+            pieces=row["pieces"],
+            samples=row["samples"],
+        )
+        for row in rows
+    ]
+    return ThroughputResponse(
+        minutes=minutes, total_pieces=sum(minute.pieces for minute in minutes)
+    )
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import List, Optional
+
+import project.inventory_ledger
+from pydantic import BaseModel
+
+
+class StockAsOfItem(BaseModel):
+    """
+    Stock of one inventory item at the requested time. Type, unit and grade are those of the item today and are empty for deleted items.
+    """
+
+    kind: str
+    itemId: str
+    type: Optional[str] = None
+    unit: Optional[str] = None
+    grade: Optional[str] = None
+    quantity: int
+
+
+class StockAsOfResponse(BaseModel):
+    """
+    Point-in-time stock of all inventory items with non-zero stock.
+    """
+
+    at: datetime
+    items: List[StockAsOfItem]
+
+
+async def getStockAsOf(
+    at: datetime, kind: Optional[str], itemId: Optional[str]
+) -> StockAsOfResponse:
+    """
+    Reconstructs the stock levels at a point in time from the inventory ledger, reading the nearest snapshot plus the movements recorded after it.
+
+    Args:
+        at (datetime): The point in time to report the stock for.
+        kind (Optional[str]): Only report 'RawMaterial' or 'FinishedProduct' items.
+        itemId (Optional[str]): Only report this item.
+
+    Returns:
+        StockAsOfResponse: Point-in-time stock of all inventory items with non-zero stock.
+    """
+    rows = await project.inventory_ledger.stockAsOf(at, kind, itemId)
+    return StockAsOfResponse(at=at, items=[StockAsOfItem(**row) for row in rows])
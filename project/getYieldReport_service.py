@@ -47,10 +47,11 @@ async def getYieldReport(
     where_clauses = {}
     if batch_id:
         where_clauses["batch_id"] = batch_id
-    if start_date:
-        where_clauses["createdAt"] = {"gte": start_date}
-    if end_date:
-        where_clauses["updatedAt"] = {"lte": end_date}
+    if start_date or end_date:
+        where_clauses["createdAt"] = {
+            **({"gte": start_date} if start_date else {}),
+            **({"lte": end_date} if end_date else {}),
+        }
     records = await prisma.models.ProductionRecord.prisma().find_many(
         where=where_clauses
     )
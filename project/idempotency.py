@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import prisma
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+
+MAX_CACHED_KEYS = 10000
+
+KEY_TTL = timedelta(hours=24)
+
+PURGE_INTERVAL = timedelta(hours=1)
+
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Request bodies up to this size are hashed into the fingerprint. Larger or chunked
+# bodies, e.g. CSV inventory imports, are streamed to the endpoint unread.
+MAX_HASHED_BODY = 1024 * 1024
+
+
+class StoredResponse(NamedTuple):
+    """
+    The response first sent for an idempotency key. statusCode is None while that request is still being processed.
+    """
+
+    fingerprint: str
+    statusCode: Optional[int]
+    contentType: str
+    body: str
+
+
+class IdempotencyStore:
+    """
+    Remembers the responses of POST requests by their Idempotency-Key header.
+
+    Completed responses are kept in an LRU of the MAX_CACHED_KEYS most recent keys, so a
+    retry seen by this process is answered without a query. Otherwise one upsert on the
+    "IdempotencyKey" primary key either claims the key for this request or returns what
+    is stored for it, which also makes concurrent retries on other processes see the key
+    as taken. Keys are kept for KEY_TTL; a claim whose response was never stored, e.g.
+    because the process died, can be taken over by a retry after CLAIM_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        max_cached: int = MAX_CACHED_KEYS,
+        ttl: timedelta = KEY_TTL,
+        purge_interval: timedelta = PURGE_INTERVAL,
+    ) -> None:
+        self.max_cached = max_cached
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._cache: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _remember(self, key: str, stored: StoredResponse) -> None:
+        self._cache[key] = stored
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Claims a key for a new request.
+
+        Args:
+            key (str): The Idempotency-Key header.
+            fingerprint (str): Method, path, query string and body hash of the request; a key may only be reused for the same one.
+
+        Returns:
+            Optional[StoredResponse]: None if the key was claimed and the request should be processed, otherwise what is stored for the key.
+        """
+        stored = self._cache.get(key)
+        if stored is not None:
+            self._cache.move_to_end(key)
+            return stored
+        if key in self._in_flight:
+            return StoredResponse(fingerprint, None, "", "")
+        self._in_flight.add(key)
+        try:
+            row = await prisma.get_client().query_first(
+                """
+                WITH claimed AS (
+                    INSERT INTO "IdempotencyKey" ("key", "fingerprint")
+                    VALUES ($1, $2)
+                    ON CONFLICT ("key") DO UPDATE
+                    SET "fingerprint" = EXCLUDED."fingerprint", "createdAt" = now()
+                    WHERE "IdempotencyKey"."statusCode" IS NULL
+                      AND "IdempotencyKey"."createdAt" < now() - $3::interval
+                    RETURNING "key"
+                )
+                SELECT NULL AS "fingerprint", NULL::int AS "statusCode", '' AS "contentType",
+                       '' AS "body", true AS "claimed"
+                FROM claimed
+                UNION ALL
+                SELECT "fingerprint", "statusCode", "contentType", "body", false
+                FROM "IdempotencyKey"
+                WHERE "key" = $1 AND NOT EXISTS (SELECT 1 FROM claimed)
+                """,
+                key,
+                fingerprint,
+                f"{int(CLAIM_TIMEOUT.total_seconds())} seconds",
+            )
+        except BaseException:
+            self._in_flight.discard(key)
+            raise
+        if row and row["claimed"]:
+            return None
+        if row is None:
+            # The conflicting claim committed after this statement's snapshot was taken.
+            self._in_flight.discard(key)
+            return StoredResponse(fingerprint, None, "", "")
+        self._in_flight.discard(key)
+        stored = StoredResponse(
+            row["fingerprint"], row["statusCode"], row["contentType"], row["body"]
+        )
+        if stored.statusCode is not None:
+            self._remember(key, stored)
+        return stored
+
+    async def complete(
+        self, key: str, fingerprint: str, statusCode: int, contentType: str, body: str
+    ) -> None:
+        """
+        Stores the response of a claimed key.
+        """
+        try:
+            await prisma.get_client().execute_raw(
+                """
+                UPDATE "IdempotencyKey"
+                SET "statusCode" = $2, "contentType" = $3, "body" = $4
+                WHERE "key" = $1
+                """,
+                key,
+                statusCode,
+                contentType,
+                body,
+            )
+            self._remember(
+                key, StoredResponse(fingerprint, statusCode, contentType, body)
+            )
+        finally:
+            self._in_flight.discard(key)
+
+    async def abandon(self, key: str) -> None:
+        """
+        Releases a claimed key whose request failed, so a retry is processed again.
+        """
+        try:
+            await prisma.get_client().execute_raw(
+                'DELETE FROM "IdempotencyKey" WHERE "key" = $1 AND "statusCode" IS NULL',
+                key,
+            )
+        finally:
+            self._in_flight.discard(key)
+
+    def start(self) -> None:
+        """
+        Starts purging keys older than the TTL.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await prisma.get_client().execute_raw(
+                    """
+                    DELETE FROM "IdempotencyKey"
+                    WHERE "createdAt" < now() - $1::interval
+                       OR ("statusCode" IS NULL AND "createdAt" < now() - $2::interval)
+                    """,
+                    f"{int(self.ttl.total_seconds())} seconds",
+                    f"{int(CLAIM_TIMEOUT.total_seconds())} seconds",
+                )
+            except Exception:
+                logger.exception("Failed to purge idempotency keys")
+            await asyncio.sleep(self.purge_interval.total_seconds())
+
+
+idempotency_keys = IdempotencyStore()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware making POST requests with an Idempotency-Key header safe to retry.
+
+    The first request with a key is processed and its response stored; a retry gets the
+    stored response with an Idempotent-Replayed header and never reaches the endpoint.
+    Responses with a 5xx status are not stored, so the retry is processed again. A retry
+    while the first request is still running gets 409, and reusing a key for another
+    path, query string or body gets 422. Bodies of at most MAX_HASHED_BODY bytes with a
+    Content-Length are read up front to be hashed and then replayed to the endpoint;
+    larger or chunked uploads are streamed through and only their headers count.
+    """
+
+    def __init__(self, app: Any, store: IdempotencyStore = idempotency_keys) -> None:
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        key = key.decode("latin-1")
+        fingerprint = (
+            f"POST {scope['path']}?{scope.get('query_string', b'').decode('latin-1')}"
+        )
+        read = await self._read_body(scope, receive)
+        if read is None:
+            return
+        digest, receive = read
+        if digest:
+            fingerprint = f"{fingerprint} {digest}"
+        stored = await self.store.claim(key, fingerprint)
+        if stored is not None:
+            await self._replay(send, fingerprint, stored)
+            return
+        status: List[int] = [500]
+        content_type: List[str] = ["application/json"]
+        chunks: List[bytes] = []
+
+        async def capture(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type[0] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.abandon(key)
+            raise
+        try:
+            if status[0] >= 500:
+                await self.store.abandon(key)
+            else:
+                await self.store.complete(
+                    key,
+                    fingerprint,
+                    status[0],
+                    content_type[0],
+                    b"".join(chunks).decode("utf-8", errors="replace"),
+                )
+        except Exception:
+            logger.exception("Failed to store the response of idempotency key %s", key)
+
+    async def _read_body(
+        self, scope: Dict[str, Any], receive: Any
+    ) -> Optional[Tuple[str, Any]]:
+        """
+        Reads and hashes a request body of known size up to MAX_HASHED_BODY bytes. Returns the hex digest ("" for a streamed body) and the receive callable the endpoint should read the body from, or None if the client disconnected.
+        """
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is None or not length.isdigit() or int(length) > MAX_HASHED_BODY:
+            return "", receive
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        sent = [False]
+
+        async def replay() -> Dict[str, Any]:
+            if sent[0]:
+                return await receive()
+            sent[0] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return hashlib.sha256(body).hexdigest(), replay
+
+    async def _replay(
+        self, send: Any, fingerprint: str, stored: StoredResponse
+    ) -> None:
+        headers = [(b"idempotent-replayed", b"true")]
+        if stored.fingerprint != fingerprint:
+            status = 422
+            body = b'{"error": "Idempotency-Key was already used for another request."}'
+            content_type = "application/json"
+        elif stored.statusCode is None:
+            status = 409
+            body = b'{"error": "A request with this Idempotency-Key is still being processed."}'
+            content_type = "application/json"
+            headers.append((b"retry-after", b"1"))
+        else:
+            status = stored.statusCode
+            body = stored.body.encode()
+            content_type = stored.contentType
+        headers.append((b"content-type", content_type.encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
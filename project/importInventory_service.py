@@ -0,0 +1,304 @@
+import codecs
+import csv
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import project.inventory_events
+import project.pg_copy
+import project.stock_levels
+from pydantic import BaseModel
+
+MAX_REPORTED_ERRORS = 20
+
+STAGING_COLUMNS = [
+    "line",
+    "id",
+    "type",
+    "grade",
+    "quantity",
+    "unit",
+    "thicknessIn",
+    "widthIn",
+    "lengthFt",
+    "reorderThreshold",
+]
+
+# CSV columns per kind: (column, parser, required). Other columns, e.g. the version
+# written by the export, are ignored.
+IMPORT_COLUMNS: Dict[str, List[Tuple[str, Callable[[str], Any], bool]]] = {
+    project.stock_levels.RAW_MATERIAL: [
+        ("id", str, False),
+        ("type", str, True),
+        ("quantity", int, True),
+        ("unit", str, True),
+        ("reorderThreshold", int, False),
+    ],
+    project.stock_levels.FINISHED_PRODUCT: [
+        ("id", str, False),
+        ("type", str, True),
+        ("grade", str, True),
+        ("quantity", int, True),
+        ("unit", str, True),
+        ("thicknessIn", float, False),
+        ("widthIn", float, False),
+        ("lengthFt", float, False),
+        ("reorderThreshold", int, False),
+    ],
+}
+
+MERGE_SQL = {
+    project.stock_levels.RAW_MATERIAL: {
+        "table": '"RawMaterial"',
+        "grade": "''",
+        "reserved": "0",
+        "set": "",
+        "insert_columns": "",
+        "insert_values": "",
+    },
+    project.stock_levels.FINISHED_PRODUCT: {
+        "table": '"FinishedProduct"',
+        "grade": 't."grade"',
+        "reserved": 't."reservedQuantity"',
+        "set": """
+            "grade" = s."grade",
+            "thicknessIn" = COALESCE(s."thicknessIn", t."thicknessIn"),
+            "widthIn" = COALESCE(s."widthIn", t."widthIn"),
+            "lengthFt" = COALESCE(s."lengthFt", t."lengthFt"),
+            """,
+        "insert_columns": '"grade", "thicknessIn", "widthIn", "lengthFt", ',
+        "insert_values": 's."grade", s."thicknessIn", s."widthIn", s."lengthFt", ',
+    },
+}
+
+
+class ImportInventoryResponse(BaseModel):
+    """
+    Summary of a bulk inventory import.
+    """
+
+    kind: str
+    rows: int
+    created: int
+    updated: int
+
+
+async def csv_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, List[str]]]:
+    """
+    Splits a streamed CSV document into (line number, fields) without buffering more than one chunk. Fields must not contain line breaks.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+    final = False
+    chunk_iterator = chunks.__aiter__()
+    while not final:
+        try:
+            pending += decoder.decode(await chunk_iterator.__anext__())
+        except StopAsyncIteration:
+            pending += decoder.decode(b"", final=True) + "\n"
+            final = True
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, next(csv.reader([line]))
+
+
+async def staged_records(
+    kind: str, chunks: AsyncIterator[bytes], errors: List[str]
+) -> AsyncIterator[Tuple[Any, ...]]:
+    """
+    Validates CSV rows as they stream in and yields them as staging table records. Invalid rows are skipped and described in `errors`.
+    """
+    columns = IMPORT_COLUMNS[kind]
+    positions: Optional[Dict[str, int]] = None
+    async for line_number, fields in csv_lines(chunks):
+        if positions is None:
+            positions = {name.strip(): i for i, name in enumerate(fields)}
+            missing = [
+                name
+                for name, _, required in columns
+                if required and name not in positions
+            ]
+            if missing:
+                errors.append(f"Missing columns: {', '.join(missing)}")
+                return
+            continue
+        values: Dict[str, Any] = {"line": line_number}
+        try:
+            for name, parse, required in columns:
+                position = positions.get(name)
+                raw = (
+                    fields[position].strip()
+                    if position is not None and position < len(fields)
+                    else ""
+                )
+                if not raw:
+                    if required:
+                        raise ValueError(f"{name} is required")
+                    values[name] = None
+                    continue
+                values[name] = parse(raw)
+            if values["quantity"] < 0:
+                raise ValueError("quantity must not be negative")
+            for name in ("thicknessIn", "widthIn", "lengthFt"):
+                if values.get(name) is not None and values[name] <= 0:
+                    raise ValueError(f"{name} must be positive")
+            if (
+                values.get("reorderThreshold") is not None
+                and values["reorderThreshold"] < 0
+            ):
+                raise ValueError("reorderThreshold must not be negative")
+        except ValueError as e:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"line {line_number}: {e}")
+            else:
+                errors[-1] = "... more invalid rows"
+            continue
+        yield tuple(values.get(column) for column in STAGING_COLUMNS)
+
+
+async def importInventory(
+    kind: str, chunks: AsyncIterator[bytes]
+) -> ImportInventoryResponse:
+    """
+    Imports raw materials or finished products from a CSV stocktake. The rows are validated while they stream in and copied with COPY into a temporary staging table, then merged in one set-based statement: rows with an id set the quantity and attributes of that item, rows without an id create a new item. Stock counters and ledger movements (ADJUSTMENT for changed quantities, RECEIPT for new items) are written by the same statement. Memory use is flat however many rows are imported, and either the whole file is imported or nothing is.
+
+    Args:
+        kind (str): Either 'RawMaterial' or 'FinishedProduct'.
+        chunks (AsyncIterator[bytes]): The CSV document with a header row, e.g. the request body.
+
+    Returns:
+        ImportInventoryResponse: The number of imported, created and updated items.
+
+    Raises:
+        ValueError: If the kind is unknown, a row is invalid, an id is unknown or repeated, or a finished product would drop below its reserved quantity.
+
+    Example:
+        await importInventory('RawMaterial', request.stream())
+        > ImportInventoryResponse(kind='RawMaterial', rows=100000, created=120, updated=99880)
+    """
+    if kind not in IMPORT_COLUMNS:
+        raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+    sql = MERGE_SQL[kind]
+    errors: List[str] = []
+    async with project.pg_copy.copy_connection() as connection:
+        async with connection.transaction():
+            await connection.execute("""
+                CREATE TEMP TABLE "InventoryImport" (
+                    "line" int, "id" text, "type" text, "grade" text, "quantity" int,
+                    "unit" text, "thicknessIn" double precision, "widthIn" double precision,
+                    "lengthFt" double precision, "reorderThreshold" int
+                ) ON COMMIT DROP
+                """)
+            await connection.copy_records_to_table(
+                "InventoryImport",
+                records=staged_records(kind, chunks, errors),
+                columns=STAGING_COLUMNS,
+            )
+            if errors:
+                raise ValueError("Invalid import: " + "; ".join(errors))
+            await connection.execute(f"""
+                SELECT 1 FROM {sql["table"]} t JOIN "InventoryImport" s ON s."id" = t."id"
+                ORDER BY t."id" FOR UPDATE OF t
+                """)
+            problems = await connection.fetch(
+                f"""
+                SELECT "line", 'id ' || "id" || ' appears more than once' AS "problem"
+                FROM (
+                    SELECT "id", MIN("line") AS "line" FROM "InventoryImport"
+                    WHERE "id" IS NOT NULL GROUP BY "id" HAVING COUNT(*) > 1
+                ) d
+                UNION ALL
+                SELECT s."line", 'unknown id ' || s."id"
+                FROM "InventoryImport" s
+                WHERE s."id" IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM {sql["table"]} t WHERE t."id" = s."id")
+                UNION ALL
+                SELECT s."line", 'quantity below the reserved quantity ' || {sql["reserved"]}
+                FROM "InventoryImport" s JOIN {sql["table"]} t ON t."id" = s."id"
+                WHERE s."quantity" < {sql["reserved"]}
+                ORDER BY 1 LIMIT $1
+                """,
+                MAX_REPORTED_ERRORS,
+            )
+            if problems:
+                raise ValueError(
+                    "Invalid import: "
+                    + "; ".join(
+                        f"line {row['line']}: {row['problem']}" for row in problems
+                    )
+                )
+            counts = await connection.fetchrow(
+                f"""
+                WITH before AS (
+                    SELECT t."id", t."type", {sql["grade"]} AS "grade", t."unit",
+                           t."quantity", {sql["reserved"]} AS "reservedQuantity"
+                    FROM {sql["table"]} t JOIN "InventoryImport" s ON s."id" = t."id"
+                ),
+                updated AS (
+                    UPDATE {sql["table"]} t
+                    SET "type" = s."type",
+                        "quantity" = s."quantity",
+                        "unit" = s."unit",
+                        {sql["set"]}
+                        "reorderThreshold" = COALESCE(s."reorderThreshold", t."reorderThreshold"),
+                        "version" = t."version" + 1,
+                        "updatedAt" = now()
+                    FROM "InventoryImport" s
+                    WHERE t."id" = s."id"
+                    RETURNING t."id", t."type", {sql["grade"]} AS "grade", t."unit",
+                              t."quantity", {sql["reserved"]} AS "reservedQuantity"
+                ),
+                inserted AS (
+                    INSERT INTO {sql["table"]} AS t
+                        ("type", "quantity", "unit", {sql["insert_columns"]}"reorderThreshold", "updatedAt")
+                    SELECT s."type", s."quantity", s."unit", {sql["insert_values"]}s."reorderThreshold", now()
+                    FROM "InventoryImport" s
+                    WHERE s."id" IS NULL
+                    RETURNING t."id", t."type", {sql["grade"]} AS "grade", t."unit",
+                              t."quantity", {sql["reserved"]} AS "reservedQuantity"
+                ),
+                movements AS (
+                    INSERT INTO "InventoryMovement" ("kind", "itemId", "type", "quantityDelta", "reason")
+                    SELECT $1, u."id", 'ADJUSTMENT'::"MovementType", u."quantity" - b."quantity", 'Stocktake import'
+                    FROM updated u JOIN before b ON b."id" = u."id"
+                    WHERE u."quantity" <> b."quantity"
+                    UNION ALL
+                    SELECT $1, i."id", 'RECEIPT'::"MovementType", i."quantity", 'Stocktake import'
+                    FROM inserted i
+                    WHERE i."quantity" <> 0
+                ),
+                counters AS (
+                    INSERT INTO "StockLevel" ("kind", "type", "grade", "unit", "quantity", "reservedQuantity", "itemCount", "updatedAt")
+                    SELECT $1, d."type", d."grade", d."unit", SUM(d."quantity")::int,
+                           SUM(d."reservedQuantity")::int, SUM(d."itemCount")::int, now()
+                    FROM (
+                        SELECT "type", "grade", "unit", -"quantity" AS "quantity",
+                               -"reservedQuantity" AS "reservedQuantity", -1 AS "itemCount"
+                        FROM before
+                        UNION ALL
+                        SELECT "type", "grade", "unit", "quantity", "reservedQuantity", 1 FROM updated
+                        UNION ALL
+                        SELECT "type", "grade", "unit", "quantity", "reservedQuantity", 1 FROM inserted
+                    ) d
+                    GROUP BY d."type", d."grade", d."unit"
+                    ON CONFLICT ("kind", "type", "grade", "unit") DO UPDATE
+                    SET "quantity" = "StockLevel"."quantity" + EXCLUDED."quantity",
+                        "reservedQuantity" = "StockLevel"."reservedQuantity" + EXCLUDED."reservedQuantity",
+                        "itemCount" = "StockLevel"."itemCount" + EXCLUDED."itemCount",
+                        "updatedAt" = now()
+                )
+                SELECT (SELECT COUNT(*) FROM updated)::int AS "updated",
+                       (SELECT COUNT(*) FROM inserted)::int AS "created"
+                """,
+                kind,
+            )
+    project.inventory_events.inventory_reloaded()
+    return ImportInventoryResponse(
+        kind=kind,
+        rows=counts["updated"] + counts["created"],
+        created=counts["created"],
+        updated=counts["updated"],
+    )
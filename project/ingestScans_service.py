@@ -0,0 +1,48 @@
+from typing import List
+
+import project.scan_ingest
+from pydantic import BaseModel
+
+
+class ScanBatchRequest(BaseModel):
+    """
+    Scans posted by one scanner; a scanner may post a single scan or several it collected.
+    """
+
+    scans: List[project.scan_ingest.ScanEvent]
+
+
+class ScanBatchResponse(BaseModel):
+    """
+    Acknowledgement that the scans were queued for writing.
+    """
+
+    accepted: int
+    pending: int
+
+
+async def ingestScans(request: ScanBatchRequest) -> ScanBatchResponse:
+    """
+    Accepts barcode/RFID scans of existing items into the write-behind buffer. The scans are written to the inventory ledger and item quantities within about 100 ms in micro-batches shared with all other scanners, so the request does not wait for the database.
+
+    Args:
+        request (ScanBatchRequest): The scans to record.
+
+    Returns:
+        ScanBatchResponse: The number of accepted scans and of scans waiting to be written.
+
+    Raises:
+        ValueError: If a scan has an unknown kind or item.
+        ScanBufferFull: If too many scans are waiting to be written.
+
+    Example:
+        await ingestScans(ScanBatchRequest(scans=[ScanEvent(itemId="fp-1", kind="FinishedProduct", scannerId="green-chain-1")]))
+        > ScanBatchResponse(accepted=1, pending=37)
+    """
+    unknown = await project.scan_ingest.unknown_items(request.scans)
+    if unknown:
+        raise ValueError(
+            f"Unknown items: {', '.join(f'{kind} {item_id}' for kind, item_id in unknown)}."
+        )
+    pending = project.scan_ingest.scan_buffer.submit(request.scans)
+    return ScanBatchResponse(accepted=len(request.scans), pending=pending)
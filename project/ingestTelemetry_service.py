@@ -0,0 +1,42 @@
+from typing import List
+
+import project.telemetry
+from pydantic import BaseModel
+
+
+class TelemetryBatch(BaseModel):
+    """
+    Counter samples forwarded by the PLC bridge, possibly from several machines.
+    """
+
+    samples: List[project.telemetry.TelemetrySample]
+
+
+class TelemetryBatchResponse(BaseModel):
+    """
+    How many samples of the batch were applied and how many were duplicates of samples already received.
+    """
+
+    accepted: int
+    duplicates: int
+
+
+async def ingestTelemetry(batch: TelemetryBatch) -> TelemetryBatchResponse:
+    """
+    Accepts machine counter samples from the sawline bridge. Samples are deduplicated by sequence number per machine and folded into per-minute production rows, which are written in the background.
+
+    Args:
+        batch (TelemetryBatch): The samples to apply.
+
+    Returns:
+        TelemetryBatchResponse: The number of applied and duplicate samples.
+
+    Raises:
+        TelemetryBufferFull: If too many rows are waiting to be written.
+
+    Example:
+        await ingestTelemetry(TelemetryBatch(samples=[TelemetrySample(machineId="headrig", sequence=1042, recordedAt=datetime(2024, 5, 2, 7, 31, 12), pieces=3)]))
+        > TelemetryBatchResponse(accepted=1, duplicates=0)
+    """
+    accepted, duplicates = project.telemetry.telemetry_buffer.submit(batch.samples)
+    return TelemetryBatchResponse(accepted=accepted, duplicates=duplicates)
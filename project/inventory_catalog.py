@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import prisma
+import project.stock_alerts
+
+# One row per raw material and finished product with a kind discriminator. The kind is
+# a constant per branch, so a filter on it prunes the other table and every lookup uses
+# the indexes of the underlying table.
+CATALOG_VIEW = f"""
+    CREATE OR REPLACE VIEW "InventoryCatalog" AS
+    SELECT 'RawMaterial'::text AS "kind", "id", "type", ''::text AS "grade", "quantity",
+           0 AS "reservedQuantity", "unit",
+           COALESCE("reorderThreshold", {project.stock_alerts.DEFAULT_REORDER_THRESHOLDS["RawMaterial"]}) AS "threshold",
+           NULL::double precision AS "thicknessIn", NULL::double precision AS "widthIn",
+           NULL::double precision AS "lengthFt", "version", "updatedAt"
+    FROM "RawMaterial"
+    UNION ALL
+    SELECT 'FinishedProduct'::text, "id", "type", "grade", "quantity",
+           "reservedQuantity", "unit",
+           COALESCE("reorderThreshold", {project.stock_alerts.DEFAULT_REORDER_THRESHOLDS["FinishedProduct"]}),
+           "thicknessIn", "widthIn", "lengthFt", "version", "updatedAt"
+    FROM "FinishedProduct"
+    """
+
+CATALOG_COLUMNS = (
+    '"kind", "id", "type", "grade", "quantity", "reservedQuantity", "unit",'
+    ' "threshold", "thicknessIn", "widthIn", "lengthFt", "version"'
+)
+
+
+async def createCatalogView() -> None:
+    """
+    Creates or updates the "InventoryCatalog" view. Run on startup, after the schema is pushed.
+    """
+    await prisma.get_client().execute_raw(CATALOG_VIEW)
+
+
+async def find_item(itemId: str) -> Optional[Dict[str, Any]]:
+    """
+    Looks up a raw material or finished product by ID with one query.
+    """
+    return await prisma.get_client().query_first(
+        f'SELECT {CATALOG_COLUMNS} FROM "InventoryCatalog" WHERE "id" = $1', itemId
+    )
+
+
+class CatalogSnapshot:
+    """
+    Shared in-memory copy of the inventory catalog for the list endpoints.
+
+    The first read loads the whole catalog with one query; afterwards writers report the
+    items they touched through `notify` and only those rows are re-read before the next
+    read, so repeated and concurrent list requests share one copy instead of each
+    scanning both tables.
+    """
+
+    def __init__(self) -> None:
+        self._rows: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None
+        self._pending: Set[str] = set()
+        self._lock = asyncio.Lock()
+
+    def notify(self, items: Iterable[Tuple[str, str]]) -> None:
+        self._pending.update(item_id for _, item_id in items)
+
+    def reset(self) -> None:
+        """
+        Drops the copy, e.g. after a bulk import; the next read reloads the whole catalog.
+        """
+        self._rows = None
+
+    async def rows(self) -> List[Dict[str, Any]]:
+        """
+        Returns the catalog rows ordered by kind and ID.
+        """
+        async with self._lock:
+            if self._rows is None:
+                self._pending = set()
+                rows = await prisma.get_client().query_raw(
+                    f'SELECT {CATALOG_COLUMNS} FROM "InventoryCatalog"'
+                )
+                self._rows = {(row["kind"], row["id"]): row for row in rows}
+            elif self._pending:
+                await self._refresh()
+            return [self._rows[key] for key in sorted(self._rows)]
+
+    async def _refresh(self) -> None:
+        item_ids, self._pending = list(self._pending), set()
+        try:
+            rows = await prisma.get_client().query_raw(
+                f'SELECT {CATALOG_COLUMNS} FROM "InventoryCatalog" WHERE "id" = ANY($1::text[])',
+                item_ids,
+            )
+        except Exception:
+            self._pending.update(item_ids)
+            raise
+        for item_id in item_ids:
+            self._rows.pop(("RawMaterial", item_id), None)
+            self._rows.pop(("FinishedProduct", item_id), None)
+        for row in rows:
+            self._rows[(row["kind"], row["id"])] = row
+
+
+catalog_snapshot = CatalogSnapshot()
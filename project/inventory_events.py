@@ -0,0 +1,29 @@
+from typing import Iterable, Tuple
+
+import project.cache
+import project.inventory_catalog
+import project.product_search
+import project.stock_alerts
+
+
+def inventory_changed(items: Iterable[Tuple[str, str]]) -> None:
+    """
+    Tells the in-process views of the inventory which (kind, itemId) items a committed write touched: the stock alert engine, the dimension search index, the shared catalog snapshot and the cached inventory aggregates. Call after the transaction commits.
+    """
+    keys = set(items)
+    if not keys:
+        return
+    project.stock_alerts.stock_alerts.notify(keys)
+    project.product_search.product_index.notify(keys)
+    project.inventory_catalog.catalog_snapshot.notify(keys)
+    project.cache.response_cache.invalidate(project.cache.INVENTORY_TAG)
+
+
+def inventory_reloaded() -> None:
+    """
+    Tells the in-process views of the inventory that a committed bulk write, e.g. an import, may have touched any item. They reload wholesale instead of being handed every item ID.
+    """
+    project.stock_alerts.stock_alerts.notify_all()
+    project.product_search.product_index.reset()
+    project.inventory_catalog.catalog_snapshot.reset()
+    project.cache.response_cache.invalidate(project.cache.INVENTORY_TAG)
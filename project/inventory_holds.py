@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import prisma
+import project.quote_expiry
+
+logger = logging.getLogger(__name__)
+
+PERSIST_INTERVAL = 1.0
+
+
+class Hold(NamedTuple):
+    """
+    Stock of one item held for an owner, e.g. ("optimization", requestId), until it expires or is released.
+    """
+
+    id: str
+    kind: str
+    itemId: str
+    quantity: int
+    ownerType: str
+    ownerId: str
+    expiresAt: datetime
+
+
+class HoldTable:
+    """
+    In-memory table of stock holds used for admission control.
+
+    Admission checks available = on-hand - held and records the hold without awaiting in
+    between, so concurrent requests in this process can never both claim the same stock,
+    and no database row is locked for it. Holds expire through a deadline heap. Created
+    and released holds are persisted to "InventoryHold" by a background task so the table
+    can be rebuilt after a restart; losing the last second of changes in a crash only
+    means a hold lives until its TTL or disappears early.
+    """
+
+    def __init__(self, persist_interval: float = PERSIST_INTERVAL) -> None:
+        self.persist_interval = persist_interval
+        self._holds: Dict[str, Hold] = {}
+        self._held: Dict[Tuple[str, str], int] = {}
+        self._created: List[Hold] = []
+        self._released: Dict[str, datetime] = {}
+        self._expiry = project.quote_expiry.DeadlineScheduler(self._expire)
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def held(self, kind: str, itemId: str) -> int:
+        return self._held.get((kind, itemId), 0)
+
+    def acquire_first(
+        self,
+        kind: str,
+        candidates: Iterable[Tuple[str, int]],
+        quantity: int,
+        ownerType: str,
+        ownerId: str,
+        ttl: timedelta,
+    ) -> Optional[Hold]:
+        """
+        Holds `quantity` of the first candidate item that has that much available.
+
+        Args:
+            kind (str): Kind of the candidate items.
+            candidates (Iterable[Tuple[str, int]]): (itemId, on-hand quantity) in order of preference.
+            quantity (int): Quantity to hold.
+            ownerType (str): What holds the stock, e.g. "optimization".
+            ownerId (str): ID of the owner.
+            ttl (timedelta): How long the hold lives unless released earlier.
+
+        Returns:
+            Optional[Hold]: The new hold, or None if no candidate has enough available stock.
+        """
+        for itemId, on_hand in candidates:
+            if on_hand - self.held(kind, itemId) >= quantity:
+                hold = Hold(
+                    uuid.uuid4().hex,
+                    kind,
+                    itemId,
+                    quantity,
+                    ownerType,
+                    ownerId,
+                    datetime.now(timezone.utc) + ttl,
+                )
+                self._add(hold)
+                self._created.append(hold)
+                self._expiry.schedule(hold.id, hold.expiresAt)
+                return hold
+        return None
+
+    def release(self, ownerType: str, ownerId: str) -> List[Hold]:
+        """
+        Releases every hold of an owner and returns them.
+        """
+        holds = [
+            hold
+            for hold in self._holds.values()
+            if hold.ownerType == ownerType and hold.ownerId == ownerId
+        ]
+        now = datetime.now(timezone.utc)
+        for hold in holds:
+            self._remove(hold.id, now)
+            self._expiry.cancel(hold.id)
+        return holds
+
+    def _add(self, hold: Hold) -> None:
+        self._holds[hold.id] = hold
+        key = (hold.kind, hold.itemId)
+        self._held[key] = self._held.get(key, 0) + hold.quantity
+
+    def _remove(self, holdId: str, at: datetime) -> None:
+        hold = self._holds.pop(holdId, None)
+        if hold is None:
+            return
+        key = (hold.kind, hold.itemId)
+        self._held[key] -= hold.quantity
+        if not self._held[key]:
+            del self._held[key]
+        self._released[holdId] = at
+
+    async def _expire(self, holdIds: List[str], now: datetime) -> None:
+        for holdId in holdIds:
+            self._remove(holdId, now)
+
+    async def load(self) -> None:
+        """
+        Rebuilds the table from the unreleased, unexpired holds in the database and starts expiry and persistence.
+        """
+        rows = await prisma.get_client().query_raw("""
+            SELECT "id", "kind", "itemId", "quantity", "ownerType", "ownerId", "expiresAt"
+            FROM "InventoryHold"
+            WHERE "releasedAt" IS NULL AND "expiresAt" > now()
+            """)
+        self._holds, self._held = {}, {}
+        for row in rows:
+            self._add(
+                Hold(
+                    **{
+                        **row,
+                        "expiresAt": project.quote_expiry.as_utc(row["expiresAt"]),
+                    }
+                )
+            )
+        self._expiry.load((hold.id, hold.expiresAt) for hold in self._holds.values())
+        self._expiry.start()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops expiry and persistence after persisting the pending changes.
+        """
+        await self._expiry.stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception:
+                logger.exception("Failed to persist inventory holds")
+
+    async def persist(self) -> None:
+        """
+        Writes the holds created and released since the last call with one insert and one update.
+        """
+        created, self._created = self._created, []
+        released, self._released = self._released, {}
+        try:
+            await persist_holds(created, released)
+        except BaseException:
+            self._created[:0] = created
+            self._released = {**released, **self._released}
+            raise
+
+
+async def persist_holds(created: Sequence[Hold], released: Dict[str, datetime]) -> None:
+    if not created and not released:
+        return
+    async with prisma.get_client().tx() as transaction:
+        if created:
+            await transaction.execute_raw(
+                """
+                INSERT INTO "InventoryHold" ("id", "kind", "itemId", "quantity", "ownerType", "ownerId", "expiresAt")
+                SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::int[], $5::text[], $6::text[], $7::timestamp[])
+                ON CONFLICT ("id") DO NOTHING
+                """,
+                [hold.id for hold in created],
+                [hold.kind for hold in created],
+                [hold.itemId for hold in created],
+                [hold.quantity for hold in created],
+                [hold.ownerType for hold in created],
+                [hold.ownerId for hold in created],
+                [hold.expiresAt.replace(tzinfo=None) for hold in created],
+            )
+        if released:
+            await transaction.execute_raw(
+                """
+                UPDATE "InventoryHold" h
+                SET "releasedAt" = r."releasedAt"
+                FROM unnest($1::text[], $2::timestamp[]) AS r("id", "releasedAt")
+                WHERE h."id" = r."id" AND h."releasedAt" IS NULL
+                """,
+                list(released),
+                [at.replace(tzinfo=None) for at in released.values()],
+            )
+
+
+holds = HoldTable()
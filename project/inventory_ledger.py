@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import prisma
+import prisma.enums
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = timedelta(hours=6)
+
+MAX_MOVEMENT_ID = 2**63 - 1
+
+
+class Movement(NamedTuple):
+    """
+    One entry of the inventory ledger. kind is "RawMaterial" or "FinishedProduct".
+    """
+
+    kind: str
+    itemId: str
+    type: prisma.enums.MovementType
+    quantityDelta: int
+    reason: Optional[str] = None
+
+
+async def record_movements(client: Any, movements: Sequence[Movement]) -> None:
+    """
+    Appends movements to the ledger with one multi-row insert. Pass the transaction that changes the item quantities so ledger and stock commit together.
+
+    Args:
+        client (Any): The Prisma client or transaction to run the statement on.
+        movements (Sequence[Movement]): The movements to append.
+    """
+    movements = [movement for movement in movements if movement.quantityDelta]
+    if not movements:
+        return
+    await client.execute_raw(
+        """
+        INSERT INTO "InventoryMovement" ("kind", "itemId", "type", "quantityDelta", "reason")
+        SELECT m."kind", m."itemId", m."type"::"MovementType", m."quantityDelta", m."reason"
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::int[], $5::text[])
+            AS m("kind", "itemId", "type", "quantityDelta", "reason")
+        """,
+        [movement.kind for movement in movements],
+        [movement.itemId for movement in movements],
+        [movement.type.value for movement in movements],
+        [movement.quantityDelta for movement in movements],
+        [movement.reason for movement in movements],
+    )
+
+
+async def recordOpeningBalances() -> int:
+    """
+    Records an opening ADJUSTMENT for every item with stock but no movements yet, e.g. items that existed before the ledger.
+
+    Returns:
+        int: Number of opening movements recorded.
+    """
+    return await prisma.get_client().execute_raw("""
+        INSERT INTO "InventoryMovement" ("kind", "itemId", "type", "quantityDelta", "reason")
+        SELECT i."kind", i."id", 'ADJUSTMENT', i."quantity", 'Opening balance'
+        FROM (
+            SELECT 'RawMaterial' AS "kind", "id", "quantity" FROM "RawMaterial"
+            UNION ALL
+            SELECT 'FinishedProduct', "id", "quantity" FROM "FinishedProduct"
+        ) i
+        WHERE i."quantity" <> 0
+          AND NOT EXISTS (
+              SELECT 1 FROM "InventoryMovement" m
+              WHERE m."kind" = i."kind" AND m."itemId" = i."id"
+          )
+        """)
+
+
+async def takeSnapshot() -> Optional[str]:
+    """
+    Stores the stock of every item after all movements recorded so far. The snapshot is built incrementally from the previous snapshot plus the movements since, and the ledger is briefly locked against inserts so no in-flight movement is missed.
+
+    Returns:
+        Optional[str]: ID of the new snapshot, or None if nothing moved since the previous one.
+    """
+    async with prisma.get_client().tx() as transaction:
+        await transaction.execute_raw('LOCK TABLE "InventoryMovement" IN SHARE MODE')
+        cutoff = await transaction.query_first(
+            'SELECT COALESCE(MAX("id"), 0) AS "id" FROM "InventoryMovement"'
+        )
+        previous = await transaction.query_first(
+            'SELECT "id", "lastMovementId" FROM "InventorySnapshot"'
+            ' ORDER BY "takenAt" DESC LIMIT 1'
+        )
+        if previous and previous["lastMovementId"] == cutoff["id"]:
+            return None
+        snapshot = await transaction.query_first(
+            'INSERT INTO "InventorySnapshot" ("takenAt", "lastMovementId")'
+            ' VALUES (now(), $1) RETURNING "id"',
+            cutoff["id"],
+        )
+        await transaction.execute_raw(
+            """
+            INSERT INTO "InventorySnapshotItem" ("snapshotId", "kind", "itemId", "quantity")
+            SELECT $1, s."kind", s."itemId", SUM(s."quantity")::int
+            FROM (
+                SELECT "kind", "itemId", "quantity" FROM "InventorySnapshotItem"
+                WHERE "snapshotId" = $2
+                UNION ALL
+                SELECT "kind", "itemId", "quantityDelta" FROM "InventoryMovement"
+                WHERE "id" > $3 AND "id" <= $4
+            ) s
+            GROUP BY s."kind", s."itemId"
+            HAVING SUM(s."quantity") <> 0
+            """,
+            snapshot["id"],
+            previous["id"] if previous else "",
+            previous["lastMovementId"] if previous else 0,
+            cutoff["id"],
+        )
+    return snapshot["id"]
+
+
+async def stockAsOf(
+    at: datetime, kind: Optional[str] = None, itemId: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Reads the stock of every item (or one kind or item) at a point in time from the nearest snapshot before it plus the movements between that snapshot and the time. The movement tail is bounded by the next snapshot, so the cost does not grow with the size of the ledger.
+
+    Args:
+        at (datetime): The point in time.
+        kind (Optional[str]): Only return items of this kind.
+        itemId (Optional[str]): Only return this item.
+
+    Returns:
+        List[Dict[str, Any]]: Rows of kind, itemId, type, unit, grade and quantity for items with non-zero stock.
+    """
+    parameters: List[Any] = [at]
+    conditions = ""
+    for column, value in (("kind", kind), ("itemId", itemId)):
+        if value:
+            parameters.append(value)
+            conditions += f' AND "{column}" = ${len(parameters)}'
+    return await prisma.get_client().query_raw(
+        f"""
+        WITH base AS (
+            SELECT "id", "lastMovementId" FROM "InventorySnapshot"
+            WHERE "takenAt" <= $1::timestamp
+            ORDER BY "takenAt" DESC LIMIT 1
+        ),
+        next AS (
+            SELECT "lastMovementId" FROM "InventorySnapshot"
+            WHERE "takenAt" > $1::timestamp
+            ORDER BY "takenAt" LIMIT 1
+        ),
+        stock AS (
+            SELECT "kind", "itemId", "quantity" FROM "InventorySnapshotItem"
+            WHERE "snapshotId" = (SELECT "id" FROM base){conditions}
+            UNION ALL
+            SELECT "kind", "itemId", "quantityDelta" FROM "InventoryMovement"
+            WHERE "id" > COALESCE((SELECT "lastMovementId" FROM base), 0)
+              AND "id" <= COALESCE((SELECT "lastMovementId" FROM next), {MAX_MOVEMENT_ID})
+              AND "createdAt" <= $1::timestamp{conditions}
+        )
+        SELECT s."kind", s."itemId", SUM(s."quantity")::int AS "quantity",
+               COALESCE(r."type", f."type") AS "type",
+               COALESCE(r."unit", f."unit") AS "unit",
+               f."grade"
+        FROM stock s
+        LEFT JOIN "RawMaterial" r ON s."kind" = 'RawMaterial' AND r."id" = s."itemId"
+        LEFT JOIN "FinishedProduct" f ON s."kind" = 'FinishedProduct' AND f."id" = s."itemId"
+        GROUP BY s."kind", s."itemId", r."type", f."type", r."unit", f."unit", f."grade"
+        HAVING SUM(s."quantity") <> 0
+        ORDER BY s."kind", s."itemId"
+        """,
+        *parameters,
+    )
+
+
+async def _snapshot_loop(interval: timedelta) -> None:
+    while True:
+        try:
+            await takeSnapshot()
+        except Exception:
+            logger.exception("Failed to take inventory snapshot")
+        await asyncio.sleep(interval.total_seconds())
+
+
+_snapshot_task: Optional[asyncio.Task] = None
+
+
+async def startSnapshots(interval: timedelta = SNAPSHOT_INTERVAL) -> None:
+    """
+    Records opening balances for items that predate the ledger and starts taking a snapshot every `interval`.
+    """
+    global _snapshot_task
+    await recordOpeningBalances()
+    if _snapshot_task is None:
+        _snapshot_task = asyncio.create_task(_snapshot_loop(interval))
+
+
+async def stopSnapshots() -> None:
+    global _snapshot_task
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+        try:
+            await _snapshot_task
+        except asyncio.CancelledError:
+            pass
+        _snapshot_task = None
@@ -1,29 +1,32 @@
 from typing import List, Optional
 
-import prisma
-import prisma.models
+import project.stock_levels
 from pydantic import BaseModel
 
 
 class RawMaterialData(BaseModel):
     """
-    Detailed information about each type of raw material in stock.
+    Stock level of one type and unit of raw material.
     """
 
     type: str
     quantity: int
     unit: str
+    item_count: int
 
 
 class FinishedProductData(BaseModel):
     """
-    Detailed information on each type of finished product in stock.
+    Stock level of one type, grade and unit of finished product.
     """
 
     type: str
     quantity: int
+    reserved_quantity: int
+    available_quantity: int
     unit: str
     grade: str
+    item_count: int
 
 
 class InventoryLevels(BaseModel):
@@ -41,6 +44,8 @@ async def listInventory(
     """
     Displays current stock levels of raw materials and finished products. This endpoint is crucial for inventory tracking in real-time.
 
+    Levels are read from the materialized stock counters, one row per type, grade and unit, instead of scanning every inventory item.
+
     Args:
         material_type (Optional[str]): Optional filter for the type of raw materials.
         product_type (Optional[str]): Optional filter for the type of finished products.
@@ -48,25 +53,31 @@ async def listInventory(
     Returns:
         InventoryLevels: Provides a comprehensive list of both raw materials and finished products currently in stock.
     """
-    query_materials = prisma.models.RawMaterial.prisma()
-    query_products = prisma.models.FinishedProduct.prisma()
-    if material_type:
-        raw_materials = await query_materials.find_many(where={"type": material_type})
-    else:
-        raw_materials = await query_materials.find_many()
-    if product_type:
-        finished_products = await query_products.find_many(where={"type": product_type})
-    else:
-        finished_products = await query_products.find_many()
+    levels = await project.stock_levels.readStockLevels()
     raw_material_data = [
-        RawMaterialData(type=rm.type, quantity=rm.quantity, unit=rm.unit)
-        for rm in raw_materials
+        RawMaterialData(
+            type=level["type"],
+            quantity=level["quantity"],
+            unit=level["unit"],
+            item_count=level["itemCount"],
+        )
+        for level in levels
+        if level["kind"] == project.stock_levels.RAW_MATERIAL
+        and (not material_type or level["type"] == material_type)
     ]
     finished_product_data = [
         FinishedProductData(
-            type=fp.type, quantity=fp.quantity, unit=fp.unit, grade=fp.grade
+            type=level["type"],
+            quantity=level["quantity"],
+            reserved_quantity=level["reservedQuantity"],
+            available_quantity=level["quantity"] - level["reservedQuantity"],
+            unit=level["unit"],
+            grade=level["grade"],
+            item_count=level["itemCount"],
         )
-        for fp in finished_products
+        for level in levels
+        if level["kind"] == project.stock_levels.FINISHED_PRODUCT
+        and (not product_type or level["type"] == product_type)
     ]
     return InventoryLevels(
         raw_materials=raw_material_data, finished_products=finished_product_data
@@ -1,10 +1,24 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 
 import prisma
-import prisma.models
+import project.pagination
 from pydantic import BaseModel
 
+# The first page counts matching records up to this many, so its cost is bounded no
+# matter how much history there is; beyond it the total is reported as "at least".
+MAX_COUNTED_RECORDS = 10000
+
+
+class UserSummary(BaseModel):
+    """
+    The user who logged a record, without credentials.
+    """
+
+    id: str
+    email: str
+    role: str
+
 
 class OptimizationRecord(BaseModel):
     """
@@ -13,28 +27,24 @@ class OptimizationRecord(BaseModel):
 
     id: str
     date_created: datetime
-    created_by: prisma.models.User
+    created_by: UserSummary
     details: str
 
 
 class GetOptimizationsResponse(BaseModel):
     """
-    This response model provides a list of cutting optimization requests along with pagination metadata.
+    This response model provides a page of cutting optimization requests, newest first, with the cursor of the next page. total_records and total_pages are only computed for the first page; when total_records_capped is true there are more than total_records matching records and both are lower bounds.
     """
 
     optimizations: List[OptimizationRecord]
-    total_records: int
-    current_page: int
-    total_pages: int
-
-
-class User(BaseModel):
-    id: str
-    email: str
+    total_records: Optional[int] = None
+    total_pages: Optional[int] = None
+    total_records_capped: Optional[bool] = None
+    next_cursor: Optional[str] = None
 
 
 async def listOptimizations(
-    page: int,
+    cursor: Optional[str],
     limit: int,
     start_date: Optional[datetime],
     end_date: Optional[datetime],
@@ -43,46 +53,91 @@ async def listOptimizations(
     """
     Lists all cutting optimization requests. This can be used by operators to review past optimizations and by management for auditing and planning purposes.
 
+    Each page is one query: keyset pagination on (createdAt, id) makes every page an index range scan no matter how deep it is, and the user is joined for just the summary columns. The first page also counts the matching records, but stops at MAX_COUNTED_RECORDS, so page 1 costs the same however much history there is.
+
     Args:
-        page (int): Specifies the page number of the results to retrieve.
-        limit (int): Specifies the number of results per page.
+        cursor (Optional[str]): The next_cursor of the previous page; omit for the first page.
+        limit (int): Specifies the number of results per page, at most 1000.
         start_date (Optional[datetime]): Optional parameter to filter records that were created after a specific date.
         end_date (Optional[datetime]): Optional parameter to filter records that were created before a specific date.
         user_id (Optional[str]): Optional parameter to filter records by a specific user's ID.
 
     Returns:
-        GetOptimizationsResponse: This response model provides a list of cutting optimization requests along with pagination metadata.
+        GetOptimizationsResponse: This response model provides a page of cutting optimization requests with the cursor of the next page.
     """
-    query_conditions = []
+    project.pagination.check_limit(limit)
+    conditions: List[str] = []
+    parameters: List[Any] = []
     if start_date:
-        query_conditions.append({"createdAt": {"gte": start_date}})
+        parameters.append(start_date)
+        conditions.append(f'r."createdAt" >= ${len(parameters)}::timestamp')
     if end_date:
-        query_conditions.append({"createdAt": {"lte": end_date}})
+        parameters.append(end_date)
+        conditions.append(f'r."createdAt" <= ${len(parameters)}::timestamp')
     if user_id:
-        query_conditions.append({"userId": user_id})
-    total_optimizations = await prisma.models.ProductionRecord.prisma().count(
-        where={"AND": query_conditions}
-    )
-    production_records = await prisma.models.ProductionRecord.prisma().find_many(
-        where={"AND": query_conditions},
-        skip=(page - 1) * limit,
-        take=limit,
-        include={"prisma.models.User": True},
+        parameters.append(user_id)
+        conditions.append(f'r."userId" = ${len(parameters)}')
+    if cursor:
+        cursor_created_at, cursor_id = project.pagination.decodeCursor(cursor)
+        parameters.extend([cursor_created_at, cursor_id])
+        conditions.append(
+            f'(r."createdAt", r."id") < (${len(parameters) - 1}::timestamp, ${len(parameters)})'
+        )
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    total_column = ""
+    if not cursor:
+        parameters.append(MAX_COUNTED_RECORDS + 1)
+        total_column = (
+            ', (SELECT COUNT(*) FROM (SELECT 1 FROM "ProductionRecord" r'
+            f'{where_clause} LIMIT ${len(parameters)}) c)::int AS "total"'
+        )
+    parameters.append(limit + 1)
+    rows = await prisma.get_client().query_raw(
+        f"""
+        SELECT r."id", r."createdAt", r."quantityProduced", r."materialType", r."lumberGrade",
+               u."id" AS "userId", u."email", u."role"::text AS "role"{total_column}
+        FROM "ProductionRecord" r
+        JOIN "User" u ON u."id" = r."userId"{where_clause}
+        ORDER BY r."createdAt" DESC, r."id" DESC
+        LIMIT ${len(parameters)}
+        """,
+        *parameters,
     )
-    total_pages = (total_optimizations + limit - 1) // limit
+    total_records = total_pages = total_records_capped = None
+    if not cursor:
+        counted = rows[0]["total"] if rows else 0
+        total_records_capped = counted > MAX_COUNTED_RECORDS
+        total_records = min(counted, MAX_COUNTED_RECORDS)
+        total_pages = (total_records + limit - 1) // limit
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = project.pagination.encodeCursor(
+            rows[-1]["createdAt"], rows[-1]["id"]
+        )
     optimizations = [
         OptimizationRecord(
-            id=rec.id,
-            date_created=rec.createdAt,
-            created_by=rec.User,
-            details="Details of production",
+            id=row["id"],
+            date_created=row["createdAt"],
+            created_by=UserSummary(
+                id=row["userId"], email=row["email"], role=row["role"]
+            ),
+            details=" ".join(
+                part
+                for part in (
+                    f"{row['quantityProduced']} pieces",
+                    row["materialType"],
+                    row["lumberGrade"],
+                )
+                if part
+            ),
         )
-        for rec in production_records
+        for row in rows
     ]
-    response = GetOptimizationsResponse(
+    return GetOptimizationsResponse(
         optimizations=optimizations,
-        total_records=total_optimizations,
-        current_page=page,
+        total_records=total_records,
         total_pages=total_pages,
+        total_records_capped=total_records_capped,
+        next_cursor=next_cursor,
     )
-    return response
@@ -0,0 +1,153 @@
+import asyncio
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Hashable, Iterable, Sequence, Union
+
+import numpy as np
+import prisma
+
+CENTS_PER_UNIT = 100
+
+# (table, float column in major units, integer cents column) replaced when money moved to cents.
+CENTS_COLUMNS = (
+    ("PriceEstimate", "priceRate", "priceRateCents"),
+    ("PriceEstimate", "expectedProfit", "expectedProfitCents"),
+    ("Invoice", "totalAmount", "totalAmountCents"),
+)
+
+Amount = Union[int, float, str, Decimal]
+
+
+def to_cents(amount: Amount) -> int:
+    """
+    Converts an amount in major currency units (e.g. dollars) into integer cents, rounding half up. This is the only place where input amounts are rounded.
+
+    Args:
+        amount (Amount): Amount in major units, e.g. 12.5 or "12.50".
+
+    Returns:
+        int: The amount in cents.
+    """
+    cents = Decimal(str(amount)) * CENTS_PER_UNIT
+    return int(cents.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    """
+    Presents an amount of cents in major currency units for API responses.
+
+    Args:
+        cents (int): Amount in cents.
+
+    Returns:
+        float: The amount in major units.
+    """
+    return cents / CENTS_PER_UNIT
+
+
+def percent_of(cents: int, rate: Amount) -> int:
+    """
+    Applies a rate (e.g. a profit margin of 0.2) to an amount of cents, rounding half up to whole cents.
+
+    Args:
+        cents (int): Amount in cents.
+        rate (Amount): The fraction to take, e.g. Decimal("0.2").
+
+    Returns:
+        int: The resulting amount in cents.
+    """
+    result = Decimal(cents) * Decimal(str(rate))
+    return int(result.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def line_totals(rate_cents: Sequence[int], quantities: Sequence[int]) -> np.ndarray:
+    """
+    Multiplies unit prices by quantities for a batch of lines using int64 vectors.
+
+    Args:
+        rate_cents (Sequence[int]): Unit price of every line in cents.
+        quantities (Sequence[int]): Quantity of every line.
+
+    Returns:
+        np.ndarray: The int64 total of every line in cents.
+    """
+    return np.asarray(rate_cents, dtype=np.int64) * np.asarray(
+        quantities, dtype=np.int64
+    )
+
+
+def total(cents: Iterable[int]) -> int:
+    """
+    Sums amounts of cents exactly with an int64 vector sum.
+
+    Args:
+        cents (Iterable[int]): Amounts in cents.
+
+    Returns:
+        int: The exact sum in cents.
+    """
+    return int(np.fromiter(cents, dtype=np.int64).sum())
+
+
+def group_totals(keys: Sequence[Hashable], cents: Sequence[int]) -> Dict[Hashable, int]:
+    """
+    Sums amounts of cents per key in one vectorized pass, e.g. revenue per customer.
+
+    Args:
+        keys (Sequence[Hashable]): The group of every amount.
+        cents (Sequence[int]): Amounts in cents, aligned with keys.
+
+    Returns:
+        Dict[Hashable, int]: The exact sum in cents for every distinct key.
+    """
+    if not keys:
+        return {}
+    unique_keys, positions = np.unique(np.asarray(keys), return_inverse=True)
+    sums = np.zeros(len(unique_keys), dtype=np.int64)
+    np.add.at(sums, positions, np.asarray(cents, dtype=np.int64))
+    return {key.item(): int(value) for key, value in zip(unique_keys, sums)}
+
+
+async def migrateToCents() -> None:
+    """
+    Converts a database created before money was stored in cents, in one transaction: every float amount column is copied into its cents column as round(amount * 100), half away from zero like to_cents, and then dropped. Run once before `prisma db push` on such a database; columns already converted are skipped.
+    """
+    async with prisma.get_client().tx() as transaction:
+        for table, amount_column, cents_column in CENTS_COLUMNS:
+            exists = await transaction.query_first(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = $1 AND column_name = $2
+                ) AS "exists"
+                """,
+                table,
+                amount_column,
+            )
+            if not exists["exists"]:
+                continue
+            await transaction.execute_raw(
+                f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS "{cents_column}" BIGINT'
+            )
+            await transaction.execute_raw(
+                f'UPDATE "{table}"'
+                f' SET "{cents_column}" = round("{amount_column}"::numeric * {CENTS_PER_UNIT})::bigint'
+            )
+            await transaction.execute_raw(
+                f'ALTER TABLE "{table}" ALTER COLUMN "{cents_column}" SET NOT NULL'
+            )
+            await transaction.execute_raw(
+                f'ALTER TABLE "{table}" DROP COLUMN "{amount_column}"'
+            )
+
+
+async def main() -> None:
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    try:
+        await migrateToCents()
+    finally:
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
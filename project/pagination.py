@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+MAX_PAGE_SIZE = 1000
+
+
+def check_limit(limit: int, max_page_size: int = MAX_PAGE_SIZE) -> None:
+    """
+    Raises:
+        ValueError: If `limit` is not between 1 and `max_page_size`.
+    """
+    if limit < 1 or limit > max_page_size:
+        raise ValueError(f"limit must be between 1 and {max_page_size}.")
+
+
+def encodeCursor(createdAt: Any, rowId: str) -> str:
+    """
+    Encodes the (createdAt, id) position of the last row on a page as an opaque cursor.
+    """
+    if isinstance(createdAt, datetime):
+        createdAt = createdAt.isoformat()
+    raw = json.dumps([createdAt, rowId]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decodeCursor(cursor: str) -> List[str]:
+    """
+    Decodes a cursor produced by encodeCursor into its [createdAt, id] position.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    return [created_at, row_id]
@@ -0,0 +1,92 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import asyncpg
+
+# Query parameters of DATABASE_URL that only the Prisma engine understands.
+PRISMA_URL_PARAMETERS = {
+    "schema",
+    "connection_limit",
+    "pool_timeout",
+    "pgbouncer",
+    "statement_cache_size",
+    "socket_timeout",
+}
+
+EXPORT_QUEUE_SIZE = 16
+
+
+def connection_settings() -> Tuple[str, Dict[str, str]]:
+    """
+    Derives an asyncpg DSN and server settings from DATABASE_URL, the URL the Prisma client connects with. The Prisma `schema` parameter becomes the search path.
+    """
+    parts = urlsplit(os.environ["DATABASE_URL"])
+    query = parse_qsl(parts.query)
+    settings = {"search_path": value for key, value in query if key == "schema"}
+    dsn = urlunsplit(
+        parts._replace(
+            query=urlencode(
+                [
+                    (key, value)
+                    for key, value in query
+                    if key not in PRISMA_URL_PARAMETERS
+                ]
+            )
+        )
+    )
+    return dsn, settings
+
+
+@asynccontextmanager
+async def copy_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Opens a dedicated asyncpg connection for COPY, which the Prisma client does not support.
+    """
+    dsn, settings = connection_settings()
+    connection = await asyncpg.connect(dsn, server_settings=settings)
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+async def stream_copy_out(query: str, *args: Any) -> AsyncIterator[bytes]:
+    """
+    Streams the result of `COPY (query) TO STDOUT` as CSV with a header row. COPY is paused while the consumer is slow, so memory use stays flat however large the result is.
+
+    Args:
+        query (str): The SELECT to export.
+        *args (Any): Parameters of the query.
+
+    Returns:
+        AsyncIterator[bytes]: CSV chunks as sent by the server.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=EXPORT_QUEUE_SIZE)
+
+    async def produce() -> None:
+        async with copy_connection() as connection:
+            await connection.copy_from_query(
+                query, *args, output=queue.put, format="csv", header=True
+            )
+
+    producer = asyncio.create_task(produce())
+    getter: Optional[asyncio.Task] = None
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+                continue
+            getter.cancel()
+            producer.result()
+            while not queue.empty():
+                yield queue.get_nowait()
+            return
+    finally:
+        if getter is not None:
+            getter.cancel()
+        producer.cancel()
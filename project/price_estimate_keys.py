@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+import prisma
+import project.dimensions
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def key_of(lumberDimensions: Any) -> Optional[str]:
+    """
+    Computes the dimension key of a stored lumberDimensions value: a "2x6x12" string as written by createPriceEstimate, or a {"height", "width", "length"} mapping as written by createQuote. Returns None for values that are neither.
+    """
+    try:
+        if isinstance(lumberDimensions, str):
+            return project.dimensions.dimension_key(
+                project.dimensions.parse_dimension_key(lumberDimensions)
+            )
+        if isinstance(lumberDimensions, dict):
+            return project.dimensions.dimension_key(
+                project.dimensions.from_mapping(lumberDimensions)
+            )
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+async def backfillDimensionKeys(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Fills the "dimensionKey" of price estimates written before the column existed from their lumberDimensions, BATCH_SIZE estimates per statement in id order. Estimates whose dimensions cannot be parsed keep "" and are logged. Run once after `prisma db push` when upgrading a database that already has price estimates; it is safe to run again.
+
+    Returns:
+        int: Number of estimates updated.
+    """
+    client = prisma.get_client()
+    updated = skipped = 0
+    last_id = ""
+    while True:
+        rows = await client.query_raw(
+            """
+            SELECT "id", "lumberDimensions" FROM "PriceEstimate"
+            WHERE "dimensionKey" = '' AND "id" > $1
+            ORDER BY "id"
+            LIMIT $2
+            """,
+            last_id,
+            batch_size,
+        )
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        ids: List[str] = []
+        keys: List[str] = []
+        for row in rows:
+            key = key_of(row["lumberDimensions"])
+            if key is None:
+                skipped += 1
+                continue
+            ids.append(row["id"])
+            keys.append(key)
+        if ids:
+            updated += await client.execute_raw(
+                """
+                UPDATE "PriceEstimate" pe
+                SET "dimensionKey" = d."key"
+                FROM unnest($1::text[], $2::text[]) AS d("id", "key")
+                WHERE pe."id" = d."id"
+                """,
+                ids,
+                keys,
+            )
+    if skipped:
+        logger.warning("%d price estimates have unparseable dimensions", skipped)
+    return updated
+
+
+async def main() -> None:
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    try:
+        print(await backfillDimensionKeys())
+    finally:
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+from decimal import Decimal
+from typing import Dict
+
+import project.dimensions
+import project.money
+
+BASE_PRICE_PER_BOARD_FOOT_CENTS = 250
+
+GRADE_MULTIPLIERS: Dict[str, Decimal] = {"A": Decimal("1.1"), "B": Decimal("1.0")}
+
+DEFAULT_GRADE_MULTIPLIER = Decimal("0.9")
+
+PROFIT_MARGIN = Decimal("0.2")
+
+
+def unit_price_cents(dimensions: project.dimensions.Dimensions, grade: str) -> int:
+    """
+    Prices one board from its volume in board feet and its quality grade. Quotes and price estimate updates are priced through this function; createPriceEstimate copies a predefined rate instead.
+
+    Args:
+        dimensions (project.dimensions.Dimensions): The board size.
+        grade (str): The grade of the lumber; A is priced 10% above and grades other than A and B 10% below the base rate.
+
+    Returns:
+        int: The price of one board in cents.
+    """
+    board_feet = Decimal(str(project.dimensions.board_feet(dimensions)))
+    multiplier = GRADE_MULTIPLIERS.get(grade, DEFAULT_GRADE_MULTIPLIER)
+    return project.money.percent_of(
+        BASE_PRICE_PER_BOARD_FOOT_CENTS, board_feet * multiplier
+    )
+
+
+def expected_profit_cents(unit_cents: int, quantity: int) -> int:
+    """
+    The profit expected on `quantity` boards priced at `unit_cents` each.
+    """
+    return project.money.percent_of(unit_cents * quantity, PROFIT_MARGIN)
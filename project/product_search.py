@@ -0,0 +1,187 @@
+import asyncio
+import bisect
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import prisma
+
+PRODUCT_COLUMNS = (
+    '"id", "type", "grade", "unit", "quantity", "reservedQuantity",'
+    ' "thicknessIn", "widthIn", "lengthFt"'
+)
+
+
+class IndexedProduct(NamedTuple):
+    """
+    A finished product with structured dimensions as held by the search index.
+    """
+
+    id: str
+    type: str
+    grade: str
+    unit: str
+    quantity: int
+    reservedQuantity: int
+    thicknessIn: float
+    widthIn: float
+    lengthFt: float
+
+
+class Range(NamedTuple):
+    """
+    Inclusive bounds of one dimension; a missing bound is open.
+    """
+
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    def __contains__(self, value: float) -> bool:
+        return (self.low is None or value >= self.low) and (
+            self.high is None or value <= self.high
+        )
+
+
+class DimensionIndex:
+    """
+    In-memory index of finished products for dimension range queries.
+
+    Products are bucketed by cross-section and grade (thickness, width, grade); each bucket
+    keeps its products sorted by length. A query only visits the few buckets whose
+    cross-section and grade match and bisects the length range inside each, so it never
+    scans the whole inventory. Writers report the products they touched with `notify`
+    and only those rows are re-read.
+    """
+
+    def __init__(self) -> None:
+        self._products: Dict[str, IndexedProduct] = {}
+        self._buckets: Dict[Tuple[float, float, str], List[Tuple[float, str]]] = {}
+        self._pending: Set[str] = set()
+        self._stale = False
+        self._refresh_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    async def load(self) -> None:
+        rows = await prisma.get_client().query_raw(
+            f'SELECT {PRODUCT_COLUMNS} FROM "FinishedProduct"'
+            ' WHERE "thicknessIn" IS NOT NULL AND "widthIn" IS NOT NULL AND "lengthFt" IS NOT NULL'
+        )
+        self._products = {}
+        self._buckets = {}
+        for row in rows:
+            self._add(IndexedProduct(**row))
+
+    def notify(self, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Marks the finished products among the given (kind, itemId) items as changed; they are re-read before the next search.
+        """
+        self._pending.update(
+            item_id for kind, item_id in items if kind == "FinishedProduct"
+        )
+
+    def reset(self) -> None:
+        """
+        Marks the whole index as changed, e.g. after a bulk import; it is reloaded before the next search.
+        """
+        self._stale = True
+
+    async def _refresh(self) -> None:
+        if self._stale:
+            self._stale, self._pending = False, set()
+            try:
+                await self.load()
+            except Exception:
+                self._stale = True
+                raise
+            return
+        if not self._pending:
+            return
+        item_ids, self._pending = list(self._pending), set()
+        try:
+            rows = await prisma.get_client().query_raw(
+                f'SELECT {PRODUCT_COLUMNS} FROM "FinishedProduct" WHERE "id" = ANY($1::text[])',
+                item_ids,
+            )
+        except Exception:
+            self._pending.update(item_ids)
+            raise
+        for item_id in item_ids:
+            self._remove(item_id)
+        for row in rows:
+            if None not in (row["thicknessIn"], row["widthIn"], row["lengthFt"]):
+                self._add(IndexedProduct(**row))
+
+    def _add(self, product: IndexedProduct) -> None:
+        self._products[product.id] = product
+        bisect.insort(
+            self._buckets.setdefault(
+                (product.thicknessIn, product.widthIn, product.grade), []
+            ),
+            (product.lengthFt, product.id),
+        )
+
+    def _remove(self, productId: str) -> None:
+        product = self._products.pop(productId, None)
+        if product is None:
+            return
+        key = (product.thicknessIn, product.widthIn, product.grade)
+        bucket = self._buckets[key]
+        del bucket[bisect.bisect_left(bucket, (product.lengthFt, product.id))]
+        if not bucket:
+            del self._buckets[key]
+
+    async def search(
+        self,
+        thickness: Range,
+        width: Range,
+        length: Range,
+        grades: Optional[Set[str]],
+        minAvailable: int,
+        limit: int,
+    ) -> Tuple[List[IndexedProduct], int]:
+        """
+        Finds the products whose dimensions fall in all given ranges.
+
+        Args:
+            thickness (Range): Thickness range in inches.
+            width (Range): Width range in inches.
+            length (Range): Length range in feet.
+            grades (Optional[Set[str]]): Accepted grades; any grade when None.
+            minAvailable (int): Minimum unreserved quantity of a match.
+            limit (int): Maximum number of products returned.
+
+        Returns:
+            Tuple[List[IndexedProduct], int]: Up to `limit` matches ordered by cross-section, grade and length, and the total number of matches.
+        """
+        async with self._refresh_lock:
+            await self._refresh()
+        matches: List[IndexedProduct] = []
+        total = 0
+        for key in sorted(self._buckets):
+            bucket_thickness, bucket_width, bucket_grade = key
+            if (
+                bucket_thickness not in thickness
+                or bucket_width not in width
+                or (grades is not None and bucket_grade not in grades)
+            ):
+                continue
+            bucket = self._buckets[key]
+            start = (
+                0 if length.low is None else bisect.bisect_left(bucket, (length.low,))
+            )
+            end = (
+                len(bucket)
+                if length.high is None
+                else bisect.bisect_right(bucket, (length.high, "\uffff"))
+            )
+            for _, product_id in bucket[start:end]:
+                product = self._products[product_id]
+                if product.quantity - product.reservedQuantity < minAvailable:
+                    continue
+                total += 1
+                if len(matches) < limit:
+                    matches.append(product)
+        return matches, total
+
+
+product_index = DimensionIndex()
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, List, Optional
+
+import prisma
+import project.quote_expiry
+
+logger = logging.getLogger(__name__)
+
+MONTHS_AHEAD = 3
+
+MAINTENANCE_INTERVAL = timedelta(hours=6)
+
+ARCHIVE_SCHEMA = "archive"
+
+# Constraint and index names Prisma gives the ProductionRecord table, kept on the
+# partitioned table so `prisma db push` sees no drift.
+FOREIGN_KEYS = {
+    "ProductionRecord_userId_fkey": ('"userId"', '"User"'),
+    "ProductionRecord_rawMaterialId_fkey": ('"rawMaterialId"', '"RawMaterial"'),
+    "ProductionRecord_finishedProductId_fkey": (
+        '"finishedProductId"',
+        '"FinishedProduct"',
+    ),
+}
+
+INDEXES = {
+    "ProductionRecord_createdAt_id_idx": '"createdAt", "id"',
+    "ProductionRecord_userId_createdAt_id_idx": '"userId", "createdAt", "id"',
+}
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"ProductionRecord_{month:%Y_%m}"
+
+
+async def is_partitioned() -> bool:
+    row = await prisma.get_client().query_first("""
+        SELECT c."relkind" = 'p' AS "partitioned"
+        FROM pg_class c
+        WHERE c."oid" = to_regclass('"ProductionRecord"')
+        """)
+    return bool(row and row["partitioned"])
+
+
+async def create_partition(client: Any, month: date) -> None:
+    await client.execute_raw(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}"'
+        f' PARTITION OF "ProductionRecord"'
+        f" FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+async def ensurePartitions(months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """
+    Creates the monthly partitions of "ProductionRecord" from the current month up to `months_ahead` months ahead. There is no default partition, which would rule out detaching partitions concurrently, so a record can only be inserted into a month created here. Does nothing while the table is not partitioned yet.
+
+    Args:
+        months_ahead (int): Number of future months to create partitions for.
+
+    Returns:
+        List[str]: Names of the partitions that exist for those months.
+    """
+    if not await is_partitioned():
+        return []
+    current = month_start(datetime.now(timezone.utc).date())
+    months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    for month in months:
+        await create_partition(prisma.get_client(), month)
+    return [partition_name(month) for month in months]
+
+
+async def convertToPartitioned(months_ahead: int = MONTHS_AHEAD) -> None:
+    """
+    Converts "ProductionRecord" into a table range-partitioned by month on "createdAt", in one transaction. A partition is created for every month from the oldest record up to `months_ahead` months ahead and all rows are copied over. Run once after `prisma db push`; it does nothing if the table is already partitioned.
+
+    Args:
+        months_ahead (int): Number of future months to create partitions for.
+    """
+    if await is_partitioned():
+        return
+    async with prisma.get_client().tx() as transaction:
+        await transaction.execute_raw(
+            'ALTER TABLE "ProductionRecord" RENAME TO "ProductionRecordUnpartitioned"'
+        )
+        await transaction.execute_raw(
+            'ALTER TABLE "ProductionRecordUnpartitioned"'
+            ' RENAME CONSTRAINT "ProductionRecord_pkey" TO "ProductionRecordUnpartitioned_pkey"'
+        )
+        for name in FOREIGN_KEYS:
+            await transaction.execute_raw(
+                f'ALTER TABLE "ProductionRecordUnpartitioned" RENAME CONSTRAINT "{name}"'
+                f' TO "{name.replace("ProductionRecord", "ProductionRecordUnpartitioned")}"'
+            )
+        for name in INDEXES:
+            await transaction.execute_raw(
+                f'ALTER INDEX "{name}"'
+                f' RENAME TO "{name.replace("ProductionRecord", "ProductionRecordUnpartitioned")}"'
+            )
+        await transaction.execute_raw("""
+            CREATE TABLE "ProductionRecord" (LIKE "ProductionRecordUnpartitioned" INCLUDING DEFAULTS)
+            PARTITION BY RANGE ("createdAt")
+            """)
+        await transaction.execute_raw(
+            'ALTER TABLE "ProductionRecord"'
+            ' ADD CONSTRAINT "ProductionRecord_pkey" PRIMARY KEY ("id", "createdAt")'
+        )
+        for name, (column, table) in FOREIGN_KEYS.items():
+            await transaction.execute_raw(
+                f'ALTER TABLE "ProductionRecord" ADD CONSTRAINT "{name}"'
+                f' FOREIGN KEY ({column}) REFERENCES {table}("id")'
+                " ON DELETE RESTRICT ON UPDATE CASCADE"
+            )
+        for name, columns in INDEXES.items():
+            await transaction.execute_raw(
+                f'CREATE INDEX "{name}" ON "ProductionRecord" ({columns})'
+            )
+        oldest = await transaction.query_first(
+            'SELECT MIN("createdAt") AS "createdAt" FROM "ProductionRecordUnpartitioned"'
+        )
+        current = month_start(datetime.now(timezone.utc).date())
+        month = (
+            month_start(project.quote_expiry.as_utc(oldest["createdAt"]).date())
+            if oldest["createdAt"]
+            else current
+        )
+        while month <= add_months(current, months_ahead):
+            await create_partition(transaction, month)
+            month = add_months(month, 1)
+        await transaction.execute_raw(
+            'INSERT INTO "ProductionRecord" SELECT * FROM "ProductionRecordUnpartitioned"'
+        )
+        await transaction.execute_raw('DROP TABLE "ProductionRecordUnpartitioned"')
+
+
+async def detachPartition(month: date, archive_schema: str = ARCHIVE_SCHEMA) -> str:
+    """
+    Detaches the partition of a month from "ProductionRecord" without blocking writers and moves it into `archive_schema`, where it can be dumped with pg_dump and dropped. The month's production stays in the daily rollups.
+
+    Args:
+        month (date): Any day of the month to archive.
+        archive_schema (str): Schema the detached table is moved to.
+
+    Returns:
+        str: The qualified name of the archived table.
+    """
+    name = partition_name(month_start(month))
+    client = prisma.get_client()
+    await client.execute_raw(
+        f'ALTER TABLE "ProductionRecord" DETACH PARTITION "{name}" CONCURRENTLY'
+    )
+    await client.execute_raw(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"')
+    await client.execute_raw(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"')
+    return f'"{archive_schema}"."{name}"'
+
+
+async def _maintenance_loop(interval: timedelta) -> None:
+    while True:
+        try:
+            await ensurePartitions()
+        except Exception:
+            logger.exception("Failed to create production record partitions")
+        await asyncio.sleep(interval.total_seconds())
+
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+async def startPartitionMaintenance(
+    interval: timedelta = MAINTENANCE_INTERVAL,
+) -> None:
+    """
+    Starts creating upcoming monthly partitions every `interval`.
+    """
+    global _maintenance_task
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintenance_loop(interval))
+
+
+async def stopPartitionMaintenance() -> None:
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Manage the monthly partitions of ProductionRecord."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("convert", help="partition the table by month")
+    commands.add_parser("ensure", help="create the upcoming monthly partitions")
+    detach = commands.add_parser("detach", help="detach and archive one month")
+    detach.add_argument("month", help="month to archive, e.g. 2024-01")
+    args = parser.parse_args()
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    try:
+        if args.command == "convert":
+            await convertToPartitioned()
+        elif args.command == "ensure":
+            print("\n".join(await ensurePartitions()))
+        else:
+            print(await detachPartition(date.fromisoformat(f"{args.month}-01")))
+    finally:
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import prisma
+import project.quote_expiry
+
+# Three eight-hour shifts starting at 06:00, 14:00 and 22:00 UTC. A night shift belongs
+# to the day it started on, so production is bucketed by (createdAt - SHIFT_OFFSET).
+SHIFTS = ("day", "swing", "night")
+
+SHIFT_HOURS = 8
+
+SHIFT_OFFSET = timedelta(hours=6)
+
+ROLLUP_CONFLICT = """
+    ON CONFLICT ("day", "shift", "materialType", "grade") DO UPDATE
+    SET "recordCount" = "ProductionDailyRollup"."recordCount" + EXCLUDED."recordCount",
+        "quantityProduced" = "ProductionDailyRollup"."quantityProduced" + EXCLUDED."quantityProduced",
+        "boardFeet" = "ProductionDailyRollup"."boardFeet" + EXCLUDED."boardFeet",
+        "updatedAt" = now()
+    """
+
+
+class RollupKey(NamedTuple):
+    """
+    The grouping of the production rollups: production day, shift, material type and grade.
+    """
+
+    day: date
+    shift: str
+    materialType: str
+    grade: str
+
+
+class RollupDelta(NamedTuple):
+    """
+    Change of one rollup row.
+    """
+
+    recordCount: int = 0
+    quantityProduced: int = 0
+    boardFeet: float = 0.0
+
+
+RollupDeltas = Dict[RollupKey, RollupDelta]
+
+
+def day_sql(column: str) -> str:
+    return f"(({column}) - interval '{SHIFT_OFFSET.seconds // 3600} hours')::date"
+
+
+def shift_sql(column: str) -> str:
+    shifts = ", ".join(f"'{shift}'" for shift in SHIFTS)
+    return (
+        f"(ARRAY[{shifts}])[floor(extract(hour FROM ({column})"
+        f" - interval '{SHIFT_OFFSET.seconds // 3600} hours') / {SHIFT_HOURS})::int + 1]"
+    )
+
+
+def rollup_upsert(source: str) -> str:
+    """
+    SQL adding one rollup increment per row of `source`, a relation with the "ProductionRecord" columns createdAt, materialType, lumberGrade, quantityProduced and boardFeet. Use it inside the statement that writes the records.
+    """
+    return f"""
+        INSERT INTO "ProductionDailyRollup" ("day", "shift", "materialType", "grade", "recordCount", "quantityProduced", "boardFeet", "updatedAt")
+        SELECT {day_sql('"createdAt"')}, {shift_sql('"createdAt"')}, "materialType", "lumberGrade",
+               1, "quantityProduced", "boardFeet", now()
+        FROM {source}
+        {ROLLUP_CONFLICT}
+        """
+
+
+def shift_of(createdAt: datetime) -> Tuple[date, str]:
+    """
+    Returns the production day and shift of a timestamp.
+    """
+    shifted = project.quote_expiry.as_utc(createdAt) - SHIFT_OFFSET
+    return shifted.date(), SHIFTS[shifted.hour // SHIFT_HOURS]
+
+
+def rollup_key(record: Any) -> RollupKey:
+    return RollupKey(
+        *shift_of(record.createdAt), record.materialType, record.lumberGrade
+    )
+
+
+def add_delta(deltas: RollupDeltas, key: RollupKey, delta: RollupDelta) -> RollupDeltas:
+    """
+    Folds a delta into `deltas` so every rollup row is touched at most once per statement.
+    """
+    current = deltas.get(key, RollupDelta())
+    deltas[key] = RollupDelta(*(a + b for a, b in zip(current, delta)))
+    return deltas
+
+
+def record_deltas(
+    before: Optional[Any],
+    after: Optional[Any],
+    deltas: Optional[RollupDeltas] = None,
+) -> RollupDeltas:
+    """
+    Computes the rollup changes of creating (before is None), updating or deleting (after is None) one production record. An update that changes the material type or grade moves the record between rollup rows.
+
+    Args:
+        before (Optional[Any]): The record before the write.
+        after (Optional[Any]): The record after the write.
+        deltas (Optional[RollupDeltas]): Deltas to add to, e.g. of other records written in the same transaction.
+
+    Returns:
+        RollupDeltas: The accumulated deltas.
+    """
+    deltas = {} if deltas is None else deltas
+    if before is not None:
+        add_delta(
+            deltas,
+            rollup_key(before),
+            RollupDelta(-1, -before.quantityProduced, -before.boardFeet),
+        )
+    if after is not None:
+        add_delta(
+            deltas,
+            rollup_key(after),
+            RollupDelta(1, after.quantityProduced, after.boardFeet),
+        )
+    return deltas
+
+
+async def apply_rollup_deltas(client: Any, deltas: RollupDeltas) -> None:
+    """
+    Applies rollup deltas with one upsert. Pass the transaction of the production write so the rollups commit or roll back together with it.
+
+    Args:
+        client (Any): The Prisma client or transaction to run the statement on.
+        deltas (RollupDeltas): The deltas to apply.
+    """
+    changed: List[Tuple[RollupKey, RollupDelta]] = [
+        (key, delta) for key, delta in deltas.items() if any(delta)
+    ]
+    if not changed:
+        return
+    await client.execute_raw(
+        f"""
+        INSERT INTO "ProductionDailyRollup" ("day", "shift", "materialType", "grade", "recordCount", "quantityProduced", "boardFeet", "updatedAt")
+        SELECT d."day"::date, d."shift", d."materialType", d."grade", d."recordCount", d."quantityProduced", d."boardFeet", now()
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::int[], $6::int[], $7::float8[])
+            AS d("day", "shift", "materialType", "grade", "recordCount", "quantityProduced", "boardFeet")
+        {ROLLUP_CONFLICT}
+        """,
+        [key.day.isoformat() for key, _ in changed],
+        [key.shift for key, _ in changed],
+        [key.materialType for key, _ in changed],
+        [key.grade for key, _ in changed],
+        *(list(column) for column in zip(*(delta for _, delta in changed))),
+    )
+
+
+async def rebuildProductionRollups() -> None:
+    """
+    Backfills the rollups from all production records in one transaction. Records written before rollups existed get their material type and, if missing, grade from their finished product first. Rollups of days before the oldest record are kept, so months whose partitions were archived stay in the reports. Writers block on the rollup table until the rebuild commits, so no production is counted twice or lost.
+    """
+    async with prisma.get_client().tx() as transaction:
+        await transaction.execute_raw(
+            'LOCK TABLE "ProductionDailyRollup" IN EXCLUSIVE MODE'
+        )
+        await transaction.execute_raw("""
+            UPDATE "ProductionRecord" r
+            SET "materialType" = CASE WHEN r."materialType" = '' THEN f."type" ELSE r."materialType" END,
+                "lumberGrade" = CASE WHEN r."lumberGrade" = '' THEN f."grade" ELSE r."lumberGrade" END
+            FROM "FinishedProduct" f
+            WHERE f."id" = r."finishedProductId"
+              AND (r."materialType" = '' OR r."lumberGrade" = '')
+            """)
+        await transaction.execute_raw(f"""
+            DELETE FROM "ProductionDailyRollup"
+            WHERE "day" >= (SELECT {day_sql('MIN("createdAt")')} FROM "ProductionRecord")
+            """)
+        await transaction.execute_raw(f"""
+            INSERT INTO "ProductionDailyRollup" ("day", "shift", "materialType", "grade", "recordCount", "quantityProduced", "boardFeet", "updatedAt")
+            SELECT {day_sql('"createdAt"')}, {shift_sql('"createdAt"')}, "materialType", "lumberGrade",
+                   COUNT(*)::int, SUM("quantityProduced")::int, SUM("boardFeet"), now()
+            FROM "ProductionRecord"
+            GROUP BY 1, 2, 3, 4
+            """)
+
+
+async def main() -> None:
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    try:
+        await rebuildProductionRollups()
+    finally:
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+import prisma.enums
+import project.inventory_ledger
+import project.stock_levels
+
+ItemMoves = Dict[Tuple[str, str], int]
+
+ITEM_TABLES = {
+    project.stock_levels.RAW_MATERIAL: ('"RawMaterial"', "''", "0"),
+    project.stock_levels.FINISHED_PRODUCT: (
+        '"FinishedProduct"',
+        't."grade"',
+        't."reservedQuantity"',
+    ),
+}
+
+
+def record_reason(recordId: str) -> str:
+    """
+    The ledger reason of the movements of a production record, as written by recordProduction.
+    """
+    return f"Production record {recordId}"
+
+
+async def recorded_moves(
+    client: Any, recordId: str, items: Iterable[Tuple[str, str]]
+) -> ItemMoves:
+    """
+    Reads the net stock change a production record has made to the given (kind, itemId) items so far, from the ledger movements recorded under its reason.
+
+    Args:
+        client (Any): The Prisma client or transaction to run the query on.
+        recordId (str): The production record.
+        items (Iterable[Tuple[str, str]]): The items the record refers to.
+
+    Returns:
+        ItemMoves: The net quantity moved per (kind, itemId); items the record never moved are left out.
+    """
+    keys = set(items)
+    rows = await client.query_raw(
+        """
+        SELECT "kind", "itemId", SUM("quantityDelta")::int AS "quantity"
+        FROM "InventoryMovement"
+        WHERE ("kind", "itemId") IN (SELECT * FROM unnest($1::text[], $2::text[]))
+          AND "reason" = $3
+        GROUP BY "kind", "itemId"
+        """,
+        [kind for kind, _ in keys],
+        [item_id for _, item_id in keys],
+        record_reason(recordId),
+    )
+    return {
+        (row["kind"], row["itemId"]): row["quantity"] for row in rows if row["quantity"]
+    }
+
+
+def subtract_moves(after: ItemMoves, before: ItemMoves) -> ItemMoves:
+    """
+    The moves that turn the stock change `before` into `after`.
+    """
+    changes = dict(after)
+    for key, quantity in before.items():
+        changes[key] = changes.get(key, 0) - quantity
+    return {key: quantity for key, quantity in changes.items() if quantity}
+
+
+async def apply_moves(client: Any, recordId: str, moves: ItemMoves) -> None:
+    """
+    Corrects the stock of the items of a production record, with one set-based update per item table, and writes the matching ledger ADJUSTMENTs and stock counter deltas in the same transaction.
+
+    Args:
+        client (Any): The transaction of the production record write.
+        recordId (str): The production record the correction belongs to.
+        moves (ItemMoves): Quantity to add per (kind, itemId); negative to take out.
+
+    Raises:
+        ValueError: If an item does not exist, or the correction would take its stock below zero or below the units reserved by quotes.
+    """
+    if not moves:
+        return
+    deltas: project.stock_levels.StockDeltas = {}
+    for kind, (table, grade, reserved) in ITEM_TABLES.items():
+        item_ids = sorted(item_id for k, item_id in moves if k == kind)
+        if not item_ids:
+            continue
+        rows: List[Dict[str, Any]] = await client.query_raw(
+            f"""
+            UPDATE {table} t
+            SET "quantity" = t."quantity" + d."delta",
+                "version" = t."version" + 1,
+                "updatedAt" = now()
+            FROM unnest($1::text[], $2::int[]) AS d("id", "delta")
+            WHERE t."id" = d."id"
+              AND (d."delta" >= 0 OR t."quantity" + d."delta" >= {reserved})
+            RETURNING t."type", {grade} AS "grade", t."unit", d."delta"
+            """,
+            item_ids,
+            [moves[(kind, item_id)] for item_id in item_ids],
+        )
+        if len(rows) < len(item_ids):
+            raise ValueError(
+                "Not enough stock to correct the production record, or one of its items no longer exists."
+            )
+        for row in rows:
+            project.stock_levels.add_delta(
+                deltas,
+                project.stock_levels.StockKey(
+                    kind, row["type"], row["grade"], row["unit"]
+                ),
+                project.stock_levels.StockDelta(quantity=row["delta"]),
+            )
+    await project.stock_levels.apply_stock_deltas(client, deltas)
+    await project.inventory_ledger.record_movements(
+        client,
+        [
+            project.inventory_ledger.Movement(
+                kind,
+                item_id,
+                prisma.enums.MovementType.ADJUSTMENT,
+                quantity,
+                record_reason(recordId),
+            )
+            for (kind, item_id), quantity in moves.items()
+        ],
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import prisma
+import project.inventory_events
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def as_utc(value: Union[str, datetime]) -> datetime:
+    """
+    Normalizes a timestamp read from the database (raw queries return ISO strings) to an aware UTC datetime.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class DeadlineScheduler:
+    """
+    Min-heap timer that calls `on_due` with the keys whose deadline has passed.
+
+    The worker sleeps until the earliest deadline (or until an earlier one is scheduled)
+    instead of polling, so tens of thousands of pending deadlines cost one heap entry each
+    and O(log n) per schedule. Cancelled or rescheduled keys are dropped lazily when they
+    reach the top of the heap.
+    """
+
+    def __init__(
+        self,
+        on_due: Callable[[List[str], datetime], Awaitable[None]],
+        batch_size: int = 500,
+    ) -> None:
+        self._on_due = on_due
+        self._batch_size = batch_size
+        self._heap: List[Tuple[datetime, str]] = []
+        self._deadlines: Dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: str, deadline: datetime) -> None:
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if self._heap[0] == (deadline, key):
+            self._wakeup.set()
+
+    def cancel(self, key: str) -> None:
+        self._deadlines.pop(key, None)
+
+    def load(self, entries: Iterable[Tuple[str, datetime]]) -> None:
+        """
+        Replaces all pending deadlines at once, e.g. when rebuilding state on startup.
+        """
+        self._deadlines = dict(entries)
+        self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        due = []
+        while self._heap and len(due) < self._batch_size:
+            deadline, key = self._heap[0]
+            if self._deadlines.get(key) != deadline:
+                heapq.heappop(self._heap)
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            del self._deadlines[key]
+            due.append(key)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc)
+            due = self._pop_due(now)
+            if due:
+                try:
+                    await self._on_due(due, now)
+                except Exception:
+                    logger.exception("Failed to process %d due deadlines", len(due))
+                    for key in due:
+                        self.schedule(key, now + RETRY_DELAY)
+                continue
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def releaseExpiredReservations(quoteIds: List[str], now: datetime) -> None:
+    """
+    Releases the stock held by expired quotes in one statement: the reservations are marked released and the reserved quantity of every affected product and stock counter is decremented by their sum.
+
+    Args:
+        quoteIds (List[str]): Quotes whose expiry deadline has passed.
+        now (datetime): The time the deadlines were checked against.
+    """
+    rows = await prisma.get_client().query_raw(
+        """
+        WITH released AS (
+            UPDATE "InventoryReservation"
+            SET "releasedAt" = now()
+            WHERE "quoteId" = ANY($1::text[])
+              AND "releasedAt" IS NULL
+              AND "expiresAt" <= $2::timestamp
+            RETURNING "finishedProductId", "quantity"
+        ),
+        totals AS (
+            SELECT "finishedProductId", SUM("quantity")::int AS "quantity"
+            FROM released
+            GROUP BY "finishedProductId"
+        ),
+        products AS (
+            UPDATE "FinishedProduct" fp
+            SET "reservedQuantity" = fp."reservedQuantity" - t."quantity", "version" = fp."version" + 1,
+                "updatedAt" = now()
+            FROM totals t
+            WHERE fp."id" = t."finishedProductId"
+            RETURNING fp."id", fp."type", fp."grade", fp."unit", t."quantity"
+        ),
+        levels AS (
+            SELECT "type", "grade", "unit", SUM("quantity")::int AS "quantity"
+            FROM products
+            GROUP BY "type", "grade", "unit"
+        ),
+        counters AS (
+            UPDATE "StockLevel" s
+            SET "reservedQuantity" = s."reservedQuantity" - l."quantity", "updatedAt" = now()
+            FROM levels l
+            WHERE s."kind" = 'FinishedProduct'
+              AND s."type" = l."type" AND s."grade" = l."grade" AND s."unit" = l."unit"
+        )
+        SELECT "id" FROM products
+        """,
+        quoteIds,
+        now,
+    )
+    project.inventory_events.inventory_changed(
+        ("FinishedProduct", row["id"]) for row in rows
+    )
+
+
+reservation_expiry = DeadlineScheduler(releaseExpiredReservations)
+
+
+async def startReservationExpiry() -> None:
+    """
+    Loads the expiry deadline of every quote still holding stock and starts the sweeper.
+    """
+    rows = await prisma.get_client().query_raw("""
+        SELECT "quoteId", MIN("expiresAt") AS "expiresAt"
+        FROM "InventoryReservation"
+        WHERE "releasedAt" IS NULL
+        GROUP BY "quoteId"
+        """)
+    reservation_expiry.load((row["quoteId"], as_utc(row["expiresAt"])) for row in rows)
+    reservation_expiry.start()
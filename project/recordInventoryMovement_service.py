@@ -0,0 +1,94 @@
+from typing import Optional
+
+import prisma
+import prisma.enums
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
+from pydantic import BaseModel
+
+
+class InventoryMovementResponse(BaseModel):
+    """
+    The recorded movement together with the resulting stock of the item.
+    """
+
+    itemId: str
+    kind: str
+    movementType: prisma.enums.MovementType
+    quantityDelta: int
+    quantity: int
+    version: int
+
+
+async def recordInventoryMovement(
+    itemId: str,
+    kind: str,
+    movementType: prisma.enums.MovementType,
+    quantityDelta: int,
+    reason: Optional[str],
+) -> InventoryMovementResponse:
+    """
+    Records a receipt, consumption, production or adjustment of stock for one inventory item. The ledger entry, the item quantity and the stock counters are written in one transaction, and the quantity is changed in place by the database so concurrent movements never overwrite each other.
+
+    Args:
+        itemId (str): The raw material or finished product the stock moved for.
+        kind (str): Either 'RawMaterial' or 'FinishedProduct'.
+        movementType (prisma.enums.MovementType): RECEIPT, CONSUMPTION, PRODUCTION or ADJUSTMENT.
+        quantityDelta (int): Change of the quantity; negative for stock leaving.
+        reason (Optional[str]): Free-text note stored with the movement.
+
+    Returns:
+        InventoryMovementResponse: The recorded movement together with the resulting stock of the item.
+
+    Raises:
+        ValueError: If the kind is unknown, the item does not exist or the movement would take the stock below zero (or below the reserved quantity of a finished product).
+    """
+    if kind == project.stock_levels.RAW_MATERIAL:
+        table, grade, floor = '"RawMaterial"', "''", "0"
+    elif kind == project.stock_levels.FINISHED_PRODUCT:
+        table, grade, floor = '"FinishedProduct"', '"grade"', '"reservedQuantity"'
+    else:
+        raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+    if quantityDelta == 0:
+        raise ValueError("quantityDelta must not be zero.")
+    async with prisma.get_client().tx() as transaction:
+        item = await transaction.query_first(
+            f"""
+            UPDATE {table}
+            SET "quantity" = "quantity" + $1, "version" = "version" + 1, "updatedAt" = now()
+            WHERE "id" = $2 AND "quantity" + $1 >= {floor}
+            RETURNING "type", {grade} AS "grade", "unit", "quantity", "version"
+            """,
+            quantityDelta,
+            itemId,
+        )
+        if not item:
+            raise ValueError(
+                "Inventory item does not exist or does not have enough unreserved stock."
+            )
+        await project.stock_levels.apply_stock_deltas(
+            transaction,
+            {
+                project.stock_levels.StockKey(
+                    kind, item["type"], item["grade"], item["unit"]
+                ): project.stock_levels.StockDelta(quantity=quantityDelta)
+            },
+        )
+        await project.inventory_ledger.record_movements(
+            transaction,
+            [
+                project.inventory_ledger.Movement(
+                    kind, itemId, movementType, quantityDelta, reason
+                )
+            ],
+        )
+    project.inventory_events.inventory_changed([(kind, itemId)])
+    return InventoryMovementResponse(
+        itemId=itemId,
+        kind=kind,
+        movementType=movementType,
+        quantityDelta=quantityDelta,
+        quantity=item["quantity"],
+        version=item["version"],
+    )
@@ -1,7 +1,10 @@
 from typing import List, Tuple
 
 import prisma
-import prisma.models
+import project.dimensions
+import project.inventory_events
+import project.production_rollups
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -22,66 +25,125 @@ async def recordProduction(
     quantityProduced: int,
     lumberDimensions: List[Tuple[int, int, int]],
     lumberGrade: str,
+    rawMaterialConsumed: int = 1,
 ) -> ProductionDataResponse:
     """
     Stores daily production data including quantities, dimensions, and grades of lumber produced. Essential for production tracking and reporting.
 
+    The whole write is one SQL statement, i.e. one round trip and one implicit transaction: it checks the user, raw material and finished product exist, takes the consumed raw material out of stock, adds the produced quantity to the finished product, inserts the record, and writes the ledger movements, stock counters and daily production rollup. If a reference is missing or the raw material is short, nothing is written.
+
     Args:
         userId (str): Identifier for the user logging the production. Should correspond to an existing user in the 'User' DB model.
         rawMaterialId (str): Identifier for the raw material used in the production. Must match an existing raw material entry in the database.
         finishedProductId (str): Identifier for the finished lumber product produced. Should link to the 'FinishedProduct' model for specifics like grade and dimensions.
         quantityProduced (int): The total quantity of finished products produced in this record.
-        lumberDimensions (List[Tuple[int, int, int]]): List of dimensions of lumber produced. This field allows recording different sizes made during a production cycle.
+        lumberDimensions (List[Tuple[int, int, int]]): List of (thickness in inches, width in inches, length in feet) sizes of lumber produced. This field allows recording different sizes made during a production cycle; the quantity produced is assumed to be split evenly across them.
         lumberGrade (str): Grade of the lumber produced, categorized by quality e.g., A, B, C.
+        rawMaterialConsumed (int): Quantity of the raw material used up, in its own unit (e.g. logs).
 
     Returns:
         ProductionDataResponse: Response after logging a production entry. Confirms the creation of the production log.
     """
-    user = await prisma.models.User.prisma().find_unique(where={"id": userId})
-    if not user:
-        return ProductionDataResponse(
-            success=False,
-            productionRecordId="",
-            message="No user found with provided UserId.",
+    if quantityProduced < 0 or rawMaterialConsumed < 0:
+        raise ValueError(
+            "quantityProduced and rawMaterialConsumed must not be negative."
         )
-    raw_material = await prisma.models.RawMaterial.prisma().find_unique(
-        where={"id": rawMaterialId}
+    sizes = project.dimensions.as_array(lumberDimensions)
+    board_feet = (
+        float(project.dimensions.board_feet_batch(sizes).mean()) * quantityProduced
+        if len(sizes)
+        else 0.0
     )
-    if not raw_material:
-        return ProductionDataResponse(
-            success=False,
-            productionRecordId="",
-            message="No raw material found with provided RawMaterialId.",
-        )
-    finished_product = await prisma.models.FinishedProduct.prisma().find_unique(
-        where={"id": finishedProductId}
+    dimension_keys = ",".join(
+        project.dimensions.dimension_key(project.dimensions.Dimensions(*size))
+        for size in lumberDimensions
     )
-    if not finished_product:
-        return ProductionDataResponse(
-            success=False,
-            productionRecordId="",
-            message="No finished product found with provided FinishedProductId.",
-        )
-    lumber_dimension_str = str(lumberDimensions)
-    new_production_record = await prisma.models.ProductionRecord.prisma().create(
-        data={
-            "userId": userId,
-            "rawMaterialId": rawMaterialId,
-            "finishedProductId": finishedProductId,
-            "quantityProduced": quantityProduced,
-            "lumberGrade": lumberGrade,
-            "lumberDimensions": lumber_dimension_str,
-        }
+    result = await prisma.get_client().query_first(
+        f"""
+        WITH raw AS (
+            UPDATE "RawMaterial"
+            SET "quantity" = "quantity" - $4, "version" = "version" + 1, "updatedAt" = now()
+            WHERE "id" = $2
+              AND "quantity" >= $4
+              AND EXISTS (SELECT 1 FROM "User" WHERE "id" = $1)
+              AND EXISTS (SELECT 1 FROM "FinishedProduct" WHERE "id" = $3)
+            RETURNING "id", "type", "unit"
+        ),
+        finished AS (
+            UPDATE "FinishedProduct"
+            SET "quantity" = "quantity" + $5, "version" = "version" + 1, "updatedAt" = now()
+            WHERE "id" = $3 AND EXISTS (SELECT 1 FROM raw)
+            RETURNING "id", "type", "grade", "unit"
+        ),
+        record AS (
+            INSERT INTO "ProductionRecord"
+                ("userId", "rawMaterialId", "finishedProductId", "quantityProduced",
+                 "boardFeet", "lumberGrade", "materialType", "lumberDimensions", "updatedAt")
+            SELECT $1, raw."id", finished."id", $5, $6, $7, finished."type", $8, now()
+            FROM raw, finished
+            RETURNING "id", "createdAt", "materialType", "lumberGrade", "quantityProduced", "boardFeet"
+        ),
+        movements AS (
+            INSERT INTO "InventoryMovement" ("kind", "itemId", "type", "quantityDelta", "reason")
+            SELECT m."kind", m."itemId", m."type"::"MovementType", m."quantityDelta",
+                   'Production record ' || record."id"
+            FROM record, (
+                SELECT 'RawMaterial' AS "kind", "id" AS "itemId", 'CONSUMPTION' AS "type",
+                       -$4::int AS "quantityDelta"
+                FROM raw
+                UNION ALL
+                SELECT 'FinishedProduct', "id", 'PRODUCTION', $5::int FROM finished
+            ) m
+            WHERE m."quantityDelta" <> 0
+        ),
+        counters AS (
+            INSERT INTO "StockLevel" ("kind", "type", "grade", "unit", "quantity", "reservedQuantity", "itemCount", "updatedAt")
+            SELECT d."kind", d."type", d."grade", d."unit", d."quantity", 0, 0, now()
+            FROM record, (
+                SELECT 'RawMaterial' AS "kind", "type", '' AS "grade", "unit", -$4::int AS "quantity"
+                FROM raw
+                UNION ALL
+                SELECT 'FinishedProduct', "type", "grade", "unit", $5::int FROM finished
+            ) d
+            ON CONFLICT ("kind", "type", "grade", "unit") DO UPDATE
+            SET "quantity" = "StockLevel"."quantity" + EXCLUDED."quantity",
+                "updatedAt" = now()
+        ),
+        rollup AS ({project.production_rollups.rollup_upsert("record")})
+        SELECT (SELECT "id" FROM record) AS "recordId",
+               EXISTS (SELECT 1 FROM "User" WHERE "id" = $1) AS "userExists",
+               EXISTS (SELECT 1 FROM "RawMaterial" WHERE "id" = $2) AS "rawMaterialExists",
+               EXISTS (SELECT 1 FROM "FinishedProduct" WHERE "id" = $3) AS "finishedProductExists"
+        """,
+        userId,
+        rawMaterialId,
+        finishedProductId,
+        rawMaterialConsumed,
+        quantityProduced,
+        board_feet,
+        lumberGrade,
+        dimension_keys,
     )
-    if new_production_record:
-        return ProductionDataResponse(
-            success=True,
-            productionRecordId=new_production_record.id,
-            message="Production data successfully recorded.",
-        )
-    else:
+    if result["recordId"] is None:
+        if not result["userExists"]:
+            message = "No user found with provided UserId."
+        elif not result["rawMaterialExists"]:
+            message = "No raw material found with provided RawMaterialId."
+        elif not result["finishedProductExists"]:
+            message = "No finished product found with provided FinishedProductId."
+        else:
+            message = "Not enough raw material in stock."
         return ProductionDataResponse(
-            success=False,
-            productionRecordId="",
-            message="Failed to record production data.",
+            success=False, productionRecordId="", message=message
         )
+    project.inventory_events.inventory_changed(
+        [
+            (project.stock_levels.RAW_MATERIAL, rawMaterialId),
+            (project.stock_levels.FINISHED_PRODUCT, finishedProductId),
+        ]
+    )
+    return ProductionDataResponse(
+        success=True,
+        productionRecordId=result["recordId"],
+        message="Production data successfully recorded.",
+    )
@@ -0,0 +1,47 @@
+from typing import List
+
+import project.inventory_holds
+from pydantic import BaseModel
+
+
+class ReleasedHold(BaseModel):
+    """
+    Stock that was held for the optimization and is available again.
+    """
+
+    kind: str
+    itemId: str
+    quantity: int
+
+
+class ReleaseHoldResponse(BaseModel):
+    """
+    The holds released for an optimization request.
+    """
+
+    requestId: str
+    released: List[ReleasedHold]
+
+
+async def releaseOptimizationHold(requestId: str) -> ReleaseHoldResponse:
+    """
+    Releases the raw material held for a cutting plan before its hold expires, e.g. once the plan has been cut or was abandoned.
+
+    Args:
+        requestId (str): The request ID returned when the optimization was created.
+
+    Returns:
+        ReleaseHoldResponse: The released holds; empty if the plan held nothing or its hold already expired.
+
+    Example:
+        await releaseOptimizationHold("9f1c2d...")
+        > ReleaseHoldResponse(requestId="9f1c2d...", released=[ReleasedHold(kind="RawMaterial", itemId="rm-1", quantity=40)])
+    """
+    holds = project.inventory_holds.holds.release("optimization", requestId)
+    return ReleaseHoldResponse(
+        requestId=requestId,
+        released=[
+            ReleasedHold(kind=hold.kind, itemId=hold.itemId, quantity=hold.quantity)
+            for hold in holds
+        ],
+    )
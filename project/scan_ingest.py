@@ -0,0 +1,280 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+import prisma
+import prisma.enums
+import project.db_errors
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
+from pydantic import BaseModel, Field, field_validator
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING_SCANS = 20000
+
+BATCH_SIZE = 1000
+
+FLUSH_INTERVAL = 0.1
+
+RETRY_BACKOFF = 1.0
+
+MAX_RETRY_BACKOFF = 30.0
+
+MAX_DEAD_LETTERS = 10000
+
+# Bounds of the int4 "quantity" column.
+MIN_QUANTITY_DELTA = -(2**31)
+
+MAX_QUANTITY_DELTA = 2**31 - 1
+
+ITEM_TABLES = {
+    project.stock_levels.RAW_MATERIAL: ('"RawMaterial"', "''"),
+    project.stock_levels.FINISHED_PRODUCT: ('"FinishedProduct"', 't."grade"'),
+}
+
+
+class ScanEvent(BaseModel):
+    """
+    One barcode or RFID scan of an inventory item, e.g. a board passing the green chain (PRODUCTION) or a log truck at the yard gate (RECEIPT).
+    """
+
+    itemId: str
+    kind: str
+    movementType: prisma.enums.MovementType = prisma.enums.MovementType.PRODUCTION
+    quantityDelta: int = Field(1, ge=MIN_QUANTITY_DELTA, le=MAX_QUANTITY_DELTA)
+    scannerId: Optional[str] = None
+
+    @field_validator("quantityDelta")
+    @classmethod
+    def nonzero(cls, quantityDelta: int) -> int:
+        if quantityDelta == 0:
+            raise ValueError("quantityDelta must not be zero.")
+        return quantityDelta
+
+
+class ScanBufferFull(Exception):
+    """
+    Raised when the write-behind buffer cannot take more scans; the scanner should retry shortly.
+    """
+
+
+class ScanBuffer:
+    """
+    Write-behind buffer between the scan endpoint and the database.
+
+    Scans are acknowledged as soon as they are queued in memory. A background task writes
+    them in micro-batches, when BATCH_SIZE scans are pending or every FLUSH_INTERVAL
+    seconds. Each batch is one transaction: one set-based quantity update per item table,
+    one counter upsert and one multi-row ledger insert. When MAX_PENDING_SCANS are queued,
+    e.g. while the database is unavailable, new scans are refused instead of growing
+    memory without bound. A batch the database rejects because of its data, e.g. summed
+    deltas that overflow a quantity, is retried scan by scan and the scans that still fail
+    are moved to `dead_letters` and logged, so one bad scan cannot stall the queue. Any
+    other failure, e.g. the database being unreachable, keeps the batch queued and is
+    retried with a backoff capped at MAX_RETRY_BACKOFF seconds.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = MAX_PENDING_SCANS,
+        batch_size: int = BATCH_SIZE,
+        interval: float = FLUSH_INTERVAL,
+        max_dead_letters: int = MAX_DEAD_LETTERS,
+    ) -> None:
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dead_letters: Deque[ScanEvent] = deque(maxlen=max_dead_letters)
+        self._pending: Deque[ScanEvent] = deque()
+        self._failures = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, scans: Sequence[ScanEvent]) -> int:
+        """
+        Queues scans for writing.
+
+        Args:
+            scans (Sequence[ScanEvent]): The scans to queue; all or none of them are accepted.
+
+        Returns:
+            int: Number of scans waiting to be written, including these.
+
+        Raises:
+            ValueError: If a scan has an unknown kind.
+            ScanBufferFull: If the buffer has no room for the scans.
+        """
+        for scan in scans:
+            if scan.kind not in ITEM_TABLES:
+                raise ValueError(
+                    "kind must be either 'RawMaterial' or 'FinishedProduct'."
+                )
+        if len(self._pending) + len(scans) > self.max_pending:
+            raise ScanBufferFull(
+                f"{len(self._pending)} scans are waiting to be written; retry shortly."
+            )
+        self._pending.extend(scans)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the background writer after writing the scans still queued.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(
+                    "Failed to write scans; %d are waiting", len(self._pending)
+                )
+                await asyncio.sleep(
+                    min(RETRY_BACKOFF * 2 ** (self._failures - 1), MAX_RETRY_BACKOFF)
+                )
+
+    async def flush(self) -> None:
+        """
+        Writes all queued scans in batches of at most `batch_size`. A batch rejected because of its data is written scan by scan and the scans that still fail are dead-lettered; after any other failure the batch is put back at the front of the queue.
+        """
+        while self._pending:
+            batch = [
+                self._pending.popleft()
+                for _ in range(min(self.batch_size, len(self._pending)))
+            ]
+            try:
+                await write_scans(batch)
+            except Exception as e:
+                if not project.db_errors.is_data_error(e):
+                    self._failures += 1
+                    self._pending.extendleft(reversed(batch))
+                    raise
+                await self._write_singly(batch)
+                self._failures = 0
+            except BaseException:
+                self._pending.extendleft(reversed(batch))
+                raise
+            else:
+                self._failures = 0
+
+    async def _write_singly(self, batch: List[ScanEvent]) -> None:
+        for index, scan in enumerate(batch):
+            try:
+                await write_scans([scan])
+            except Exception as e:
+                if not project.db_errors.is_data_error(e):
+                    self._failures += 1
+                    self._pending.extendleft(reversed(batch[index:]))
+                    raise
+                logger.exception("Dead-lettering scan %s", scan.model_dump_json())
+                self.dead_letters.append(scan)
+            except BaseException:
+                self._pending.extendleft(reversed(batch[index:]))
+                raise
+
+
+async def unknown_items(scans: Sequence[ScanEvent]) -> List[Tuple[str, str]]:
+    """
+    Returns the (kind, itemId) of the scanned items that do not exist, with one query per item table.
+    """
+    keys: Set[Tuple[str, str]] = {
+        (scan.kind, scan.itemId) for scan in scans if scan.kind in ITEM_TABLES
+    }
+    existing: Set[Tuple[str, str]] = set()
+    for kind, (table, _) in ITEM_TABLES.items():
+        item_ids = [item_id for k, item_id in keys if k == kind]
+        if not item_ids:
+            continue
+        rows = await prisma.get_client().query_raw(
+            f'SELECT "id" FROM {table} WHERE "id" = ANY($1::text[])', item_ids
+        )
+        existing.update((kind, row["id"]) for row in rows)
+    return sorted(keys - existing)
+
+
+async def write_scans(scans: Sequence[ScanEvent]) -> None:
+    """
+    Writes one batch of scans in one transaction. Scans of items deleted since they were queued are dropped. Quantities are not checked against zero: a scan records something that physically happened.
+    """
+    deltas: Dict[Tuple[str, str], int] = {}
+    for scan in scans:
+        key = (scan.kind, scan.itemId)
+        deltas[key] = deltas.get(key, 0) + scan.quantityDelta
+    written: List[Tuple[str, str]] = []
+    async with prisma.get_client().tx() as transaction:
+        stock_deltas: project.stock_levels.StockDeltas = {}
+        for kind, (table, grade) in ITEM_TABLES.items():
+            item_ids = sorted(item_id for k, item_id in deltas if k == kind)
+            if not item_ids:
+                continue
+            rows = await transaction.query_raw(
+                f"""
+                UPDATE {table} t
+                SET "quantity" = t."quantity" + d."delta",
+                    "version" = t."version" + 1,
+                    "updatedAt" = now()
+                FROM unnest($1::text[], $2::int[]) AS d("id", "delta")
+                WHERE t."id" = d."id"
+                RETURNING t."id", t."type", {grade} AS "grade", t."unit", d."delta"
+                """,
+                item_ids,
+                [deltas[(kind, item_id)] for item_id in item_ids],
+            )
+            for row in rows:
+                written.append((kind, row["id"]))
+                project.stock_levels.add_delta(
+                    stock_deltas,
+                    project.stock_levels.StockKey(
+                        kind, row["type"], row["grade"], row["unit"]
+                    ),
+                    project.stock_levels.StockDelta(quantity=row["delta"]),
+                )
+        if len(written) < len(deltas):
+            logger.warning(
+                "Dropping scans of %d unknown items", len(deltas) - len(written)
+            )
+        existing = set(written)
+        await project.stock_levels.apply_stock_deltas(transaction, stock_deltas)
+        await project.inventory_ledger.record_movements(
+            transaction,
+            [
+                project.inventory_ledger.Movement(
+                    scan.kind,
+                    scan.itemId,
+                    scan.movementType,
+                    scan.quantityDelta,
+                    f"Scanner {scan.scannerId}" if scan.scannerId else "Scan",
+                )
+                for scan in scans
+                if (scan.kind, scan.itemId) in existing
+            ],
+        )
+    project.inventory_events.inventory_changed(written)
+
+
+scan_buffer = ScanBuffer()
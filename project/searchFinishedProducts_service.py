@@ -0,0 +1,112 @@
+from typing import List, Optional
+
+import project.dimensions
+import project.product_search
+from pydantic import BaseModel
+
+MAX_RESULTS = 1000
+
+
+class ProductMatch(BaseModel):
+    """
+    A finished product matching the dimension search.
+    """
+
+    id: str
+    type: str
+    grade: str
+    unit: str
+    dimensions: str
+    thickness_in: float
+    width_in: float
+    length_ft: float
+    quantity: int
+    available_quantity: int
+
+
+class ProductSearchResponse(BaseModel):
+    """
+    The matching finished products, ordered by cross-section, grade and length, with the total number of matches.
+    """
+
+    total: int
+    products: List[ProductMatch]
+
+
+async def searchFinishedProducts(
+    cross_section: Optional[str],
+    thickness_min: Optional[float],
+    thickness_max: Optional[float],
+    width_min: Optional[float],
+    width_max: Optional[float],
+    length_min: Optional[float],
+    length_max: Optional[float],
+    grade: Optional[str],
+    min_available: int,
+    limit: int,
+) -> ProductSearchResponse:
+    """
+    Finds finished products in stock by dimension ranges and grade, e.g. all 2x6 of grade #2 between 10 and 16 feet. Served from the in-memory dimension index.
+
+    Args:
+        cross_section (Optional[str]): Exact thickness x width in inches, e.g. "2x6"; overrides the thickness and width ranges.
+        thickness_min (Optional[float]): Minimum thickness in inches.
+        thickness_max (Optional[float]): Maximum thickness in inches.
+        width_min (Optional[float]): Minimum width in inches.
+        width_max (Optional[float]): Maximum width in inches.
+        length_min (Optional[float]): Minimum length in feet.
+        length_max (Optional[float]): Maximum length in feet.
+        grade (Optional[str]): Comma-separated accepted grades; any grade when omitted.
+        min_available (int): Minimum unreserved quantity of a match.
+        limit (int): Maximum number of products returned, at most 1000.
+
+    Returns:
+        ProductSearchResponse: The matching finished products with the total number of matches.
+
+    Example:
+        await searchFinishedProducts("2x6", None, None, None, None, 10, 16, "#2", 1, 100)
+        > ProductSearchResponse(total=3, products=[ProductMatch(dimensions='2x6x10', ...), ...])
+    """
+    if limit < 1 or limit > MAX_RESULTS:
+        raise ValueError(f"limit must be between 1 and {MAX_RESULTS}.")
+    if cross_section:
+        parts = cross_section.lower().split("x")
+        if len(parts) != 2:
+            raise ValueError("cross_section must look like 2x6.")
+        thickness_min = thickness_max = float(parts[0])
+        width_min = width_max = float(parts[1])
+    grades = (
+        {value.strip() for value in grade.split(",") if value.strip()}
+        if grade
+        else None
+    )
+    matches, total = await project.product_search.product_index.search(
+        project.product_search.Range(thickness_min, thickness_max),
+        project.product_search.Range(width_min, width_max),
+        project.product_search.Range(length_min, length_max),
+        grades,
+        min_available,
+        limit,
+    )
+    return ProductSearchResponse(
+        total=total,
+        products=[
+            ProductMatch(
+                id=product.id,
+                type=product.type,
+                grade=product.grade,
+                unit=product.unit,
+                dimensions=project.dimensions.dimension_key(
+                    project.dimensions.Dimensions(
+                        product.thicknessIn, product.widthIn, product.lengthFt
+                    )
+                ),
+                thickness_in=product.thicknessIn,
+                width_in=product.widthIn,
+                length_ft=product.lengthFt,
+                quantity=product.quantity,
+                available_quantity=product.quantity - product.reservedQuantity,
+            )
+            for product in matches
+        ],
+    )
@@ -6,13 +6,14 @@ from typing import Dict, List, Optional, Tuple, Type
 import prisma
 import prisma.enums
 import project.addInventoryItem_service
+import project.adjustInventory_service
 import project.backupData_service
+import project.cache
 import project.createCustomer_service
 import project.createInvoice_service
 import project.createMaintenanceLog_service
 import project.createOptimizationRequest_service
 import project.createPriceEstimate_service
-import project.createProductionRecord_service
 import project.createQuote_service
 import project.deleteCustomer_service
 import project.deleteInventoryItem_service
@@ -20,15 +21,19 @@ import project.deleteMaintenanceLog_service
 import project.deleteOptimizationRequest_service
 import project.deletePriceEstimate_service
 import project.deleteProductionRecord_service
+import project.exportInventory_service
 import project.fetchReports_service
 import project.getAllProductionRecords_service
 import project.getBackupStatus_service
+import project.getBulkInvoicingStatus_service
 import project.getCustomer_service
 import project.getCuttingInstructions_service
+import project.getInventoryAggregates_service
 import project.getInventoryItem_service
 import project.getInventoryList_service
 import project.getInvoice_service
 import project.getMaintenanceLog_service
+import project.getMarginAnalytics_service
 import project.getOptimizationResults_service
 import project.getPriceEstimate_service
 import project.getPriceEstimates_service
@@ -37,23 +42,44 @@ import project.getProductionReport_service
 import project.getQuote_service
 import project.getRecoveryLogs_service
 import project.getSalesReport_service
+import project.getSawlineThroughput_service
+import project.getStockAsOf_service
 import project.getYieldReport_service
+import project.idempotency
+import project.importInventory_service
+import project.ingestScans_service
+import project.ingestTelemetry_service
+import project.inventory_catalog
+import project.inventory_holds
+import project.inventory_ledger
 import project.listCustomers_service
 import project.listInventory_service
 import project.listMaintenanceLogs_service
 import project.listOptimizations_service
 import project.logMaintenance_service
+import project.product_search
+import project.production_partitions
+import project.quote_expiry
+import project.recordInventoryMovement_service
 import project.recordProduction_service
+import project.releaseOptimizationHold_service
+import project.scan_ingest
+import project.searchFinishedProducts_service
+import project.setReorderThreshold_service
 import project.startBackup_service
+import project.startBulkInvoicing_service
 import project.startRecovery_service
+import project.stock_alerts
+import project.stock_levels
+import project.telemetry
 import project.updateCustomer_service
 import project.updateInventoryItem_service
 import project.updateMaintenanceLog_service
 import project.updatePriceEstimate_service
 import project.updateProductionRecord_service
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from prisma import Prisma
 
 logger = logging.getLogger(__name__)
@@ -64,7 +90,25 @@ db_client = Prisma(auto_register=True)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db_client.connect()
+    await project.inventory_catalog.createCatalogView()
+    await project.stock_levels.rebuildStockLevels()
+    await project.quote_expiry.startReservationExpiry()
+    await project.inventory_ledger.startSnapshots()
+    await project.production_partitions.startPartitionMaintenance()
+    await project.stock_alerts.stock_alerts.load()
+    await project.product_search.product_index.load()
+    await project.inventory_holds.holds.load()
+    project.scan_ingest.scan_buffer.start()
+    project.idempotency.idempotency_keys.start()
+    await project.telemetry.telemetry_buffer.load()
     yield
+    await project.idempotency.idempotency_keys.stop()
+    await project.telemetry.telemetry_buffer.stop()
+    await project.scan_ingest.scan_buffer.stop()
+    await project.inventory_holds.holds.stop()
+    await project.production_partitions.stopPartitionMaintenance()
+    await project.inventory_ledger.stopSnapshots()
+    await project.quote_expiry.reservation_expiry.stop()
     await db_client.disconnect()
 
 
@@ -75,6 +119,9 @@ app = FastAPI(
 )
 
 
+app.add_middleware(project.idempotency.IdempotencyMiddleware)
+
+
 @app.get(
     "/cutting-instructions",
     response_model=project.getCuttingInstructions_service.CuttingInstructionsResponse,
@@ -104,6 +151,40 @@ async def api_get_getCuttingInstructions(
         )
 
 
+@app.get(
+    "/reports/margins",
+    response_model=project.getMarginAnalytics_service.MarginAnalyticsResponse,
+)
+async def api_get_getMarginAnalytics(
+    start_date: date,
+    end_date: date,
+    group_by: str = "grade",
+    period: str = "month",
+    if_none_match: Optional[str] = Header(None),
+) -> project.getMarginAnalytics_service.MarginAnalyticsResponse | Response:
+    """
+    Reports revenue, expected profit and margin percentage of price estimates grouped by grade, dimension, customer and/or period. Results are cached per month covered and carry an ETag.
+    """
+    try:
+        entry = await project.cache.response_cache.get_or_load(
+            f"margins:{start_date}:{end_date}:{group_by}:{period}",
+            lambda: project.getMarginAnalytics_service.getMarginAnalytics(
+                start_date, end_date, group_by, period
+            ),
+            project.getMarginAnalytics_service.margin_analytics_tags,
+        )
+        return project.cache.cached_response(entry, if_none_match)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
 @app.get(
     "/reports/{reportType}",
     response_model=project.fetchReports_service.GetReportResponse,
@@ -179,6 +260,65 @@ async def api_post_createCustomer(
         )
 
 
+@app.post(
+    "/production/telemetry",
+    response_model=project.ingestTelemetry_service.TelemetryBatchResponse,
+)
+async def api_post_ingestTelemetry(
+    batch: project.ingestTelemetry_service.TelemetryBatch,
+) -> project.ingestTelemetry_service.TelemetryBatchResponse | Response:
+    """
+    Accepts batched machine counter samples from the sawline bridge, deduplicated by sequence number and folded into per-minute production rows. Responds with 503 and Retry-After when the write buffer is full.
+    """
+    try:
+        res = await project.ingestTelemetry_service.ingestTelemetry(batch)
+        return res
+    except project.telemetry.TelemetryBufferFull as e:
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "5"},
+            media_type="application/json",
+        )
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/production/throughput",
+    response_model=project.getSawlineThroughput_service.ThroughputResponse,
+)
+async def api_get_getSawlineThroughput(
+    start: datetime, end: datetime, machine_id: Optional[str] = None
+) -> project.getSawlineThroughput_service.ThroughputResponse | Response:
+    """
+    Returns per-minute piece counts of the sawline machines in a time range.
+    """
+    try:
+        res = await project.getSawlineThroughput_service.getSawlineThroughput(
+            start, end, machine_id
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
 @app.post(
     "/production",
     response_model=project.recordProduction_service.ProductionDataResponse,
@@ -190,6 +330,7 @@ async def api_post_recordProduction(
     quantityProduced: int,
     lumberDimensions: List[Tuple[int, int, int]],
     lumberGrade: str,
+    rawMaterialConsumed: int = 1,
 ) -> project.recordProduction_service.ProductionDataResponse | Response:
     """
     Stores daily production data including quantities, dimensions, and grades of lumber produced. Essential for production tracking and reporting.
@@ -202,6 +343,7 @@ async def api_post_recordProduction(
             quantityProduced,
             lumberDimensions,
             lumberGrade,
+            rawMaterialConsumed,
         )
         return res
     except Exception as e:
@@ -268,16 +410,29 @@ async def api_get_getMaintenanceLog(
     response_model=project.updateInventoryItem_service.UpdateInventoryItemResponse,
 )
 async def api_put_updateInventoryItem(
-    itemId: str, quantity: int, dimensions: Optional[str], type: str
+    itemId: str,
+    quantity: int,
+    dimensions: Optional[str],
+    type: str,
+    version: Optional[int] = None,
 ) -> project.updateInventoryItem_service.UpdateInventoryItemResponse | Response:
     """
-    Updates existing inventory item information such as quantity, dimensions, or type. This endpoint is fundamental after any stock adjustment or post-production update, ensuring the data remains consistent across modules.
+    Updates existing inventory item information such as quantity, dimensions, or type. This endpoint is fundamental after any stock adjustment or post-production update, ensuring the data remains consistent across modules. Responds with 409 if the item no longer has the given version.
     """
     try:
         res = await project.updateInventoryItem_service.updateInventoryItem(
-            itemId, quantity, dimensions, type
+            itemId, quantity, dimensions, type, version
         )
         return res
+    except project.updateInventoryItem_service.InventoryVersionConflict as e:
+        res = dict()
+        res["error"] = str(e)
+        res["currentVersion"] = e.currentVersion
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=409,
+            media_type="application/json",
+        )
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
@@ -406,6 +561,56 @@ async def api_post_createInvoice(
         )
 
 
+@app.post(
+    "/invoices/bulk",
+    response_model=project.startBulkInvoicing_service.BulkInvoicingStatus,
+)
+async def api_post_startBulkInvoicing(
+    issueDate: datetime, dueDate: datetime, chunkSize: int = 500
+) -> project.startBulkInvoicing_service.BulkInvoicingStatus | Response:
+    """
+    Starts a month-end invoicing run that creates one invoice per customer with open (not yet invoiced) quotes. The run happens in the background; its progress can be followed with the returned job ID.
+    """
+    try:
+        res = await project.startBulkInvoicing_service.startBulkInvoicing(
+            issueDate, dueDate, chunkSize
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/invoices/bulk/{jobId}",
+    response_model=project.startBulkInvoicing_service.BulkInvoicingStatus,
+)
+async def api_get_getBulkInvoicingStatus(
+    jobId: str,
+) -> project.startBulkInvoicing_service.BulkInvoicingStatus | Response:
+    """
+    Reports the progress of a bulk invoicing run: how many customers were processed, how many invoices and quotes were written and the amount invoiced so far.
+    """
+    try:
+        res = await project.getBulkInvoicingStatus_service.getBulkInvoicingStatus(jobId)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
 @app.get(
     "/reports/yield", response_model=project.getYieldReport_service.YieldDataResponse
 )
@@ -535,15 +740,24 @@ async def api_delete_deleteOptimizationRequest(
 @app.get(
     "/price-estimates",
     response_model=project.getPriceEstimates_service.GetPriceEstimatesResponse,
+    response_model_exclude_unset=True,
 )
 async def api_get_getPriceEstimates(
-    request: project.getPriceEstimates_service.GetPriceEstimatesRequest,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    grade: Optional[str] = None,
+    quote_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
 ) -> project.getPriceEstimates_service.GetPriceEstimatesResponse | Response:
     """
-    Retrieves a list of all price estimates previously calculated and stored. Useful for reviewing past quotes and prices.
+    Retrieves price estimates previously calculated and stored, newest first, one keyset-paginated page at a time. Supports filters by grade, quote and creation date and a comma-separated list of fields to return. Useful for reviewing past quotes and prices.
     """
     try:
-        res = await project.getPriceEstimates_service.getPriceEstimates(request)
+        res = await project.getPriceEstimates_service.getPriceEstimates(
+            cursor, limit, grade, quote_id, created_from, created_to, fields
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -561,14 +775,18 @@ async def api_get_getPriceEstimates(
     response_model=project.getPriceEstimate_service.GetPriceEstimateResponse,
 )
 async def api_get_getPriceEstimate(
-    estimateId: str,
+    estimateId: str, if_none_match: Optional[str] = Header(None)
 ) -> project.getPriceEstimate_service.GetPriceEstimateResponse | Response:
     """
-    Retrieves detailed information for a specific price estimate by ID. Allows users to view the calculated details and quoted price of a specific estimate.
+    Retrieves detailed information for a specific price estimate by ID. Allows users to view the calculated details and quoted price of a specific estimate. Responses are served from the response cache and carry an ETag; a matching If-None-Match header yields 304 Not Modified.
     """
     try:
-        res = await project.getPriceEstimate_service.getPriceEstimate(estimateId)
-        return res
+        entry = await project.cache.response_cache.get_or_load(
+            project.cache.price_estimate_tag(estimateId),
+            lambda: project.getPriceEstimate_service.getPriceEstimate(estimateId),
+            lambda res: [project.cache.price_estimate_tag(res.id)],
+        )
+        return project.cache.cached_response(entry, if_none_match)
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
@@ -631,6 +849,307 @@ async def api_get_getOptimizationResults(
         )
 
 
+@app.get(
+    "/inventory/aggregates",
+    response_model=project.getInventoryAggregates_service.InventoryAggregatesResponse,
+)
+async def api_get_getInventoryAggregates(
+    kind: Optional[str] = None,
+    group_by: str = "type,grade,unit",
+    if_none_match: Optional[str] = Header(None),
+) -> project.getInventoryAggregates_service.InventoryAggregatesResponse | Response:
+    """
+    Returns inventory totals grouped by kind, type, grade, unit and/or dimension bucket, one row per group. Results are cached until the next inventory write and carry an ETag.
+    """
+    try:
+        entry = await project.cache.response_cache.get_or_load(
+            f"inventory-aggregates:{kind}:{group_by}",
+            lambda: project.getInventoryAggregates_service.getInventoryAggregates(
+                kind, group_by
+            ),
+            project.getInventoryAggregates_service.inventory_aggregates_tags,
+        )
+        return project.cache.cached_response(entry, if_none_match)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get("/inventory/export")
+async def api_get_exportInventory(kind: str) -> StreamingResponse | Response:
+    """
+    Exports all raw materials or finished products as CSV, streamed from the database with COPY.
+    """
+    try:
+        chunks = project.exportInventory_service.exportInventory(kind)
+        return StreamingResponse(
+            chunks,
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{kind}.csv"'},
+        )
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/inventory/import",
+    response_model=project.importInventory_service.ImportInventoryResponse,
+)
+async def api_post_importInventory(
+    kind: str, request: Request
+) -> project.importInventory_service.ImportInventoryResponse | Response:
+    """
+    Imports a CSV stocktake of raw materials or finished products from the request body. Rows with an id update that item, rows without one create a new item; the whole file is imported or nothing is.
+    """
+    try:
+        res = await project.importInventory_service.importInventory(
+            kind, request.stream()
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get("/inventory/alerts/stream")
+async def api_get_streamStockAlerts() -> StreamingResponse:
+    """
+    Streams low-stock and out-of-stock alerts as server-sent events the moment an inventory write changes an item's stock status.
+    """
+    return StreamingResponse(
+        project.stock_alerts.streamStockAlerts(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.put(
+    "/inventory/{itemId}/reorder-threshold",
+    response_model=project.setReorderThreshold_service.ReorderThresholdResponse,
+)
+async def api_put_setReorderThreshold(
+    itemId: str, kind: str, reorderThreshold: Optional[int] = None
+) -> project.setReorderThreshold_service.ReorderThresholdResponse | Response:
+    """
+    Sets the stock level at or below which an inventory item is reported as low stock.
+    """
+    try:
+        res = await project.setReorderThreshold_service.setReorderThreshold(
+            itemId, kind, reorderThreshold
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/inventory/search",
+    response_model=project.searchFinishedProducts_service.ProductSearchResponse,
+)
+async def api_get_searchFinishedProducts(
+    cross_section: Optional[str] = None,
+    thickness_min: Optional[float] = None,
+    thickness_max: Optional[float] = None,
+    width_min: Optional[float] = None,
+    width_max: Optional[float] = None,
+    length_min: Optional[float] = None,
+    length_max: Optional[float] = None,
+    grade: Optional[str] = None,
+    min_available: int = 1,
+    limit: int = 100,
+) -> project.searchFinishedProducts_service.ProductSearchResponse | Response:
+    """
+    Finds finished products in stock by dimension ranges and grade, e.g. all 2x6 of grade #2 between 10 and 16 feet.
+    """
+    try:
+        res = await project.searchFinishedProducts_service.searchFinishedProducts(
+            cross_section,
+            thickness_min,
+            thickness_max,
+            width_min,
+            width_max,
+            length_min,
+            length_max,
+            grade,
+            min_available,
+            limit,
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/inventory/stock-as-of",
+    response_model=project.getStockAsOf_service.StockAsOfResponse,
+)
+async def api_get_getStockAsOf(
+    at: datetime, kind: Optional[str] = None, itemId: Optional[str] = None
+) -> project.getStockAsOf_service.StockAsOfResponse | Response:
+    """
+    Reconstructs the stock levels at a point in time from the inventory ledger.
+    """
+    try:
+        res = await project.getStockAsOf_service.getStockAsOf(at, kind, itemId)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/inventory/adjustments",
+    response_model=project.adjustInventory_service.BulkAdjustmentResponse,
+)
+async def api_post_adjustInventory(
+    request: project.adjustInventory_service.BulkAdjustmentRequest,
+) -> project.adjustInventory_service.BulkAdjustmentResponse | Response:
+    """
+    Applies many quantity deltas in one transaction; either all of them apply or none does.
+    """
+    try:
+        res = await project.adjustInventory_service.adjustInventory(request)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/inventory/scans",
+    response_model=project.ingestScans_service.ScanBatchResponse,
+    status_code=202,
+)
+async def api_post_ingestScans(
+    request: project.ingestScans_service.ScanBatchRequest,
+) -> project.ingestScans_service.ScanBatchResponse | Response:
+    """
+    Accepts barcode/RFID scans for asynchronous, micro-batched writing. Responds with 503 and Retry-After when the write buffer is full.
+    """
+    try:
+        res = await project.ingestScans_service.ingestScans(request)
+        return res
+    except project.scan_ingest.ScanBufferFull as e:
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=503,
+            headers={"Retry-After": "1"},
+            media_type="application/json",
+        )
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/inventory/{itemId}/movements",
+    response_model=project.recordInventoryMovement_service.InventoryMovementResponse,
+)
+async def api_post_recordInventoryMovement(
+    itemId: str,
+    kind: str,
+    movementType: prisma.enums.MovementType,
+    quantityDelta: int,
+    reason: Optional[str] = None,
+) -> project.recordInventoryMovement_service.InventoryMovementResponse | Response:
+    """
+    Records a receipt, consumption, production or adjustment of stock for one inventory item and returns its new quantity.
+    """
+    try:
+        res = await project.recordInventoryMovement_service.recordInventoryMovement(
+            itemId, kind, movementType, quantityDelta, reason
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/inventory/stock-levels",
+    response_model=project.listInventory_service.InventoryLevels,
+)
+async def api_get_listStockLevels(
+    material_type: Optional[str] = None, product_type: Optional[str] = None
+) -> project.listInventory_service.InventoryLevels | Response:
+    """
+    Displays current stock levels of raw materials and finished products per type, grade and unit, read from the materialized stock counters.
+    """
+    try:
+        res = await project.listInventory_service.listInventory(
+            material_type, product_type
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
 @app.get(
     "/inventory/{itemId}",
     response_model=project.getInventoryItem_service.InventoryItemResponse,
@@ -660,14 +1179,29 @@ async def api_get_getInventoryItem(
     response_model=project.getAllProductionRecords_service.GetAllProductionRecordsResponse,
 )
 async def api_get_getAllProductionRecords(
-    request: project.getAllProductionRecords_service.GetAllProductionRecordsRequest,
-) -> project.getAllProductionRecords_service.GetAllProductionRecordsResponse | Response:
-    """
-    Retrieves a list of all production records. This includes historical data which is necessary for analysis and reporting.
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: str = "json",
+) -> (
+    project.getAllProductionRecords_service.GetAllProductionRecordsResponse
+    | StreamingResponse
+    | Response
+):
+    """
+    Retrieves production records, newest first, one keyset-paginated page at a time, optionally filtered by creation date. With format=ndjson all matching records are streamed as newline-delimited JSON instead. This includes historical data which is necessary for analysis and reporting.
     """
     try:
+        if format == "ndjson":
+            lines = project.getAllProductionRecords_service.streamProductionRecords(
+                created_from, created_to
+            )
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        if format != "json":
+            raise ValueError("format must be either 'json' or 'ndjson'.")
         res = await project.getAllProductionRecords_service.getAllProductionRecords(
-            request
+            cursor, limit, created_from, created_to
         )
         return res
     except Exception as e:
@@ -736,15 +1270,20 @@ async def api_post_createOptimizationRequest(
         )
 
 
-@app.get("/customers", response_model=project.listCustomers_service.GetCustomersOutput)
-async def api_get_listCustomers(
-    request: project.listCustomers_service.GetCustomersInput,
-) -> project.listCustomers_service.GetCustomersOutput | Response:
+@app.delete(
+    "/optimizations/{requestId}/hold",
+    response_model=project.releaseOptimizationHold_service.ReleaseHoldResponse,
+)
+async def api_delete_releaseOptimizationHold(
+    requestId: str,
+) -> project.releaseOptimizationHold_service.ReleaseHoldResponse | Response:
     """
-    Retrieves a list of all customers stored in the system. This is used by sales personnel to access customer contacts and manage relationships.
+    Releases the raw material held for a cutting plan before its hold expires.
     """
     try:
-        res = await project.listCustomers_service.listCustomers(request)
+        res = await project.releaseOptimizationHold_service.releaseOptimizationHold(
+            requestId
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -757,30 +1296,15 @@ async def api_get_listCustomers(
         )
 
 
-@app.post(
-    "/production",
-    response_model=project.createProductionRecord_service.CreateProductionRecordResponse,
-)
-async def api_post_createProductionRecord(
-    userId: str,
-    rawMaterialId: str,
-    finishedProductId: str,
-    quantityProduced: int,
-    lumberDimensions: Dict[str, float],
-    lumberGrade: str,
-) -> project.createProductionRecord_service.CreateProductionRecordResponse | Response:
+@app.get("/customers", response_model=project.listCustomers_service.GetCustomersOutput)
+async def api_get_listCustomers(
+    request: project.listCustomers_service.GetCustomersInput,
+) -> project.listCustomers_service.GetCustomersOutput | Response:
     """
-    Creates a new production record for daily outputs. It captures quantities, dimensions, and grades of lumber produced. This is crucial for tracking and planning purposes.
+    Retrieves a list of all customers stored in the system. This is used by sales personnel to access customer contacts and manage relationships.
     """
     try:
-        res = await project.createProductionRecord_service.createProductionRecord(
-            userId,
-            rawMaterialId,
-            finishedProductId,
-            quantityProduced,
-            lumberDimensions,
-            lumberGrade,
-        )
+        res = await project.listCustomers_service.listCustomers(request)
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -799,13 +1323,20 @@ async def api_post_createQuote(
     lumberDimensions: Dict[str, float],
     lumberGrade: str,
     quantity: int,
+    finishedProductId: Optional[str] = None,
+    validForDays: int = 14,
 ) -> project.createQuote_service.QuoteResponse | Response:
     """
     Creates a new customer quote based on lumber dimensions, grade, and quantity. This endpoint uses predefined rates to calculate prices and returns a generated quote.
     """
     try:
         res = await project.createQuote_service.createQuote(
-            customerContactId, lumberDimensions, lumberGrade, quantity
+            customerContactId,
+            lumberDimensions,
+            lumberGrade,
+            quantity,
+            finishedProductId,
+            validForDays,
         )
         return res
     except Exception as e:
@@ -907,14 +1438,14 @@ async def api_get_listInventory(
     response_model=project.createPriceEstimate_service.PriceEstimateResponse,
 )
 async def api_post_createPriceEstimate(
-    dimensions: str, grade: str, quantity: int
+    customerContactId: str, dimensions: str, grade: str, quantity: int
 ) -> project.createPriceEstimate_service.PriceEstimateResponse | Response:
     """
     This endpoint accepts dimensions, grade, and quantity of lumber from the user, calculates the price using predefined rates fetched from the Inventory Tracking Module, and generates a quote. The quote is then stored and can be used by the Sales and Invoicing Module.
     """
     try:
         res = await project.createPriceEstimate_service.createPriceEstimate(
-            dimensions, grade, quantity
+            customerContactId, dimensions, grade, quantity
         )
         return res
     except Exception as e:
@@ -1193,14 +1724,24 @@ async def api_get_listMaintenanceLogs(
     "/quotes/{quoteId}", response_model=project.getQuote_service.GetQuoteDetailsResponse
 )
 async def api_get_getQuote(
-    quoteId: str,
+    quoteId: str, if_none_match: Optional[str] = Header(None)
 ) -> project.getQuote_service.GetQuoteDetailsResponse | Response:
     """
-    Retrieves details of a specific quote using its ID. This allows sales managers and system administrators to review, manage, and follow up on quotes issued to customers.
+    Retrieves details of a specific quote using its ID. This allows sales managers and system administrators to review, manage, and follow up on quotes issued to customers. Responses are served from the response cache and carry an ETag; a matching If-None-Match header yields 304 Not Modified.
     """
     try:
-        res = await project.getQuote_service.getQuote(quoteId)
-        return res
+        entry = await project.cache.response_cache.get_or_load(
+            project.cache.quote_tag(quoteId),
+            lambda: project.getQuote_service.getQuote(quoteId),
+            lambda res: [
+                project.cache.quote_tag(res.quote.id),
+                *(
+                    project.cache.price_estimate_tag(estimate.id)
+                    for estimate in res.quote.priceEstimate
+                ),
+            ],
+        )
+        return project.cache.cached_response(entry, if_none_match)
     except Exception as e:
         logger.exception("Error processing request")
         res = dict()
@@ -1217,18 +1758,18 @@ async def api_get_getQuote(
     response_model=project.listOptimizations_service.GetOptimizationsResponse,
 )
 async def api_get_listOptimizations(
-    page: int,
-    limit: int,
-    start_date: Optional[datetime],
-    end_date: Optional[datetime],
-    user_id: Optional[str],
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[str] = None,
 ) -> project.listOptimizations_service.GetOptimizationsResponse | Response:
     """
-    Lists all cutting optimization requests. This can be used by operators to review past optimizations and by management for auditing and planning purposes.
+    Lists all cutting optimization requests, newest first, one keyset-paginated page at a time. This can be used by operators to review past optimizations and by management for auditing and planning purposes.
     """
     try:
         res = await project.listOptimizations_service.listOptimizations(
-            page, limit, start_date, end_date, user_id
+            cursor, limit, start_date, end_date, user_id
         )
         return res
     except Exception as e:
@@ -0,0 +1,56 @@
+from typing import Optional
+
+import prisma
+import project.inventory_events
+import project.stock_alerts
+from pydantic import BaseModel
+
+
+class ReorderThresholdResponse(BaseModel):
+    """
+    The reorder threshold now in effect for the inventory item.
+    """
+
+    itemId: str
+    kind: str
+    reorderThreshold: int
+    usesDefault: bool
+
+
+async def setReorderThreshold(
+    itemId: str, kind: str, reorderThreshold: Optional[int]
+) -> ReorderThresholdResponse:
+    """
+    Sets the stock level at or below which an inventory item is reported as low stock. Clearing the threshold falls back to the default of the item's kind.
+
+    Args:
+        itemId (str): The raw material or finished product to configure.
+        kind (str): Either 'RawMaterial' or 'FinishedProduct'.
+        reorderThreshold (Optional[int]): The new threshold, or None to use the default.
+
+    Returns:
+        ReorderThresholdResponse: The reorder threshold now in effect for the inventory item.
+    """
+    if kind not in project.stock_alerts.DEFAULT_REORDER_THRESHOLDS:
+        raise ValueError("kind must be either 'RawMaterial' or 'FinishedProduct'.")
+    if reorderThreshold is not None and reorderThreshold < 0:
+        raise ValueError("reorderThreshold must not be negative.")
+    updated = await prisma.get_client().execute_raw(
+        f'UPDATE "{kind}" SET "reorderThreshold" = $1, "version" = "version" + 1, "updatedAt" = now()'
+        ' WHERE "id" = $2',
+        reorderThreshold,
+        itemId,
+    )
+    if not updated:
+        raise ValueError("No inventory item found with the provided ID")
+    project.inventory_events.inventory_changed([(kind, itemId)])
+    return ReorderThresholdResponse(
+        itemId=itemId,
+        kind=kind,
+        reorderThreshold=(
+            project.stock_alerts.DEFAULT_REORDER_THRESHOLDS[kind]
+            if reorderThreshold is None
+            else reorderThreshold
+        ),
+        usesDefault=reorderThreshold is None,
+    )
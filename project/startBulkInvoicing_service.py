@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import prisma
+import prisma.models
+import project.money
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class BulkInvoicingStatus(BaseModel):
+    """
+    Progress of a bulk invoicing run, updated after every committed chunk of customers.
+    """
+
+    jobId: str
+    status: str
+    progress: int
+    customersTotal: int
+    customersProcessed: int
+    invoicesCreated: int
+    quotesInvoiced: int
+    totalAmountCents: int
+    totalAmount: float
+    startedAt: datetime
+    finishedAt: Optional[datetime] = None
+    errorMessage: Optional[str] = None
+
+
+bulk_invoicing_jobs: Dict[str, BulkInvoicingStatus] = {}
+
+_running_tasks: Set[asyncio.Task] = set()
+
+INVOICE_CHUNK_SQL = """
+WITH open_quotes AS (
+    SELECT "id", "customerContactId" FROM "Quote"
+    WHERE "invoiceId" IS NULL AND "customerContactId" = ANY($1::text[])
+      AND ("expiresAt" IS NULL OR "expiresAt" > now())
+    FOR UPDATE
+),
+totals AS (
+    SELECT q."customerContactId",
+           COALESCE(SUM(pe."priceRateCents" * pe."quantity"), 0)::bigint AS "totalAmountCents"
+    FROM open_quotes q
+    LEFT JOIN "PriceEstimate" pe ON pe."quoteId" = q."id"
+    GROUP BY q."customerContactId"
+),
+inserted AS (
+    INSERT INTO "Invoice" ("customerContactId", "issueDate", "dueDate", "totalAmountCents", "updatedAt")
+    SELECT t."customerContactId", $2::timestamp, $3::timestamp, t."totalAmountCents", now()
+    FROM totals t
+    RETURNING "id", "customerContactId", "totalAmountCents"
+),
+invoiced AS (
+    UPDATE "Quote" q
+    SET "invoiceId" = i."id", "updatedAt" = now()
+    FROM inserted i, open_quotes o
+    WHERE q."id" = o."id" AND o."customerContactId" = i."customerContactId"
+    RETURNING q."id"
+)
+SELECT (SELECT COUNT(*) FROM inserted) AS "invoiceCount",
+       (SELECT COALESCE(SUM("totalAmountCents"), 0)::bigint FROM inserted) AS "totalAmountCents",
+       (SELECT COUNT(*) FROM invoiced) AS "quoteCount"
+"""
+
+
+async def runBulkInvoicing(
+    job: BulkInvoicingStatus,
+    customerContactIds: List[str],
+    issueDate: datetime,
+    dueDate: datetime,
+    chunkSize: int,
+) -> None:
+    """
+    Invoices all open quotes of the given customers, one chunk of customers per statement.
+
+    Each chunk aggregates the open quotes per customer in SQL, inserts one invoice per
+    customer and links the quotes to their invoice in a single statement, so a chunk is
+    committed atomically and a failure only loses the chunk in flight.
+
+    Args:
+        job (BulkInvoicingStatus): The job record updated with progress after every chunk.
+        customerContactIds (List[str]): Customers with at least one open quote.
+        issueDate (datetime): Issue date written to every invoice.
+        dueDate (datetime): Due date written to every invoice.
+        chunkSize (int): Number of customers invoiced per statement.
+    """
+    client = prisma.get_client()
+    job.status = "running"
+    try:
+        for offset in range(0, len(customerContactIds), chunkSize):
+            chunk = customerContactIds[offset : offset + chunkSize]
+            result = await client.query_first(
+                INVOICE_CHUNK_SQL, chunk, issueDate, dueDate
+            )
+            job.customersProcessed += len(chunk)
+            job.invoicesCreated += result["invoiceCount"]
+            job.quotesInvoiced += result["quoteCount"]
+            job.totalAmountCents += result["totalAmountCents"]
+            job.totalAmount = project.money.from_cents(job.totalAmountCents)
+            job.progress = job.customersProcessed * 100 // job.customersTotal
+        job.status = "completed"
+        job.progress = 100
+    except Exception as e:
+        logger.exception("Bulk invoicing run %s failed", job.jobId)
+        job.status = "failed"
+        job.errorMessage = str(e)
+    finally:
+        job.finishedAt = datetime.now()
+
+
+async def startBulkInvoicing(
+    issueDate: datetime, dueDate: datetime, chunkSize: int = 500
+) -> BulkInvoicingStatus:
+    """
+    Starts a month-end invoicing run that creates one invoice per customer with open (not yet invoiced or expired) quotes. The run happens in the background; its progress can be followed with the returned job ID.
+
+    Args:
+        issueDate (datetime): Date when the invoices are officially issued.
+        dueDate (datetime): Date by which the payment for the invoices should be completed.
+        chunkSize (int): Number of customers invoiced per transaction.
+
+    Returns:
+        BulkInvoicingStatus: The initial state of the started job.
+
+    Raises:
+        ValueError: If the chunk size is not positive or another run is still in progress.
+    """
+    if chunkSize <= 0:
+        raise ValueError("chunkSize must be a positive number.")
+    if any(job.status in ("queued", "running") for job in bulk_invoicing_jobs.values()):
+        raise ValueError("A bulk invoicing run is already in progress.")
+    rows = await prisma.get_client().query_raw(
+        'SELECT DISTINCT "customerContactId" FROM "Quote"'
+        ' WHERE "invoiceId" IS NULL AND ("expiresAt" IS NULL OR "expiresAt" > now())'
+    )
+    customer_contact_ids = [row["customerContactId"] for row in rows]
+    job = BulkInvoicingStatus(
+        jobId=uuid.uuid4().hex,
+        status="queued",
+        progress=0,
+        customersTotal=len(customer_contact_ids),
+        customersProcessed=0,
+        invoicesCreated=0,
+        quotesInvoiced=0,
+        totalAmountCents=0,
+        totalAmount=0.0,
+        startedAt=datetime.now(),
+    )
+    bulk_invoicing_jobs[job.jobId] = job
+    task = asyncio.create_task(
+        runBulkInvoicing(job, customer_contact_ids, issueDate, dueDate, chunkSize)
+    )
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return job
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+import prisma
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REORDER_THRESHOLDS = {"RawMaterial": 10, "FinishedProduct": 5}
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+HEARTBEAT_INTERVAL = 15.0
+
+
+def item_status_query(raw_condition: str, finished_condition: str) -> str:
+    """
+    Builds the query reading quantity and effective reorder threshold of the raw materials and finished products matching the given conditions.
+    """
+    return f"""
+        SELECT 'RawMaterial' AS "kind", "id" AS "itemId", "type", "unit", "quantity",
+               COALESCE("reorderThreshold", {DEFAULT_REORDER_THRESHOLDS["RawMaterial"]}) AS "threshold"
+        FROM "RawMaterial" WHERE {raw_condition}
+        UNION ALL
+        SELECT 'FinishedProduct', "id", "type", "unit", "quantity",
+               COALESCE("reorderThreshold", {DEFAULT_REORDER_THRESHOLDS["FinishedProduct"]})
+        FROM "FinishedProduct" WHERE {finished_condition}
+        """
+
+
+LOW_STOCK_QUERY = item_status_query(
+    f'"quantity" <= COALESCE("reorderThreshold", {DEFAULT_REORDER_THRESHOLDS["RawMaterial"]})',
+    f'"quantity" <= COALESCE("reorderThreshold", {DEFAULT_REORDER_THRESHOLDS["FinishedProduct"]})',
+)
+
+
+class StockAlert(BaseModel):
+    """
+    A change of the stock status of one inventory item.
+    """
+
+    kind: str
+    itemId: str
+    type: str
+    quantity: int
+    threshold: int
+    status: str
+    at: datetime
+
+
+def stock_status(quantity: int, threshold: int) -> str:
+    if quantity <= 0:
+        return "out-of-stock"
+    if quantity <= threshold:
+        return "low-stock"
+    return "in-stock"
+
+
+class StockAlertHub:
+    """
+    Pushes stock status changes to connected clients.
+
+    Writers report the items they touched with `notify`; only those items are re-read,
+    and an alert is published only when an item's status changes, e.g. from in-stock to
+    low-stock. Every subscriber has a bounded queue; a client that stops reading loses
+    alerts instead of holding memory or slowing the writers down.
+    """
+
+    def __init__(self) -> None:
+        self._statuses: Dict[Tuple[str, str], str] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self) -> None:
+        """
+        Loads the items currently below their reorder threshold so the first change after startup is compared against the right status.
+        """
+        rows = await prisma.get_client().query_raw(LOW_STOCK_QUERY)
+        self._statuses = {
+            (row["kind"], row["itemId"]): stock_status(
+                row["quantity"], row["threshold"]
+            )
+            for row in rows
+        }
+
+    def notify(self, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Schedules a status check of the given (kind, itemId) items after a committed write. Does not block the writer.
+        """
+        keys = set(items)
+        if not keys:
+            return
+        task = asyncio.create_task(self.check(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def notify_all(self) -> None:
+        """
+        Schedules a status check of every item that is or was below its reorder threshold, e.g. after a bulk import touched too many items to list. Does not block the writer.
+        """
+        task = asyncio.create_task(self._check_all())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _check_all(self) -> None:
+        try:
+            rows = await prisma.get_client().query_raw(LOW_STOCK_QUERY)
+        except Exception:
+            logger.exception("Failed to check stock status of all items")
+            return
+        await self.check(
+            {(row["kind"], row["itemId"]) for row in rows} | set(self._statuses)
+        )
+
+    async def check(self, keys: Set[Tuple[str, str]]) -> None:
+        try:
+            rows = await prisma.get_client().query_raw(
+                item_status_query('"id" = ANY($1::text[])', '"id" = ANY($2::text[])'),
+                [item_id for kind, item_id in keys if kind == "RawMaterial"],
+                [item_id for kind, item_id in keys if kind == "FinishedProduct"],
+            )
+        except Exception:
+            logger.exception("Failed to check stock status of %d items", len(keys))
+            return
+        for key in keys - {(row["kind"], row["itemId"]) for row in rows}:
+            self._statuses.pop(key, None)
+        for row in rows:
+            key = (row["kind"], row["itemId"])
+            status = stock_status(row["quantity"], row["threshold"])
+            if self._statuses.get(key, "in-stock") == status:
+                continue
+            if status == "in-stock":
+                self._statuses.pop(key, None)
+            else:
+                self._statuses[key] = status
+            self.publish(
+                StockAlert(
+                    kind=row["kind"],
+                    itemId=row["itemId"],
+                    type=row["type"],
+                    quantity=row["quantity"],
+                    threshold=row["threshold"],
+                    status=status,
+                    at=datetime.now(timezone.utc),
+                )
+            )
+
+    def publish(self, alert: StockAlert) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                logger.warning("Dropping stock alert for a slow subscriber")
+
+    async def subscribe(self) -> AsyncIterator[Optional[StockAlert]]:
+        """
+        Yields alerts as they are published, and None every HEARTBEAT_INTERVAL seconds without alerts so the connection can be kept alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+
+
+stock_alerts = StockAlertHub()
+
+
+async def streamStockAlerts() -> AsyncIterator[str]:
+    """
+    Formats the alert stream as server-sent events: one `stock-alert` event per alert and a comment line as heartbeat.
+    """
+    async for alert in stock_alerts.subscribe():
+        if alert is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: stock-alert\ndata: {alert.model_dump_json()}\n\n"
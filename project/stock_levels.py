@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import prisma
+
+RAW_MATERIAL = "RawMaterial"
+
+FINISHED_PRODUCT = "FinishedProduct"
+
+
+class StockKey(NamedTuple):
+    """
+    The grouping of the materialized stock counters: item kind, type, grade and unit. Raw materials have no grade and are counted under "".
+    """
+
+    kind: str
+    type: str
+    grade: str
+    unit: str
+
+
+class StockDelta(NamedTuple):
+    """
+    Change of one stock counter row.
+    """
+
+    quantity: int = 0
+    reservedQuantity: int = 0
+    itemCount: int = 0
+
+
+StockDeltas = Dict[StockKey, StockDelta]
+
+
+def stock_key(kind: str, item: Any) -> StockKey:
+    return StockKey(kind, item.type, getattr(item, "grade", None) or "", item.unit)
+
+
+def add_delta(deltas: StockDeltas, key: StockKey, delta: StockDelta) -> StockDeltas:
+    """
+    Folds a delta into `deltas` so every counter row is touched at most once per statement.
+    """
+    current = deltas.get(key, StockDelta())
+    deltas[key] = StockDelta(*(a + b for a, b in zip(current, delta)))
+    return deltas
+
+
+def item_deltas(
+    kind: str,
+    before: Optional[Any],
+    after: Optional[Any],
+    deltas: Optional[StockDeltas] = None,
+) -> StockDeltas:
+    """
+    Computes the counter changes of creating (before is None), updating or deleting (after is None) one inventory item. An update that changes the type, grade or unit moves the item between counter rows.
+
+    Args:
+        kind (str): RAW_MATERIAL or FINISHED_PRODUCT.
+        before (Optional[Any]): The item before the write.
+        after (Optional[Any]): The item after the write.
+        deltas (Optional[StockDeltas]): Deltas to add to, e.g. of other items written in the same transaction.
+
+    Returns:
+        StockDeltas: The accumulated deltas.
+    """
+    deltas = {} if deltas is None else deltas
+    if before is not None:
+        add_delta(
+            deltas,
+            stock_key(kind, before),
+            StockDelta(-before.quantity, -getattr(before, "reservedQuantity", 0), -1),
+        )
+    if after is not None:
+        add_delta(
+            deltas,
+            stock_key(kind, after),
+            StockDelta(after.quantity, getattr(after, "reservedQuantity", 0), 1),
+        )
+    return deltas
+
+
+async def apply_stock_deltas(client: Any, deltas: StockDeltas) -> None:
+    """
+    Applies counter deltas with one upsert. Pass the transaction of the inventory write so the counters commit or roll back together with it.
+
+    Args:
+        client (Any): The Prisma client or transaction to run the statement on.
+        deltas (StockDeltas): The deltas to apply.
+    """
+    changed: List[Tuple[StockKey, StockDelta]] = [
+        (key, delta) for key, delta in deltas.items() if any(delta)
+    ]
+    if not changed:
+        return
+    await client.execute_raw(
+        """
+        INSERT INTO "StockLevel" ("kind", "type", "grade", "unit", "quantity", "reservedQuantity", "itemCount", "updatedAt")
+        SELECT d.*, now()
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::int[], $6::int[], $7::int[]) AS d
+        ON CONFLICT ("kind", "type", "grade", "unit") DO UPDATE
+        SET "quantity" = "StockLevel"."quantity" + EXCLUDED."quantity",
+            "reservedQuantity" = "StockLevel"."reservedQuantity" + EXCLUDED."reservedQuantity",
+            "itemCount" = "StockLevel"."itemCount" + EXCLUDED."itemCount",
+            "updatedAt" = now()
+        """,
+        *(list(column) for column in zip(*(key for key, _ in changed))),
+        *(list(column) for column in zip(*(delta for _, delta in changed))),
+    )
+
+
+async def record_item_change(
+    client: Any, kind: str, before: Optional[Any], after: Optional[Any]
+) -> None:
+    """
+    Updates the counters for one created, updated or deleted inventory item.
+    """
+    await apply_stock_deltas(client, item_deltas(kind, before, after))
+
+
+async def rebuildStockLevels() -> None:
+    """
+    Recomputes all counters from the inventory tables in one transaction. Run on startup so counters are correct even after data was restored or edited outside the API.
+    """
+    async with prisma.get_client().tx() as transaction:
+        await transaction.execute_raw('DELETE FROM "StockLevel"')
+        await transaction.execute_raw("""
+            INSERT INTO "StockLevel" ("kind", "type", "grade", "unit", "quantity", "reservedQuantity", "itemCount", "updatedAt")
+            SELECT 'RawMaterial', "type", '', "unit", SUM("quantity")::int, 0, COUNT(*)::int, now()
+            FROM "RawMaterial"
+            GROUP BY "type", "unit"
+            UNION ALL
+            SELECT 'FinishedProduct', "type", "grade", "unit", SUM("quantity")::int,
+                   SUM("reservedQuantity")::int, COUNT(*)::int, now()
+            FROM "FinishedProduct"
+            GROUP BY "type", "grade", "unit"
+            """)
+
+
+async def readStockLevels() -> List[Dict[str, Any]]:
+    """
+    Reads the non-empty counter rows, ordered by kind, type, grade and unit.
+    """
+    return await prisma.get_client().query_raw(
+        'SELECT "kind", "type", "grade", "unit", "quantity", "reservedQuantity", "itemCount"'
+        ' FROM "StockLevel" WHERE "itemCount" > 0'
+        ' ORDER BY "kind", "type", "grade", "unit"'
+    )
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import prisma
+import project.db_errors
+import project.quote_expiry
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5.0
+
+MAX_PENDING_MINUTES = 50000
+
+MAX_QUARANTINED_MINUTES = 10000
+
+# Bounds of the int4 "pieces" and bigint "lastSequence" columns.
+MAX_PIECES = 2**31 - 1
+
+MAX_SEQUENCE = 2**63 - 1
+
+MinuteRows = Dict[Tuple[str, datetime], List[int]]
+
+
+class TelemetrySample(BaseModel):
+    """
+    One counter sample from a sawline machine, forwarded by the local PLC bridge. `pieces` is the number of boards counted since the machine's previous sample; `sequence` increases by at least one per sample of a machine.
+    """
+
+    machineId: str
+    sequence: int = Field(ge=0, le=MAX_SEQUENCE)
+    recordedAt: datetime
+    pieces: int = Field(ge=0, le=MAX_PIECES)
+
+
+class TelemetryBufferFull(Exception):
+    """
+    Raised when too many per-minute rows are waiting to be written; the bridge should retry shortly.
+    """
+
+
+class TelemetryBuffer:
+    """
+    Write-behind buffer folding machine counter samples into per-minute production rows.
+
+    A sample is a duplicate, e.g. resent by the bridge after a lost acknowledgement, if its
+    sequence number is not above the highest one already accepted for its machine. Accepted
+    samples are added to the pending row of their machine and minute; every FLUSH_INTERVAL
+    seconds the pending rows are upserted with one statement. Database writes therefore
+    grow with machines x minutes, not with the sample rate. A row the database rejects
+    because of its data, e.g. pieces overflowing the column, is moved to `quarantined` and
+    logged instead of being retried forever; after any other failure, e.g. while the
+    database is unreachable, the rows stay pending and are retried on the next flush.
+    A machine's sequence number is only stored together with all of its rows.
+    """
+
+    def __init__(
+        self,
+        interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING_MINUTES,
+        max_quarantined: int = MAX_QUARANTINED_MINUTES,
+    ) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self.quarantined: Deque[Tuple[str, datetime, int, int]] = deque(
+            maxlen=max_quarantined
+        )
+        self._sequences: Dict[str, int] = {}
+        self._pending: MinuteRows = {}
+        self._dirty_sequences: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, samples: Iterable[TelemetrySample]) -> Tuple[int, int]:
+        """
+        Folds samples into the pending per-minute rows.
+
+        Args:
+            samples (Iterable[TelemetrySample]): The samples, in any order.
+
+        Returns:
+            Tuple[int, int]: Number of accepted and of duplicate samples.
+
+        Raises:
+            TelemetryBufferFull: If too many rows are waiting to be written.
+        """
+        if len(self._pending) >= self.max_pending:
+            raise TelemetryBufferFull(
+                f"{len(self._pending)} per-minute rows are waiting to be written; retry shortly."
+            )
+        accepted = duplicates = 0
+        for sample in sorted(samples, key=lambda s: (s.machineId, s.sequence)):
+            if sample.sequence <= self._sequences.get(sample.machineId, -1):
+                duplicates += 1
+                continue
+            self._sequences[sample.machineId] = sample.sequence
+            self._dirty_sequences[sample.machineId] = sample.sequence
+            minute = project.quote_expiry.as_utc(sample.recordedAt).replace(
+                second=0, microsecond=0, tzinfo=None
+            )
+            row = self._pending.setdefault((sample.machineId, minute), [0, 0])
+            row[0] += sample.pieces
+            row[1] += 1
+            accepted += 1
+        return accepted, duplicates
+
+    async def load(self) -> None:
+        """
+        Loads the last accepted sequence number of every machine and starts the writer.
+        """
+        rows = await prisma.get_client().query_raw(
+            'SELECT "machineId", "lastSequence" FROM "TelemetrySource"'
+        )
+        self._sequences = {row["machineId"]: row["lastSequence"] for row in rows}
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the writer after writing the pending rows.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(
+                    "Failed to write telemetry; %d rows are waiting", len(self._pending)
+                )
+
+    async def flush(self) -> None:
+        """
+        Upserts the pending per-minute rows and sequence numbers in one transaction. If the database rejects their data, they are written machine by machine instead and the rows that still fail are quarantined; after any other failure they are merged back into the buffer.
+        """
+        pending, self._pending = self._pending, {}
+        sequences, self._dirty_sequences = self._dirty_sequences, {}
+        if not pending and not sequences:
+            return
+        try:
+            await write_telemetry(pending, sequences)
+        except Exception as e:
+            if not project.db_errors.is_data_error(e):
+                self._merge_back(pending, sequences)
+                raise
+            await self._write_by_machine(pending, sequences)
+        except BaseException:
+            self._merge_back(pending, sequences)
+            raise
+
+    def _merge_back(self, pending: MinuteRows, sequences: Dict[str, int]) -> None:
+        for key, (pieces, samples) in pending.items():
+            row = self._pending.setdefault(key, [0, 0])
+            row[0] += pieces
+            row[1] += samples
+        self._dirty_sequences = {**sequences, **self._dirty_sequences}
+
+    async def _write_by_machine(
+        self, pending: MinuteRows, sequences: Dict[str, int]
+    ) -> None:
+        machines: Dict[str, MinuteRows] = {machineId: {} for machineId in sequences}
+        for key, row in pending.items():
+            machines.setdefault(key[0], {})[key] = row
+        remaining = list(machines.items())
+        for index, (machineId, rows) in enumerate(remaining):
+            try:
+                await write_telemetry(rows, _sequence_of(machineId, sequences))
+                continue
+            except Exception as e:
+                if not project.db_errors.is_data_error(e):
+                    self._merge_back_machines(remaining[index:], sequences)
+                    raise
+            except BaseException:
+                self._merge_back_machines(remaining[index:], sequences)
+                raise
+            await self._write_singly(machineId, rows, sequences, remaining[index + 1 :])
+
+    async def _write_singly(
+        self,
+        machineId: str,
+        rows: MinuteRows,
+        sequences: Dict[str, int],
+        later: List[Tuple[str, MinuteRows]],
+    ) -> None:
+        """
+        Writes the rows of one machine one by one and quarantines those the database rejects. The machine's sequence number is only stored once none of its rows was quarantined, so a restart never skips resent samples of rows that were not written.
+        """
+        items = list(rows.items())
+        quarantined = False
+        for index, (key, row) in enumerate(items):
+            try:
+                await write_telemetry({key: row}, {})
+                continue
+            except Exception as e:
+                if not project.db_errors.is_data_error(e):
+                    self._merge_back(
+                        dict(items[index:]),
+                        {} if quarantined else _sequence_of(machineId, sequences),
+                    )
+                    self._merge_back_machines(later, sequences)
+                    raise
+            except BaseException:
+                self._merge_back(
+                    dict(items[index:]),
+                    {} if quarantined else _sequence_of(machineId, sequences),
+                )
+                self._merge_back_machines(later, sequences)
+                raise
+            logger.exception("Quarantining telemetry of %s at %s", *key)
+            self.quarantined.append((*key, *row))
+            quarantined = True
+        if quarantined:
+            logger.warning(
+                "Not storing the sequence number of machine %s past quarantined rows",
+                machineId,
+            )
+        else:
+            self._merge_back({}, _sequence_of(machineId, sequences))
+
+    def _merge_back_machines(
+        self, machines: List[Tuple[str, MinuteRows]], sequences: Dict[str, int]
+    ) -> None:
+        for machineId, rows in machines:
+            self._merge_back(rows, _sequence_of(machineId, sequences))
+
+
+def _sequence_of(machineId: str, sequences: Dict[str, int]) -> Dict[str, int]:
+    return {machineId: sequences[machineId]} if machineId in sequences else {}
+
+
+async def write_telemetry(rows: MinuteRows, sequences: Dict[str, int]) -> None:
+    async with prisma.get_client().tx() as transaction:
+        if rows:
+            await transaction.execute_raw(
+                """
+                INSERT INTO "TelemetryMinute" ("machineId", "minute", "pieces", "samples", "updatedAt")
+                SELECT d.*, now()
+                FROM unnest($1::text[], $2::timestamp[], $3::int[], $4::int[]) AS d
+                ON CONFLICT ("machineId", "minute") DO UPDATE
+                SET "pieces" = "TelemetryMinute"."pieces" + EXCLUDED."pieces",
+                    "samples" = "TelemetryMinute"."samples" + EXCLUDED."samples",
+                    "updatedAt" = now()
+                """,
+                [machineId for machineId, _ in rows],
+                [minute for _, minute in rows],
+                [pieces for pieces, _ in rows.values()],
+                [samples for _, samples in rows.values()],
+            )
+        if sequences:
+            await transaction.execute_raw(
+                """
+                INSERT INTO "TelemetrySource" ("machineId", "lastSequence", "updatedAt")
+                SELECT d.*, now()
+                FROM unnest($1::text[], $2::bigint[]) AS d
+                ON CONFLICT ("machineId") DO UPDATE
+                SET "lastSequence" = GREATEST("TelemetrySource"."lastSequence", EXCLUDED."lastSequence"),
+                    "updatedAt" = now()
+                """,
+                list(sequences),
+                list(sequences.values()),
+            )
+
+
+telemetry_buffer = TelemetryBuffer()
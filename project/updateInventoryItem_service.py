@@ -1,7 +1,12 @@
 from typing import Optional
 
 import prisma
+import prisma.enums
 import prisma.models
+import project.dimensions
+import project.inventory_events
+import project.inventory_ledger
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -14,6 +19,7 @@ class UpdatedInventoryItem(BaseModel):
     quantity: int
     dimensions: Optional[str] = None
     type: str
+    version: int
 
 
 class UpdateInventoryItemResponse(BaseModel):
@@ -25,44 +31,120 @@ class UpdateInventoryItemResponse(BaseModel):
     updatedItem: UpdatedInventoryItem
 
 
+class InventoryVersionConflict(Exception):
+    """
+    Raised when an inventory item was changed by someone else since the caller read it.
+    """
+
+    def __init__(self, itemId: str, currentVersion: int) -> None:
+        super().__init__(
+            f"Inventory item {itemId} was modified concurrently; it is now at version {currentVersion}. Reload it and retry."
+        )
+        self.itemId = itemId
+        self.currentVersion = currentVersion
+
+
 async def updateInventoryItem(
-    itemId: str, quantity: int, dimensions: Optional[str], type: str
+    itemId: str,
+    quantity: int,
+    dimensions: Optional[str],
+    type: str,
+    version: Optional[int] = None,
 ) -> UpdateInventoryItemResponse:
     """
     Updates existing inventory item information such as quantity, dimensions, or type. This endpoint is fundamental after any stock adjustment or post-production update, ensuring the data remains consistent across modules.
 
+    The update is a compare-and-set on the item's version: it only applies if the item still has the version the caller read (or, without a version, the one read at the start of the update), so concurrent edits from several devices never silently overwrite each other. A changed quantity is recorded in the inventory ledger as an ADJUSTMENT of the difference.
+
     Args:
         itemId (str): The unique identifier for the inventory item to update. This ID should correspond either to a prisma.models.RawMaterial or prisma.models.FinishedProduct.
         quantity (int): The new quantity for the inventory item. This value is expected to be updated based on production operations or inventory auditing.
-        dimensions (Optional[str]): Updated dimensions of the inventory item. This is more relevant for finished products.
+        dimensions (Optional[str]): Updated dimensions of a finished product as thickness x width x length, e.g. "2x6x12" (inches, inches, feet). Ignored for raw materials.
         type (str): The type of material or product, which might be updated if categorization standards change.
+        version (Optional[int]): The version of the item the caller based the update on.
 
     Returns:
         UpdateInventoryItemResponse: Response after updating the inventory item. Provides confirmation and details of the updated item.
+
+    Raises:
+        InventoryVersionConflict: If the item no longer has the expected version.
+        ValueError: If the new quantity of a finished product is below its reserved quantity.
     """
     if type.lower().startswith("raw"):
         model = prisma.models.RawMaterial
+        kind = project.stock_levels.RAW_MATERIAL
     else:
         model = prisma.models.FinishedProduct
-    item = await model.prisma().find_unique(where={"id": itemId})
-    if not item:
-        return UpdateInventoryItemResponse(success=False, updatedItem=None)
-    updated_item = await model.prisma().update(
-        where={"id": itemId},
-        data={
-            "quantity": quantity,
-            "type": type,
-            **(
-                {"dimensions": dimensions}
-                if dimensions and model is prisma.models.FinishedProduct
-                else {}
-            ),
-        },
+        kind = project.stock_levels.FINISHED_PRODUCT
+    size = (
+        project.dimensions.parse_dimension_key(dimensions)
+        if dimensions and model is prisma.models.FinishedProduct
+        else None
     )
+    async with prisma.get_client().tx() as transaction:
+        item = await model.prisma(transaction).find_unique(where={"id": itemId})
+        if not item:
+            return UpdateInventoryItemResponse(success=False, updatedItem=None)
+        if version is not None and version != item.version:
+            raise InventoryVersionConflict(itemId, item.version)
+        if quantity < getattr(item, "reservedQuantity", 0):
+            raise ValueError(
+                f"quantity must not be below the {item.reservedQuantity} units reserved by quotes."
+            )
+        updated = await model.prisma(transaction).update_many(
+            where={"id": itemId, "version": item.version},
+            data={
+                "quantity": quantity,
+                "type": type,
+                "version": {"increment": 1},
+                **(
+                    {
+                        "thicknessIn": size.thickness_in,
+                        "widthIn": size.width_in,
+                        "lengthFt": size.length_ft,
+                    }
+                    if size
+                    else {}
+                ),
+            },
+        )
+        if not updated:
+            current = await model.prisma(transaction).find_unique(where={"id": itemId})
+            raise InventoryVersionConflict(
+                itemId, current.version if current else item.version + 1
+            )
+        updated_item = await model.prisma(transaction).find_unique(where={"id": itemId})
+        await project.stock_levels.record_item_change(
+            transaction, kind, item, updated_item
+        )
+        await project.inventory_ledger.record_movements(
+            transaction,
+            [
+                project.inventory_ledger.Movement(
+                    kind,
+                    itemId,
+                    prisma.enums.MovementType.ADJUSTMENT,
+                    updated_item.quantity - item.quantity,
+                    "Quantity set by inventory update",
+                )
+            ],
+        )
+    project.inventory_events.inventory_changed([(kind, itemId)])
     updated_inventory_item = UpdatedInventoryItem(
         itemId=updated_item.id,
         quantity=updated_item.quantity,
-        dimensions=getattr(updated_item, "dimensions", None),
+        dimensions=(
+            project.dimensions.dimension_key(
+                project.dimensions.Dimensions(
+                    updated_item.thicknessIn,
+                    updated_item.widthIn,
+                    updated_item.lengthFt,
+                )
+            )
+            if getattr(updated_item, "thicknessIn", None) is not None
+            else None
+        ),
         type=updated_item.type,
+        version=updated_item.version,
     )
     return UpdateInventoryItemResponse(success=True, updatedItem=updated_inventory_item)
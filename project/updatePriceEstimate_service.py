@@ -2,6 +2,10 @@ from typing import Dict
 
 import prisma
 import prisma.models
+import project.cache
+import project.dimensions
+import project.money
+import project.pricing
 from pydantic import BaseModel
 
 
@@ -26,7 +30,7 @@ async def updatePriceEstimate(
 
     Args:
         estimateId (str): The unique identifier of the price estimate to be updated.
-        lumberDimensions (Dict[str, float]): New lumber dimensions in a structured format such as {length:, width:, height:}.
+        lumberDimensions (Dict[str, float]): New lumber dimensions in a structured format such as {length:, width:, height:}, with height and width in inches and length in feet.
         lumberGrade (str): New grade of the lumber which affects price calculations.
         quantity (int): New quantity of the lumber required for recalculating total price.
 
@@ -38,44 +42,32 @@ async def updatePriceEstimate(
     )
     if price_estimate is None:
         raise ValueError("The specified Price Estimate does not exist.")
-    new_price = calculateNewPriceRate(lumberDimensions, lumberGrade) * quantity
+    dimensions = project.dimensions.from_mapping(lumberDimensions)
+    price_rate_cents = project.pricing.unit_price_cents(dimensions, lumberGrade)
     await prisma.models.PriceEstimate.prisma().update(
         where={"id": estimateId},
         data={
             "lumberDimensions": lumberDimensions,
+            "dimensionKey": project.dimensions.dimension_key(dimensions),
             "lumberGrade": lumberGrade,
             "quantity": quantity,
-            "priceRate": new_price / quantity,
+            "priceRateCents": price_rate_cents,
+            "expectedProfitCents": project.pricing.expected_profit_cents(
+                price_rate_cents, quantity
+            ),
         },
     )
     quote_id = price_estimate.quoteId if price_estimate.quoteId else ""
+    project.cache.response_cache.invalidate(
+        project.cache.price_estimate_tag(estimateId),
+        project.cache.quote_tag(quote_id),
+        project.cache.margin_month_tag(price_estimate.createdAt),
+    )
     return UpdatePriceEstimateResponse(
         estimateId=estimateId,
         lumberDimensions=lumberDimensions,
         lumberGrade=lumberGrade,
         quantity=quantity,
-        newPrice=new_price,
+        newPrice=project.money.from_cents(price_rate_cents * quantity),
         quoteId=quote_id,
     )
-
-
-def calculateNewPriceRate(
-    lumberDimensions: Dict[str, float], lumberGrade: str
-) -> float:
-    """
-    Simulates price calculation based on lumber dimensions and grade.
-    This is a placeholder function, assuming prices are influenced by volume and quality grade.
-
-    Args:
-        lumberDimensions (Dict[str, float]): The dimensions of the lumber.
-        lumberGrade (str): The grade of the lumber.
-
-    Returns:
-        float: Calculated price based on dimensions and lumber grade.
-    """
-    length = lumberDimensions.get("length", 1)
-    width = lumberDimensions.get("width", 1)
-    height = lumberDimensions.get("height", 1)
-    base_price = 50.0
-    grade_multiplier = 1.1 if lumberGrade == "A" else 1.0 if lumberGrade == "B" else 0.9
-    return base_price * (length * width * height) * grade_multiplier
@@ -1,5 +1,10 @@
 import prisma
 import prisma.models
+import project.dimensions
+import project.inventory_events
+import project.production_rollups
+import project.production_stock
+import project.stock_levels
 from pydantic import BaseModel
 
 
@@ -27,34 +32,112 @@ async def updateProductionRecord(
     """
     Updates an existing production record's details. This is useful for corrections or adjustments in data logs.
 
+    The stock the record moved is corrected in the same transaction: a changed quantity is added to or taken from the finished product, and a change of raw material or finished product moves the record's consumption and production to the new items, with ADJUSTMENT movements in the ledger and matching stock counter deltas.
+
     Args:
         recordId (str): The unique identifier of the production record to be updated.
         rawMaterialId (str): The raw material identifier used in this production record.
         finishedProductId (str): The finished product identifier after processing the raw material.
         quantityProduced (int): The updated quantity of the finished product produced during the production process.
-        newDimensions (str): Updated dimensions for the produced lumber, if applicable.
-        newGrade (str): New quality grade of the finished product if there are changes to report.
+        newDimensions (str): Updated dimensions for the produced lumber as comma-separated "thicknessxwidthxlength" keys, e.g. "2x6x12,2x8x16".
+        newGrade (str): New quality grade of the lumber produced, if there are changes to report. The linked items keep their own type and grade.
 
     Returns:
         UpdateProductionRecordResponse: Response model for updating a production record. Will return the updated details of the production record.
+
+    Raises:
+        ValueError: If the record does not exist, the dimensions are invalid, or there is not enough stock for the correction.
     """
-    record = await prisma.models.ProductionRecord.prisma().find_unique(
-        where={"id": recordId}
-    )
-    if record is None:
-        raise ValueError("prisma.models.ProductionRecord not found")
-    await prisma.models.ProductionRecord.prisma().update(
-        where={"id": recordId},
-        data={
-            "rawMaterialId": rawMaterialId,
-            "finishedProductId": finishedProductId,
-            "quantityProduced": quantityProduced,
-            "RawMaterial": {"update": {"type": newDimensions}},
-            "FinishedProduct": {"update": {"grade": newGrade, "type": newDimensions}},
-        },
-    )
-    updated_record = await prisma.models.ProductionRecord.prisma().find_unique(
-        where={"id": recordId}, include={"RawMaterial": True, "FinishedProduct": True}
+    sizes = [
+        project.dimensions.parse_dimension_key(key.strip())
+        for key in newDimensions.split(",")
+        if key.strip()
+    ]
+    newDimensions = ",".join(project.dimensions.dimension_key(size) for size in sizes)
+    async with prisma.get_client().tx() as transaction:
+        record = await prisma.models.ProductionRecord.prisma(transaction).find_first(
+            where={"id": recordId}
+        )
+        if record is None:
+            raise ValueError("prisma.models.ProductionRecord not found")
+        raw_material = await prisma.models.RawMaterial.prisma(transaction).find_unique(
+            where={"id": rawMaterialId}
+        )
+        if raw_material is None:
+            raise ValueError("No raw material found with provided RawMaterialId.")
+        finished_product = await prisma.models.FinishedProduct.prisma(
+            transaction
+        ).find_unique(where={"id": finishedProductId})
+        if finished_product is None:
+            raise ValueError(
+                "No finished product found with provided FinishedProductId."
+            )
+        raw_key = (project.stock_levels.RAW_MATERIAL, record.rawMaterialId)
+        finished_key = (
+            project.stock_levels.FINISHED_PRODUCT,
+            record.finishedProductId,
+        )
+        moved = await project.production_stock.recorded_moves(
+            transaction, recordId, [raw_key, finished_key]
+        )
+        updated_record = await prisma.models.ProductionRecord.prisma(
+            transaction
+        ).update(
+            where={"id_createdAt": {"id": recordId, "createdAt": record.createdAt}},
+            data={
+                "rawMaterialId": rawMaterialId,
+                "finishedProductId": finishedProductId,
+                "quantityProduced": quantityProduced,
+                "boardFeet": (
+                    float(
+                        project.dimensions.board_feet_batch(
+                            project.dimensions.as_array(sizes)
+                        ).mean()
+                    )
+                    * quantityProduced
+                    if sizes
+                    else (
+                        record.boardFeet * quantityProduced / record.quantityProduced
+                        if record.quantityProduced
+                        else 0.0
+                    )
+                ),
+                "lumberGrade": newGrade,
+                "lumberDimensions": newDimensions,
+                "materialType": (
+                    record.materialType
+                    if finishedProductId == record.finishedProductId
+                    else finished_product.type
+                ),
+                "RawMaterial": {"update": {"version": {"increment": 1}}},
+                "FinishedProduct": {"update": {"version": {"increment": 1}}},
+            },
+            include={"RawMaterial": True, "FinishedProduct": True},
+        )
+        target = {
+            (project.stock_levels.RAW_MATERIAL, rawMaterialId): moved.get(raw_key, 0),
+            (project.stock_levels.FINISHED_PRODUCT, finishedProductId): moved.get(
+                finished_key, 0
+            )
+            + quantityProduced
+            - record.quantityProduced,
+        }
+        await project.production_stock.apply_moves(
+            transaction,
+            recordId,
+            project.production_stock.subtract_moves(target, moved),
+        )
+        await project.production_rollups.apply_rollup_deltas(
+            transaction,
+            project.production_rollups.record_deltas(record, updated_record),
+        )
+    project.inventory_events.inventory_changed(
+        [
+            (project.stock_levels.RAW_MATERIAL, rawMaterialId),
+            (project.stock_levels.FINISHED_PRODUCT, finishedProductId),
+            raw_key,
+            finished_key,
+        ]
     )
     response = UpdateProductionRecordResponse(
         recordId=recordId,